@@ -1,18 +1,83 @@
-from typing import Optional
-from .client import AgentBay
+from typing import TYPE_CHECKING, Any, Optional
 from .decorators import trace
+from .instrumentation import instrument, uninstrument
 
-def init(api_key: Optional[str] = None, api_url: Optional[str] = None) -> AgentBay:
+# The OpenTelemetry SDK and the exporters are only imported by `init()` (or when
+# `agentbay.AgentBay` is first accessed), so `import agentbay` stays cheap.
+if TYPE_CHECKING:
+    from .client import AgentBay
+    from .context import session, wrap_executor
+
+def init(api_key: Optional[str] = None, api_url: Optional[str] = None, **options: Any) -> "AgentBay":
     """
     Initialize the AgentBay SDK.
     
     Args:
         api_key: Your AgentBay API Key. If not provided, reads from AGENTBAY_API_KEY env var.
         api_url: Optional URL for the AgentBay backend (mostly for testing/on-prem).
+        **options: Tuning options, passed to `agentbay.config.Config`:
+            exporter: "http" (default, or AGENTBAY_EXPORTER), "file" to write spans to local files,
+                or "memory" to keep them in a ring buffer queried with `client.query()`;
+                no API key is needed for "file" and "memory".
+            file_directory: Directory for `exporter="file"` (or AGENTBAY_FILE_DIR).
+            file_format: "protobuf" (length-delimited, default) or "json" (OTLP/JSON lines).
+            file_max_bytes: Size at which a capture file is rotated (default 64MB).
+            memory_max_spans: Spans kept by `exporter="memory"`, oldest dropped first (default 10000).
+            service_name, service_version: Identity of this service (default: OTEL_SERVICE_NAME or
+                AGENTBAY_SERVICE_NAME, else "agentbay-python-sdk").
+            environment: Deployment environment, e.g. "production" (or AGENTBAY_ENVIRONMENT).
+            resource_attributes: Extra attributes describing the process (merged with
+                OTEL_RESOURCE_ATTRIBUTES). Sent once per batch, not on every span.
+            enabled: Set to False (or AGENTBAY_DISABLED=1) to turn the SDK off: no API key needed,
+                nothing is exported and decorated functions run untraced.
+            max_attribute_bytes: Cap for each serialized input/output attribute (default 32 KiB).
+            defer_serialization: Serialize inputs/outputs on the export thread instead of the caller's thread.
+            max_queue_size, max_export_batch_size, schedule_delay_millis, export_timeout_millis:
+                Export pipeline tuning (defaults: 2048 spans, 512 spans, 5s, 30s).
+            overflow_policy: "drop_newest" (default), "drop_oldest" or "block" when the queue is full.
+            block_timeout_millis: How long "block" waits for room before dropping (default 100ms).
+            max_export_retries: Retries for a failed batch, with exponential backoff (default 2).
+            sample_rate: Share of new traces to record, 0.0-1.0 (default 1.0 or AGENTBAY_SAMPLE_RATE).
+            tail_sampling: Buffer each trace and only export it if it errored, was slow or expensive.
+            tail_latency_threshold_millis, tail_token_threshold: Keep traces above these thresholds.
+            tail_keep_ratio: Share of the remaining traces to keep anyway (default 0.0).
+            tail_max_buffered_spans: Memory bound for the tail sampling buffer (default 10000 spans).
+            trace_analysis: Attach a critical path, parallelism and LLM/tool/code time summary
+                (`agentbay.analysis.*`) to each root span (default False).
+            analysis_max_buffered_spans: Memory bound for the spans held until their trace's root
+                ends, for trace analysis (default 10000 spans).
+            aggregator_socket: Send spans to a local `python -m agentbay.aggregator` on this Unix socket
+                (or AGENTBAY_AGGREGATOR_SOCKET), so N worker processes share one upstream connection.
+            compression: "gzip" (default), "zstd" (needs `zstandard`, else gzip) or "none".
+            compression_level: Optional compression level for the chosen algorithm.
+            http_pool_maxsize, http_keep_alive: Connection pool size and keep-alive for the export session.
+            spill_directory: Write batches that fail to export to this directory (or AGENTBAY_SPILL_DIR)
+                and replay them when the backend is back.
+            spill_max_bytes, spill_segment_bytes: Disk cap (default 256MB, oldest dropped first) and segment size.
+            spill_fsync: "batch" (default), "always" or "never".
+            metrics: Export LLM request, token, latency, error and cost metrics (default True; HTTP exporter only).
+            metrics_export_interval_millis: How often aggregated metrics are exported (default 60s).
+            model_prices: {"model": {"prompt": ..., "completion": ...}} in USD per 1M tokens,
+                overriding the built-in prices used for `llm.usage.cost_usd`.
+            pricing_file: JSON file with the same format (or AGENTBAY_PRICING_FILE).
     
     Returns:
         The initialized AgentBay client instance.
     """
-    return AgentBay.initialize(api_key=api_key, api_url=api_url)
+    from .client import AgentBay
+
+    return AgentBay.initialize(api_key=api_key, api_url=api_url, **options)
+
+def __getattr__(name: str) -> Any:
+    # PEP 562: import the client on first access
+    if name == "AgentBay":
+        from .client import AgentBay
+
+        return AgentBay
+    if name in ("session", "wrap_executor"):
+        from . import context
+
+        return getattr(context, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-__all__ = ["init", "AgentBay", "trace"]
+__all__ = ["init", "AgentBay", "session", "wrap_executor", "trace", "instrument", "uninstrument"]
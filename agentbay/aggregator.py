@@ -0,0 +1,313 @@
+"""
+Local span aggregator for multi-process deployments (gunicorn pre-fork, multiprocessing).
+
+Each worker process exports its spans to a Unix socket with `UnixSocketSpanExporter`
+(enabled with `agentbay.init(aggregator_socket=...)`), and a single `SpanAggregator`
+process batches them and ships them upstream over one HTTP connection.
+
+Run the aggregator with:
+
+    python -m agentbay.aggregator --socket /tmp/agentbay.sock
+
+Frames are length-prefixed OTLP `ExportTraceServiceRequest` protobufs. Concatenated
+protobuf messages merge their repeated fields, so the aggregator batches frames by
+joining their bytes, without decoding them.
+"""
+import argparse
+import collections
+import logging
+import os
+import socket
+import struct
+import threading
+from typing import Callable, Deque, Optional, Sequence
+
+from opentelemetry.sdk.trace import ReadableSpan
+from opentelemetry.sdk.trace.export import SpanExporter, SpanExportResult
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SOCKET_PATH = "/tmp/agentbay-aggregator.sock"
+
+# Frame header: payload length as a 4-byte big-endian unsigned int
+_HEADER = struct.Struct(">I")
+
+# Frames larger than this are rejected (protects the aggregator from a corrupt stream)
+MAX_FRAME_BYTES = 64 * 1024 * 1024
+
+def _recv_exactly(conn: socket.socket, size: int) -> Optional[bytes]:
+    """
+    Reads exactly `size` bytes, or returns None if the peer closed the connection.
+    """
+    buffer = bytearray()
+    while len(buffer) < size:
+        chunk = conn.recv(size - len(buffer))
+        if not chunk:
+            return None
+        buffer.extend(chunk)
+    return bytes(buffer)
+
+class UnixSocketSpanExporter(SpanExporter):
+    """
+    Worker-side exporter: sends each batch as one frame to the local aggregator.
+    The connection is opened lazily and reopened after errors and in forked children.
+    """
+    def __init__(self, socket_path: str = DEFAULT_SOCKET_PATH, timeout: float = 5.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._sock: Optional[socket.socket] = None
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+
+    def _connect(self) -> socket.socket:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        return sock
+
+    def _close(self):
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+            self._sock = None
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        from opentelemetry.exporter.otlp.proto.common.trace_encoder import encode_spans
+
+        payload = encode_spans(spans).SerializeToString()
+        return self.export_serialized(payload)
+
+    def export_serialized(self, payload: bytes) -> SpanExportResult:
+        """
+        Sends an already encoded `ExportTraceServiceRequest` to the aggregator.
+        """
+        frame = _HEADER.pack(len(payload)) + payload
+        with self._lock:
+            if self._pid != os.getpid():
+                # Never share the parent's connection with a forked child
+                self._sock = None
+                self._pid = os.getpid()
+
+            # One reconnect attempt: the aggregator may have restarted since the last batch
+            for attempt in range(2):
+                try:
+                    if self._sock is None:
+                        self._sock = self._connect()
+                    self._sock.sendall(frame)
+                    return SpanExportResult.SUCCESS
+                except OSError as e:
+                    self._close()
+                    if attempt:
+                        logger.warning("AgentBay SDK Error: Failed to send spans to aggregator at %s: %s", self.socket_path, e)
+        return SpanExportResult.FAILURE
+
+    def shutdown(self):
+        with self._lock:
+            self._close()
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return True
+
+class SpanAggregator:
+    """
+    Receives span frames from worker processes on a Unix socket and forwards them
+    upstream in batches of up to `max_batch_bytes`, at least every `flush_interval` seconds.
+
+    At most `max_pending_bytes` are buffered; when the upstream is slow, the oldest
+    frames are dropped and counted in `dropped_frames`.
+    """
+    def __init__(
+        self,
+        socket_path: str,
+        upload: Callable[[bytes], bool],
+        max_batch_bytes: int = 4 * 1024 * 1024,
+        max_pending_bytes: int = 64 * 1024 * 1024,
+        flush_interval: float = 1.0,
+    ):
+        self.socket_path = socket_path
+        self.upload = upload
+        self.max_batch_bytes = max_batch_bytes
+        self.max_pending_bytes = max_pending_bytes
+        self.flush_interval = flush_interval
+
+        self.received_frames = 0
+        self.uploaded_frames = 0
+        self.dropped_frames = 0
+
+        self._pending: Deque[bytes] = collections.deque()
+        self._pending_bytes = 0
+        self._lock = threading.Lock()
+        self._ready = threading.Condition(self._lock)
+        self._stop_event = threading.Event()
+        self._server: Optional[socket.socket] = None
+        self._threads = []
+
+    def start(self):
+        """
+        Binds the socket and starts the accept and upload threads.
+        """
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+        self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._server.bind(self.socket_path)
+        os.chmod(self.socket_path, 0o600)
+        self._server.listen(128)
+        self._server.settimeout(0.5)
+
+        for target, name in ((self._accept_loop, "agentbay-aggregator-accept"), (self._upload_loop, "agentbay-aggregator-upload")):
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        """
+        Stops accepting connections, uploads what is pending and removes the socket.
+        """
+        self._stop_event.set()
+        with self._lock:
+            self._ready.notify()
+        for thread in self._threads:
+            thread.join(timeout=5.0)
+        if self._server is not None:
+            self._server.close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+    def serve_forever(self):
+        self.start()
+        try:
+            self._stop_event.wait()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def _accept_loop(self):
+        while not self._stop_event.is_set():
+            try:
+                conn, _ = self._server.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            thread = threading.Thread(target=self._read_loop, args=(conn,), name="agentbay-aggregator-conn", daemon=True)
+            thread.start()
+
+    def _read_loop(self, conn: socket.socket):
+        with conn:
+            while not self._stop_event.is_set():
+                header = _recv_exactly(conn, _HEADER.size)
+                if header is None:
+                    return
+                (size,) = _HEADER.unpack(header)
+                if size > MAX_FRAME_BYTES:
+                    logger.warning("AgentBay SDK Error: Dropping connection with oversized frame (%d bytes)", size)
+                    return
+                payload = _recv_exactly(conn, size)
+                if payload is None:
+                    return
+                self._add(payload)
+
+    def _add(self, payload: bytes):
+        with self._lock:
+            self.received_frames += 1
+            self._pending.append(payload)
+            self._pending_bytes += len(payload)
+            while self._pending_bytes > self.max_pending_bytes and len(self._pending) > 1:
+                self._pending_bytes -= len(self._pending.popleft())
+                self.dropped_frames += 1
+            if self._pending_bytes >= self.max_batch_bytes:
+                self._ready.notify()
+
+    def _upload_loop(self):
+        while True:
+            with self._lock:
+                if self._pending_bytes < self.max_batch_bytes and not self._stop_event.is_set():
+                    self._ready.wait(self.flush_interval)
+                stopping = self._stop_event.is_set()
+
+            while self._upload_batch():
+                pass
+            if stopping:
+                return
+
+    def _upload_batch(self) -> bool:
+        """
+        Uploads one batch. Returns True if more frames are waiting.
+        """
+        with self._lock:
+            frames = []
+            size = 0
+            while self._pending and (not frames or size + len(self._pending[0]) <= self.max_batch_bytes):
+                frame = self._pending.popleft()
+                frames.append(frame)
+                size += len(frame)
+            self._pending_bytes -= size
+
+        if not frames:
+            return False
+
+        if self.upload(b"".join(frames)):
+            with self._lock:
+                self.uploaded_frames += len(frames)
+                return bool(self._pending)
+
+        # Upstream failed: put the frames back (oldest first) and wait for the next tick
+        with self._lock:
+            self._pending.extendleft(reversed(frames))
+            self._pending_bytes += size
+            while self._pending_bytes > self.max_pending_bytes and len(self._pending) > 1:
+                self._pending_bytes -= len(self._pending.popleft())
+                self.dropped_frames += 1
+        return False
+
+def serve(
+    socket_path: str = DEFAULT_SOCKET_PATH,
+    api_key: Optional[str] = None,
+    api_url: Optional[str] = None,
+    compression: Optional[str] = None,
+):
+    """
+    Runs an aggregator that forwards to the AgentBay backend until interrupted.
+    Raises a ValueError without an API key (argument or AGENTBAY_API_KEY).
+    """
+    from .config import Config
+    from .exporters import AgentBaySpanExporter
+
+    config = Config(api_key=api_key, api_url=api_url, compression=compression)
+    config.validate()
+    # `validate()` lets workers with AGENTBAY_AGGREGATOR_SOCKET through without a key,
+    # and the aggregator reads the same variable: it is the side that needs the key.
+    config.require_api_key()
+
+    # Frames are already encoded, so the exporter only compresses and posts them
+    exporter = AgentBaySpanExporter(
+        endpoint=f"{config.api_url}/api/v1/traces",
+        headers={"Authorization": f"Bearer {config.api_key}"},
+        compression=config.compression,
+    )
+
+    def upload(payload: bytes) -> bool:
+        return exporter.export_serialized(payload) == SpanExportResult.SUCCESS
+
+    try:
+        SpanAggregator(socket_path, upload).serve_forever()
+    finally:
+        exporter.shutdown()
+
+def main(argv: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(description="AgentBay local span aggregator")
+    parser.add_argument("--socket", default=os.environ.get("AGENTBAY_AGGREGATOR_SOCKET", DEFAULT_SOCKET_PATH))
+    parser.add_argument("--api-key", default=None)
+    parser.add_argument("--api-url", default=None)
+    parser.add_argument("--compression", default=None, choices=["none", "gzip", "zstd"])
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    serve(args.socket, api_key=args.api_key, api_url=args.api_url, compression=args.compression)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+"""
+Critical path and concurrency analysis of finished traces.
+
+For each trace (from its local root span):
+
+- wall time: the root span's duration,
+- busy time: the summed self time of all spans (time not covered by a child span),
+  and the parallelism factor busy / wall (1.0 is fully sequential),
+- self time spent in LLM calls, tools and own code (see `classify()`),
+- the critical path: the chain of spans that determined when the root ended, with
+  the same LLM / tool / code breakdown along it.
+
+In-process, `TraceAnalysisProcessor` (`agentbay.init(trace_analysis=True)`) attaches the
+summary to each root span as `agentbay.analysis.*` attributes. Offline, `analyze()` works
+on any finished spans, e.g. `client.query()` or `exporters.file.read_spans()`
+(`agentbay analyze ./spans`).
+"""
+import collections
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from opentelemetry.context import Context
+from opentelemetry.sdk.trace import ReadableSpan, Span, SpanProcessor
+
+from .query import SpanNode, SpanQuery
+from .utils import copy_span, register_after_fork
+
+LLM = "llm"
+TOOL = "tool"
+CODE = "code"
+CATEGORIES = (LLM, TOOL, CODE)
+
+# Set on a span (e.g. `@trace(attributes={"agentbay.kind": "tool"})`) to choose its category
+KIND = "agentbay.kind"
+
+PREFIX = "agentbay.analysis."
+
+# Longest critical path recorded as a root span attribute, in span names
+MAX_PATH_NAMES = 32
+
+def classify(span: Any) -> str:
+    """
+    Default span category: LLM calls (`llm.system`, set by the integrations), tools
+    (LangChain tools and retrievers) or own code, unless the span sets `agentbay.kind`.
+    """
+    attributes = span.attributes or {}
+    kind = attributes.get(KIND)
+    if kind in CATEGORIES:
+        return kind
+    if "llm.system" in attributes:
+        return LLM
+    if "langchain.tool.name" in attributes or "langchain.retriever.query" in attributes:
+        return TOOL
+    return CODE
+
+def _bounds(span: Any) -> Tuple[int, int]:
+    start = span.start_time or 0
+    end = span.end_time if span.end_time is not None else start
+    return start, max(start, end)
+
+def _self_ns(node: SpanNode) -> int:
+    """
+    Span duration not covered by any child (children clipped to the span; overlaps counted once).
+    """
+    start, end = _bounds(node.span)
+    covered = 0
+    cursor = start
+    for child in node.children:  # in start order
+        child_start, child_end = _bounds(child.span)
+        child_start, child_end = max(child_start, cursor), min(child_end, end)
+        if child_end > child_start:
+            covered += child_end - child_start
+            cursor = child_end
+    return end - start - covered
+
+def _critical_path(root: SpanNode) -> List[Tuple[SpanNode, int]]:
+    """
+    Walks back from the end of each span: the child that ended last is on the path, then
+    the child that ended last before that one started, and so on. Returns the spans of the
+    path in start order, with the time each contributed itself (not through a child).
+    """
+    path: List[Tuple[SpanNode, int]] = []
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        start, end = _bounds(node.span)
+        cursor = end
+        chosen: List[SpanNode] = []
+        for child in sorted(node.children, key=lambda child: _bounds(child.span)[1], reverse=True):
+            child_start, child_end = _bounds(child.span)
+            if child_end <= cursor and child_start >= start:
+                chosen.append(child)
+                cursor = child_start
+        own = (end - start) - sum(_bounds(child.span)[1] - _bounds(child.span)[0] for child in chosen)
+        path.append((node, own))
+        stack.extend(chosen)  # latest first, so the earliest is popped next
+    return path
+
+class TraceAnalysis:
+    """
+    Summary of one trace, rooted at `root` (times in milliseconds).
+    """
+    __slots__ = ("root", "span_count", "wall_ms", "busy_ms", "self_ms", "critical_path", "critical_ms")
+
+    def __init__(self, root: SpanNode, classify: Callable[[Any], str] = classify):
+        self.root = root
+        self.span_count = 0
+        self.self_ms: Dict[str, float] = dict.fromkeys(CATEGORIES, 0.0)
+        for node in root.walk():
+            self.span_count += 1
+            self.self_ms[classify(node.span)] += _self_ns(node) / 1e6
+        self.busy_ms = sum(self.self_ms.values())
+        self.wall_ms = root.duration_ms
+
+        self.critical_path: List[SpanNode] = []
+        self.critical_ms: Dict[str, float] = dict.fromkeys(CATEGORIES, 0.0)
+        for node, own in _critical_path(root):
+            self.critical_path.append(node)
+            self.critical_ms[classify(node.span)] += own / 1e6
+
+    @property
+    def parallelism(self) -> float:
+        """
+        Busy time over wall time: 1.0 when no spans overlap, N when N run side by side throughout.
+        """
+        return self.busy_ms / self.wall_ms if self.wall_ms > 0 else 1.0
+
+    def to_attributes(self) -> Dict[str, Any]:
+        """
+        The summary as `agentbay.analysis.*` span attributes.
+        """
+        attributes: Dict[str, Any] = {
+            PREFIX + "span_count": self.span_count,
+            PREFIX + "wall_ms": round(self.wall_ms, 3),
+            PREFIX + "busy_ms": round(self.busy_ms, 3),
+            PREFIX + "parallelism": round(self.parallelism, 3),
+            PREFIX + "critical_path": tuple(node.name for node in self.critical_path[:MAX_PATH_NAMES]),
+        }
+        for category in CATEGORIES:
+            attributes[f"{PREFIX}{category}_ms"] = round(self.self_ms[category], 3)
+            attributes[f"{PREFIX}critical_path.{category}_ms"] = round(self.critical_ms[category], 3)
+        return attributes
+
+    def __repr__(self) -> str:
+        return (
+            f"TraceAnalysis({self.root.name!r}, wall={self.wall_ms:.1f}ms, "
+            f"parallelism={self.parallelism:.2f}, spans={self.span_count})"
+        )
+
+def analyze(spans: Iterable[Any], classify: Callable[[Any], str] = classify) -> List[TraceAnalysis]:
+    """
+    Analyzes finished spans: one `TraceAnalysis` per root (a span whose parent isn't in
+    `spans`), in start order. Pass the spans of complete traces, e.g.
+    `analyze(client.query().trace(trace_id))`.
+    """
+    query = spans if isinstance(spans, SpanQuery) else SpanQuery(spans)
+    return [TraceAnalysis(root, classify) for root in query.tree()]
+
+class TraceAnalysisProcessor(SpanProcessor):
+    """
+    Passes spans on to `downstream` (usually the tail sampler or batch processor) as they
+    end, keeping a reference to the finished spans of each trace until its local root ends.
+    The root is then forwarded as a copy carrying the `TraceAnalysis` attributes, so the
+    shape of a trace can be read from its root span without loading the child spans.
+
+    At most `max_buffered_spans` spans are referenced; when full, the oldest trace is
+    forgotten, and the summary of its root only covers the spans that ended afterwards.
+    """
+    def __init__(
+        self,
+        downstream: SpanProcessor,
+        classify: Callable[[Any], str] = classify,
+        max_buffered_spans: int = 10000,
+    ):
+        self.downstream = downstream
+        self.classify = classify
+        self.max_buffered_spans = max_buffered_spans
+
+        self._traces: "collections.OrderedDict[int, List[ReadableSpan]]" = collections.OrderedDict()
+        self._buffered = 0
+        self._lock = threading.Lock()
+        self._stats: Dict[str, int] = {"analyzed": 0, "evicted": 0}
+
+        register_after_fork(self._at_fork_reinit)
+
+    def _at_fork_reinit(self):
+        """
+        Runs in a forked child: traces buffered by the parent belong to the parent.
+        """
+        self._traces = collections.OrderedDict()
+        self._buffered = 0
+        self._lock = threading.Lock()
+        self._stats = {"analyzed": 0, "evicted": 0}
+
+    def on_start(self, span: Span, parent_context: Optional[Context] = None):
+        self.downstream.on_start(span, parent_context=parent_context)
+
+    def on_end(self, span: ReadableSpan):
+        if not (span.context and span.context.trace_flags.sampled):
+            self.downstream.on_end(span)
+            return
+
+        # A span without a local parent closes the trace in this process
+        if span.parent is not None and not span.parent.is_remote:
+            with self._lock:
+                trace_id = span.context.trace_id
+                buffer = self._traces.get(trace_id)
+                if buffer is None:
+                    buffer = self._traces[trace_id] = []
+                buffer.append(span)
+                self._buffered += 1
+                while self._buffered > self.max_buffered_spans and self._traces:
+                    _, old = self._traces.popitem(last=False)
+                    self._buffered -= len(old)
+                    self._stats["evicted"] += 1
+            self.downstream.on_end(span)
+            return
+
+        with self._lock:
+            buffer = self._traces.pop(span.context.trace_id, [])
+            self._buffered -= len(buffer)
+            self._stats["analyzed"] += 1
+
+        # Analyze outside the lock: it is linear in the size of the trace
+        buffer.append(span)
+        roots = [node for node in SpanQuery(buffer).tree() if node.span is span]
+        if roots:
+            span = copy_span(span, TraceAnalysis(roots[0], self.classify).to_attributes())
+        self.downstream.on_end(span)
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Returns the number of traces analyzed and forgotten early (buffer full),
+        plus the spans and traces currently buffered.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["buffered_spans"] = self._buffered
+            stats["buffered_traces"] = len(self._traces)
+            return stats
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return self.downstream.force_flush(timeout_millis)
+
+    def shutdown(self):
+        with self._lock:
+            self._traces.clear()
+            self._buffered = 0
+        self.downstream.shutdown()
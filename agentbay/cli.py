@@ -0,0 +1,168 @@
+"""
+Command line interface, installed as `agentbay` (also `python -m agentbay`).
+
+    agentbay replay ./spans --api-key "$AGENTBAY_API_KEY" [--delete]
+    agentbay analyze ./spans [--top 20]
+
+`replay` uploads files written by `agentbay.init(exporter="file")` to the backend.
+Records are already encoded `ExportTraceServiceRequest`s, and concatenated protobuf
+messages merge their repeated fields, so records are batched by joining their bytes
+(up to `--batch-bytes`) without decoding them.
+
+`analyze` prints the critical path and parallelism summary (`agentbay.analysis`) of
+the traces in capture files, least parallel first.
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+from typing import Callable, Dict, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_BYTES = 4 * 1024 * 1024
+
+def _upload_with_retries(upload: Callable[[bytes], bool], payload: bytes, retries: int, backoff: float) -> bool:
+    for attempt in range(retries + 1):
+        if upload(payload):
+            return True
+        if attempt < retries:
+            time.sleep(backoff * (2 ** attempt))
+    return False
+
+def replay(
+    paths: Sequence[str],
+    upload: Callable[[bytes], bool],
+    batch_bytes: int = DEFAULT_BATCH_BYTES,
+    retries: int = 3,
+    backoff: float = 1.0,
+    delete: bool = False,
+    include_partial: bool = False,
+) -> Dict[str, int]:
+    """
+    Uploads capture files (or directories of them) with `upload(payload) -> bool`, in file
+    name order. Stops at the first batch that still fails after `retries`; files that were
+    not fully uploaded are kept, so running the command again resumes from the first of them
+    (batches of that file already sent are sent again).
+
+    Returns counters: files, batches, records and bytes uploaded, and `failed` (0 or 1).
+    """
+    from .exporters.file import list_capture_files, read_records
+
+    stats = {"files": 0, "batches": 0, "records": 0, "bytes": 0, "failed": 0}
+
+    def send(batch: bytearray) -> bool:
+        if not _upload_with_retries(upload, bytes(batch), retries, backoff):
+            return False
+        stats["batches"] += 1
+        stats["bytes"] += len(batch)
+        return True
+
+    for path in list_capture_files(paths, include_partial=include_partial):
+        batch = bytearray()
+        records = 0
+        for record in read_records(path):
+            if batch and len(batch) + len(record) > batch_bytes:
+                if not send(batch):
+                    stats["failed"] = 1
+                    return stats
+                batch = bytearray()
+            batch += record
+            records += 1
+
+        if batch and not send(batch):
+            stats["failed"] = 1
+            return stats
+
+        stats["files"] += 1
+        stats["records"] += records
+        if delete:
+            os.remove(path)
+    return stats
+
+def _replay_command(args: argparse.Namespace) -> int:
+    from opentelemetry.sdk.trace.export import SpanExportResult
+
+    from .config import Config
+    from .exporters import AgentBaySpanExporter
+
+    config = Config(api_key=args.api_key, api_url=args.api_url, compression=args.compression)
+    config.validate()
+    # Uploads go to the backend even when AGENTBAY_AGGREGATOR_SOCKET is set
+    config.require_api_key()
+
+    exporter = AgentBaySpanExporter(
+        endpoint=f"{config.api_url}/api/v1/traces",
+        headers={"Authorization": f"Bearer {config.api_key}"},
+        compression=config.compression,
+    )
+
+    def upload(payload: bytes) -> bool:
+        return exporter.export_serialized(payload) == SpanExportResult.SUCCESS
+
+    try:
+        stats = replay(
+            args.paths,
+            upload,
+            batch_bytes=args.batch_bytes,
+            retries=args.retries,
+            delete=args.delete,
+            include_partial=args.include_partial,
+        )
+    finally:
+        exporter.shutdown()
+
+    print(
+        f"Uploaded {stats['records']} records from {stats['files']} files "
+        f"in {stats['batches']} requests ({stats['bytes']} bytes)."
+    )
+    if stats["failed"]:
+        print("Upload failed; remaining files were kept, run the command again to resume.", file=sys.stderr)
+        return 1
+    return 0
+
+def _analyze_command(args: argparse.Namespace) -> int:
+    from .analysis import CATEGORIES, analyze
+    from .exporters.file import list_capture_files, read_spans
+
+    spans = [span for path in list_capture_files(args.paths) for span in read_spans(path)]
+    results = sorted(analyze(spans), key=lambda result: result.parallelism)
+    for result in results[:args.top]:
+        breakdown = ", ".join(f"{category} {result.self_ms[category]:.0f}ms" for category in CATEGORIES)
+        print(
+            f"{result.root.name}: wall {result.wall_ms:.0f}ms, parallelism {result.parallelism:.2f}, "
+            f"{result.span_count} spans ({breakdown})"
+        )
+        print(f"  critical path: {' > '.join(node.name for node in result.critical_path)}")
+    print(f"{len(results)} traces analyzed.")
+    return 0
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="agentbay", description="AgentBay SDK command line tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    replay_parser = commands.add_parser("replay", help="Upload span files written with exporter='file'")
+    replay_parser.add_argument("paths", nargs="+", help="Capture files or directories")
+    replay_parser.add_argument("--api-key", default=None)
+    replay_parser.add_argument("--api-url", default=None)
+    replay_parser.add_argument("--compression", default=None, choices=["none", "gzip", "zstd"])
+    replay_parser.add_argument("--batch-bytes", type=int, default=DEFAULT_BATCH_BYTES,
+                               help="Maximum uncompressed size of one upload request")
+    replay_parser.add_argument("--retries", type=int, default=3, help="Retries per request, with exponential backoff")
+    replay_parser.add_argument("--delete", action="store_true", help="Delete files once fully uploaded")
+    replay_parser.add_argument("--include-partial", action="store_true",
+                               help="Also upload files still being written (.part)")
+    replay_parser.set_defaults(handler=_replay_command)
+
+    analyze_parser = commands.add_parser("analyze", help="Critical path and parallelism of captured traces")
+    analyze_parser.add_argument("paths", nargs="+", help="Capture files or directories")
+    analyze_parser.add_argument("--top", type=int, default=20, help="Number of traces to print, least parallel first")
+    analyze_parser.set_defaults(handler=_analyze_command)
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    return args.handler(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,12 +1,23 @@
-from typing import Optional
-from opentelemetry import trace
-from opentelemetry.sdk.trace import TracerProvider
-from opentelemetry.sdk.trace.export import BatchSpanProcessor
-from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
-from opentelemetry.sdk.resources import Resource
+import logging
+from typing import TYPE_CHECKING, Any, Dict, Optional
 
+from . import metrics, pricing, runtime, serialization
 from .config import Config
 
+if TYPE_CHECKING:
+    from .analysis import TraceAnalysisProcessor
+    from .query import SpanQuery
+    from .sampling import TailSamplingProcessor
+    from .spill import SpillingExporter
+
+logger = logging.getLogger(__name__)
+
+# Service name reported when neither `service_name` nor OTEL_SERVICE_NAME is set
+DEFAULT_SERVICE_NAME = "agentbay-python-sdk"
+
+# Semantic convention key for `environment` ("production", "staging", ...)
+DEPLOYMENT_ENVIRONMENT = "deployment.environment.name"
+
 class AgentBay:
     """
     The main AgentBay client.
@@ -16,38 +27,215 @@ class AgentBay:
 
     def __init__(self, config: Config):
         self.config = config
+        self.tracer_provider = None
+        self.exporter = None
+        self.spill_exporter: Optional['SpillingExporter'] = None
+        self.processor = None
+        self.tail_sampler: Optional['TailSamplingProcessor'] = None
+        self.trace_analyzer: Optional['TraceAnalysisProcessor'] = None
+        self.export_stats = None
+        self.meter_provider = None
+
+        # Disabled: nothing is set up (or imported), decorated functions run untraced
+        runtime.set_enabled(config.enabled)
+        if not config.enabled:
+            return
+
+        # The SDK and exporters are only imported once tracing is actually set up
+        from opentelemetry import trace
+        from opentelemetry.sdk.trace import TracerProvider
+
+        from .aggregator import UnixSocketSpanExporter
+        from .analysis import TraceAnalysisProcessor
+        from .exporters import (
+            EXPORTER_FILE,
+            EXPORTER_HTTP,
+            EXPORTER_MEMORY,
+            AgentBaySpanExporter,
+            DeferredAttributeExporter,
+            FileSpanExporter,
+            MemorySpanExporter,
+        )
+        from .processors import BoundedBatchSpanProcessor, ExportStats, SessionSpanProcessor
+        from .sampling import TailSamplingProcessor, create_sampler
+        from .spill import SpillDirectoryLocked, SpillingExporter, SpillQueue
+
+        # 0. Apply serialization settings (shared by `trace` and all integrations)
+        serialization.configure(
+            max_attribute_bytes=config.max_attribute_bytes,
+            defer=config.defer_serialization,
+        )
+
+        # Prices used for `llm.usage.cost_usd` and the cost metric
+        if config.pricing_file:
+            pricing.load(config.pricing_file)
+        if config.model_prices:
+            pricing.table.update(config.model_prices)
         
         # 1. Create Resource (Metadata about who is sending data)
-        resource = Resource.create(attributes={
-            "service.name": "agentbay-python-sdk",
-            # We can add more metadata here like environment
-        })
+        # Built once per process and sent once per export batch, not repeated on every span
+        resource = self._create_resource(config)
 
         # 2. Initialize Tracer Provider
-        self.tracer_provider = TracerProvider(resource=resource)
+        # The head sampler decides at span start, so unsampled traces cost (almost) nothing
+        self.tracer_provider = TracerProvider(resource=resource, sampler=create_sampler(config.sample_rate))
 
         # 3. Configure Exporter
-        # We send data to <api_url>/api/v1/traces via HTTP/Protobuf, and also pass the API Key as a header
-        endpoint = f"{config.api_url}/api/v1/traces" 
-        exporter = OTLPSpanExporter(
-            endpoint=endpoint,
-            headers={"Authorization": f"Bearer {config.api_key}"}
-        )
+        if config.exporter == EXPORTER_MEMORY:
+            # Local profiling and tests: a ring buffer queried with `query()`
+            exporter = MemorySpanExporter(max_spans=config.memory_max_spans)
+        elif config.exporter == EXPORTER_FILE:
+            # Offline capture: rotating local files, uploaded later with `agentbay replay`
+            exporter = FileSpanExporter(
+                config.file_directory,
+                format=config.file_format,
+                max_file_bytes=config.file_max_bytes,
+            )
+        elif config.aggregator_socket:
+            # Multi-process mode: ship spans to the local aggregator, which holds the one upstream connection
+            exporter = UnixSocketSpanExporter(config.aggregator_socket)
+        else:
+            # We send data to <api_url>/api/v1/traces via HTTP/Protobuf, and also pass the API Key as a header.
+            # Bodies are compressed and sent over one pooled keep-alive session.
+            endpoint = f"{config.api_url}/api/v1/traces"
+            exporter = AgentBaySpanExporter(
+                endpoint=endpoint,
+                headers={"Authorization": f"Bearer {config.api_key}"},
+                timeout=config.export_timeout_millis / 1000.0,
+                compression=config.compression,
+                compression_level=config.compression_level,
+                pool_maxsize=config.http_pool_maxsize,
+                keep_alive=config.http_keep_alive,
+            )
+        self.exporter = exporter
+
+        # Batches that fail during an outage go to disk and are replayed in the background,
+        # instead of being retried (and held) in memory.
+        if config.spill_directory and config.exporter != EXPORTER_MEMORY:
+            try:
+                queue = SpillQueue(
+                    config.spill_directory,
+                    max_bytes=config.spill_max_bytes,
+                    segment_bytes=config.spill_segment_bytes,
+                    fsync=config.spill_fsync,
+                )
+            except SpillDirectoryLocked as e:
+                # Another worker owns the directory: retry failed batches in memory instead
+                logger.warning("AgentBay SDK: %s Spilling is disabled in this process.", e)
+            else:
+                exporter = self.spill_exporter = SpillingExporter(exporter, queue)
+
+        if config.defer_serialization:
+            # Stringify inputs/outputs on the export thread
+            exporter = DeferredAttributeExporter(exporter)
 
         # 4. Add Batch Processor (Background thread for sending)
-        processor = BatchSpanProcessor(exporter)
-        self.tracer_provider.add_span_processor(processor)
+        # The queue is bounded, so a slow or unreachable backend can't grow memory;
+        # what happens on overflow is counted in `export_stats`.
+        # The processor restarts its worker thread in forked children (gunicorn, multiprocessing).
+        self.export_stats = ExportStats()
+        self.processor = BoundedBatchSpanProcessor(
+            exporter,
+            max_queue_size=config.max_queue_size,
+            max_export_batch_size=config.max_export_batch_size,
+            schedule_delay_millis=config.schedule_delay_millis,
+            export_timeout_millis=config.export_timeout_millis,
+            overflow_policy=config.overflow_policy,
+            block_timeout_millis=config.block_timeout_millis,
+            max_export_retries=config.max_export_retries,
+            stats=self.export_stats,
+        )
+
+        # `agentbay.session()` attributes are stamped first, so every later processor sees them
+        self.tracer_provider.add_span_processor(SessionSpanProcessor())
+
+        # Tail sampling sits in front of the batch processor and only forwards interesting traces
+        if config.tail_sampling:
+            self.tail_sampler = TailSamplingProcessor(
+                self.processor,
+                latency_threshold_millis=config.tail_latency_threshold_millis,
+                token_threshold=config.tail_token_threshold,
+                keep_ratio=config.tail_keep_ratio,
+                max_buffered_spans=config.tail_max_buffered_spans,
+            )
+
+        downstream = self.tail_sampler or self.processor
+
+        # Trace analysis runs before tail sampling, so root summaries cover whole traces
+        if config.trace_analysis:
+            downstream = self.trace_analyzer = TraceAnalysisProcessor(
+                downstream,
+                max_buffered_spans=config.analysis_max_buffered_spans,
+            )
+        self.tracer_provider.add_span_processor(downstream)
 
         # 5. Register as Global Tracer
         # This allows trace.get_tracer(__name__) to work anywhere in the user's code
         trace.set_tracer_provider(self.tracer_provider)
 
+        # 6. Metrics: aggregated in-process and exported periodically, independent of trace sampling.
+        # They go to the backend directly, so the file and memory exporters never send any.
+        if config.metrics and config.exporter == EXPORTER_HTTP:
+            self.meter_provider = self._create_meter_provider(config, resource)
+            metrics.configure(self.meter_provider)
+
+    @staticmethod
+    def _create_resource(config: Config):
+        """
+        Returns the OTel resource describing this service: `resource_attributes`, then
+        service name/version and environment on top of OTEL_RESOURCE_ATTRIBUTES and
+        OTEL_SERVICE_NAME (explicit options win over the environment).
+        """
+        from opentelemetry.sdk.resources import SERVICE_NAME, SERVICE_VERSION, Resource
+
+        attributes: Dict[str, Any] = dict(config.resource_attributes or {})
+        if config.service_name:
+            attributes[SERVICE_NAME] = config.service_name
+        if config.service_version:
+            attributes[SERVICE_VERSION] = config.service_version
+        if config.environment:
+            attributes[DEPLOYMENT_ENVIRONMENT] = config.environment
+
+        resource = Resource.create(attributes)
+        if str(resource.attributes.get(SERVICE_NAME, "")).startswith("unknown_service"):
+            # Nothing configured anywhere: keep the SDK's historical default
+            resource = resource.merge(Resource({SERVICE_NAME: DEFAULT_SERVICE_NAME}))
+        return resource
+
+    @staticmethod
+    def _create_meter_provider(config: Config, resource: Any):
+        """
+        Returns a `MeterProvider` that exports to <api_url>/api/v1/metrics (OTLP/HTTP),
+        or None when there is no API key (workers behind an aggregator only forward spans).
+        """
+        if not config.api_key:
+            return None
+
+        from opentelemetry.exporter.otlp.proto.http import Compression
+        from opentelemetry.exporter.otlp.proto.http.metric_exporter import OTLPMetricExporter
+        from opentelemetry.sdk.metrics import MeterProvider
+        from opentelemetry.sdk.metrics.export import PeriodicExportingMetricReader
+
+        exporter = OTLPMetricExporter(
+            endpoint=f"{config.api_url}/api/v1/metrics",
+            headers={"Authorization": f"Bearer {config.api_key}"},
+            timeout=config.export_timeout_millis / 1000.0,
+            compression=Compression.NoCompression if config.compression == "none" else Compression.Gzip,
+        )
+        reader = PeriodicExportingMetricReader(
+            exporter,
+            export_interval_millis=config.metrics_export_interval_millis,
+            export_timeout_millis=config.export_timeout_millis,
+        )
+        return MeterProvider(resource=resource, metric_readers=[reader])
+
     @classmethod
-    def initialize(cls, api_key: Optional[str] = None, api_url: Optional[str] = None) -> 'AgentBay':
+    def initialize(cls, api_key: Optional[str] = None, api_url: Optional[str] = None, **options: Any) -> 'AgentBay':
         """
         Initializes the global AgentBay client.
+        Extra keyword arguments are passed to `Config`.
         """
-        config = Config(api_key=api_key, api_url=api_url)
+        config = Config(api_key=api_key, api_url=api_url, **options)
         config.validate()
         
         cls._instance = cls(config)
@@ -65,9 +253,40 @@ class AgentBay:
             )
         return cls._instance
 
+    def get_export_stats(self) -> Dict[str, int]:
+        """
+        Returns the export pipeline counters: spans enqueued, exported, dropped, retried and failed,
+        plus (for direct HTTP export) requests made and bytes before/after compression,
+        and (with a spill directory) batches spilled, replayed and bytes on disk.
+        """
+        if self.export_stats is None:
+            return {}
+        stats = self.export_stats.snapshot()
+        if hasattr(self.exporter, "get_stats"):
+            stats.update(self.exporter.get_stats())
+        if self.spill_exporter is not None:
+            stats.update(self.spill_exporter.get_stats())
+        return stats
+
+    def query(self) -> 'SpanQuery':
+        """
+        Returns a `SpanQuery` over the spans kept by `exporter="memory"`, after flushing
+        the spans still queued in the batch processor.
+        """
+        if not hasattr(self.exporter, "query"):
+            raise RuntimeError(
+                "Span queries need the in-memory exporter. "
+                "Please call `agentbay.init(exporter='memory')` first."
+            )
+        self.tracer_provider.force_flush()
+        return self.exporter.query()
+
     def shutdown(self):
         """
-        Flushes remaining spans and shuts down the provider.
+        Flushes remaining spans and metrics and shuts down the providers.
         """
         if self.tracer_provider:
             self.tracer_provider.shutdown()
+        if self.meter_provider:
+            metrics.configure(None)
+            self.meter_provider.shutdown()
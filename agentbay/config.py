@@ -1,19 +1,149 @@
 import os
-from typing import Optional
+from typing import Any, Dict, Optional
+
+from . import runtime
+from .serialization import DEFAULT_MAX_ATTRIBUTE_BYTES
 
 class Config:
     """
     Configuration settings for the AgentBay SDK.
-    Handles API keys and endpoint URLs.
+    Handles API keys, endpoint URLs and tuning options.
     """
-    def __init__(self, api_key: Optional[str] = None, api_url: Optional[str] = None):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        api_url: Optional[str] = None,
+        enabled: Optional[bool] = None,
+        exporter: Optional[str] = None,
+        service_name: Optional[str] = None,
+        service_version: Optional[str] = None,
+        environment: Optional[str] = None,
+        resource_attributes: Optional[Dict[str, Any]] = None,
+        max_attribute_bytes: Optional[int] = None,
+        defer_serialization: bool = False,
+        max_queue_size: int = 2048,
+        max_export_batch_size: int = 512,
+        schedule_delay_millis: float = 5000,
+        export_timeout_millis: float = 30000,
+        overflow_policy: str = "drop_newest",
+        block_timeout_millis: float = 100,
+        max_export_retries: int = 2,
+        sample_rate: Optional[float] = None,
+        tail_sampling: bool = False,
+        tail_latency_threshold_millis: Optional[float] = None,
+        tail_token_threshold: Optional[int] = None,
+        tail_keep_ratio: float = 0.0,
+        tail_max_buffered_spans: int = 10000,
+        trace_analysis: bool = False,
+        analysis_max_buffered_spans: int = 10000,
+        aggregator_socket: Optional[str] = None,
+        compression: Optional[str] = None,
+        compression_level: Optional[int] = None,
+        http_pool_maxsize: int = 4,
+        http_keep_alive: bool = True,
+        spill_directory: Optional[str] = None,
+        spill_max_bytes: int = 256 * 1024 * 1024,
+        spill_segment_bytes: int = 8 * 1024 * 1024,
+        spill_fsync: str = "batch",
+        file_directory: Optional[str] = None,
+        file_format: str = "protobuf",
+        file_max_bytes: int = 64 * 1024 * 1024,
+        memory_max_spans: int = 10000,
+        metrics: bool = True,
+        metrics_export_interval_millis: float = 60000,
+        model_prices: Optional[Dict[str, Any]] = None,
+        pricing_file: Optional[str] = None,
+    ):
         self.api_key = api_key or os.environ.get("AGENTBAY_API_KEY") # Get API Key from the arguments first, if not provided, try to get it from the environment variables.
         self.api_url = api_url or os.environ.get("AGENTBAY_API_URL", "https://api.agentbay.co") # Set the API URL (defaulting to the hosted version if not changed, https://api.agentbay.co is the hosted version)
 
-    def validate(self):
+        # Kill switch: when disabled (or AGENTBAY_DISABLED is set), nothing is set up and
+        # decorated functions run untraced.
+        self.enabled = enabled if enabled is not None else not runtime.disabled_by_env()
+
+        # Where spans go: "http" (the AgentBay backend), "file" (rotating local files in
+        # `file_directory`, uploaded later with `agentbay replay`) or "memory" (a ring buffer
+        # of `memory_max_spans` spans, queried with `AgentBay.query()`).
+        self.exporter = exporter or os.environ.get("AGENTBAY_EXPORTER", "http")
+
+        # Identity of this service, sent once per batch as the OTel resource (not on every span).
+        # OTEL_SERVICE_NAME / OTEL_RESOURCE_ATTRIBUTES are merged in; explicit values win.
+        self.service_name = service_name or os.environ.get("AGENTBAY_SERVICE_NAME")
+        self.service_version = service_version
+        self.environment = environment or os.environ.get("AGENTBAY_ENVIRONMENT")
+        self.resource_attributes = resource_attributes
+
+        # Serialization: cap (in UTF-8 bytes) for each stringified input/output/prompt attribute,
+        # and whether stringification happens on the export thread instead of the caller's thread.
+        self.max_attribute_bytes = max_attribute_bytes or int(
+            os.environ.get("AGENTBAY_MAX_ATTRIBUTE_BYTES", DEFAULT_MAX_ATTRIBUTE_BYTES)
+        )
+        self.defer_serialization = defer_serialization
+
+        # Export pipeline: queue capacity, batching, timeouts, what happens when the queue is full
+        # ("drop_newest", "drop_oldest" or "block") and how often a failed batch is retried.
+        self.max_queue_size = max_queue_size
+        self.max_export_batch_size = max_export_batch_size
+        self.schedule_delay_millis = schedule_delay_millis
+        self.export_timeout_millis = export_timeout_millis
+        self.overflow_policy = overflow_policy
+        self.block_timeout_millis = block_timeout_millis
+        self.max_export_retries = max_export_retries
+
+        # Sampling: share of new traces recorded at all (head), and optionally a local buffer
+        # that only exports traces with errors, slow roots or high token usage (tail).
+        self.sample_rate = sample_rate if sample_rate is not None else float(
+            os.environ.get("AGENTBAY_SAMPLE_RATE", 1.0)
+        )
+        self.tail_sampling = tail_sampling
+        self.tail_latency_threshold_millis = tail_latency_threshold_millis
+        self.tail_token_threshold = tail_token_threshold
+        self.tail_keep_ratio = tail_keep_ratio
+        self.tail_max_buffered_spans = tail_max_buffered_spans
+
+        # Critical path and parallelism summary attached to each root span (`agentbay.analysis.*`)
+        self.trace_analysis = trace_analysis
+        self.analysis_max_buffered_spans = analysis_max_buffered_spans
+
+        # Multi-process mode: send spans to a local `agentbay.aggregator` on this Unix socket
+        # instead of connecting to the backend from every worker.
+        self.aggregator_socket = aggregator_socket or os.environ.get("AGENTBAY_AGGREGATOR_SOCKET")
+
+        # HTTP export: body compression ("gzip", "zstd" or "none") and the pooled keep-alive session
+        self.compression = compression or os.environ.get("AGENTBAY_COMPRESSION", "gzip")
+        self.compression_level = compression_level
+        self.http_pool_maxsize = http_pool_maxsize
+        self.http_keep_alive = http_keep_alive
+
+        # Backend outages: batches that fail to export are written to segment files in this
+        # directory (capped at `spill_max_bytes`, oldest dropped first) and replayed later.
+        # `spill_fsync` is "always", "batch" or "never".
+        self.spill_directory = spill_directory or os.environ.get("AGENTBAY_SPILL_DIR")
+        self.spill_max_bytes = spill_max_bytes
+        self.spill_segment_bytes = spill_segment_bytes
+        self.spill_fsync = spill_fsync
+
+        # File export: directory, "protobuf" (length-delimited) or "json" (OTLP/JSON lines),
+        # and the size at which files are rotated.
+        self.file_directory = file_directory or os.environ.get("AGENTBAY_FILE_DIR")
+        self.file_format = file_format
+        self.file_max_bytes = file_max_bytes
+        self.memory_max_spans = memory_max_spans
+
+        # Metrics: LLM calls, tokens, latency, errors and cost, aggregated in-process for every
+        # call (sampled or not) and exported every `metrics_export_interval_millis`.
+        self.metrics = metrics
+        self.metrics_export_interval_millis = metrics_export_interval_millis
+
+        # Cost: prices (USD per 1M prompt/completion tokens) that override the built-in table,
+        # given directly and/or as a JSON file. See `agentbay.pricing`.
+        self.model_prices = model_prices
+        self.pricing_file = pricing_file or os.environ.get("AGENTBAY_PRICING_FILE")
+
+    def require_api_key(self):
         """
-        Checks if the configuration is valid (i.e., has an API key).
-        Raises a ValueError if the key is missing.
+        Raises a ValueError if there is no API key. For everything that talks to the backend
+        itself: the HTTP exporter, the aggregator and `agentbay replay`.
         """
         if not self.api_key:
             raise ValueError(
@@ -21,3 +151,73 @@ class Config:
                 "Please provide it via `agentbay.init(api_key='...')` "
                 "or set the `AGENTBAY_API_KEY` environment variable."
             )
+
+    def validate(self):
+        """
+        Checks if the configuration is valid (i.e., has an API key).
+        Raises a ValueError if the key is missing or an option is out of range.
+        Workers that export through a local aggregator don't need a key (the aggregator has it),
+        and neither do local exporters or a disabled SDK.
+        """
+        if not self.enabled:
+            return
+
+        # Option names live with the components; imported here to keep `Config` itself cheap
+        from .exporters import COMPRESSIONS, EXPORTER_FILE, EXPORTER_HTTP, EXPORTERS, FILE_FORMATS
+        from .processors import OVERFLOW_POLICIES
+        from .spill import FSYNC_POLICIES
+
+        if self.exporter not in EXPORTERS:
+            raise ValueError(
+                f"Unknown `exporter` {self.exporter!r}. "
+                f"Expected one of: {', '.join(EXPORTERS)}."
+            )
+        if self.exporter == EXPORTER_FILE:
+            if not self.file_directory:
+                raise ValueError("`exporter='file'` needs a `file_directory` (or AGENTBAY_FILE_DIR).")
+            if self.file_format not in FILE_FORMATS:
+                raise ValueError(
+                    f"Unknown `file_format` {self.file_format!r}. "
+                    f"Expected one of: {', '.join(FILE_FORMATS)}."
+                )
+            if self.file_max_bytes <= 0:
+                raise ValueError("`file_max_bytes` must be positive.")
+        if self.memory_max_spans <= 0:
+            raise ValueError("`memory_max_spans` must be positive.")
+        if self.exporter == EXPORTER_HTTP and not self.aggregator_socket:
+            self.require_api_key()
+        for key, value in (self.resource_attributes or {}).items():
+            if not isinstance(key, str) or not isinstance(value, (str, bool, int, float)):
+                raise ValueError(
+                    f"Invalid resource attribute {key!r}: keys must be strings and values "
+                    "str, bool, int or float."
+                )
+        if self.max_attribute_bytes <= 0:
+            raise ValueError("`max_attribute_bytes` must be a positive number of bytes.")
+        if self.max_queue_size <= 0 or self.max_export_batch_size <= 0:
+            raise ValueError("`max_queue_size` and `max_export_batch_size` must be positive.")
+        if self.max_export_batch_size > self.max_queue_size:
+            raise ValueError("`max_export_batch_size` must be less than or equal to `max_queue_size`.")
+        if not 0.0 <= self.sample_rate <= 1.0 or not 0.0 <= self.tail_keep_ratio <= 1.0:
+            raise ValueError("`sample_rate` and `tail_keep_ratio` must be between 0.0 and 1.0.")
+        if self.tail_max_buffered_spans <= 0 or self.analysis_max_buffered_spans <= 0:
+            raise ValueError("`tail_max_buffered_spans` and `analysis_max_buffered_spans` must be positive.")
+        if self.compression not in COMPRESSIONS:
+            raise ValueError(
+                f"Unknown `compression` {self.compression!r}. "
+                f"Expected one of: {', '.join(COMPRESSIONS)}."
+            )
+        if self.spill_fsync not in FSYNC_POLICIES:
+            raise ValueError(
+                f"Unknown `spill_fsync` {self.spill_fsync!r}. "
+                f"Expected one of: {', '.join(FSYNC_POLICIES)}."
+            )
+        if self.spill_max_bytes <= 0 or self.spill_segment_bytes <= 0:
+            raise ValueError("`spill_max_bytes` and `spill_segment_bytes` must be positive.")
+        if self.metrics_export_interval_millis <= 0:
+            raise ValueError("`metrics_export_interval_millis` must be positive.")
+        if self.overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(
+                f"Unknown `overflow_policy` {self.overflow_policy!r}. "
+                f"Expected one of: {', '.join(OVERFLOW_POLICIES)}."
+            )
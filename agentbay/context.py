@@ -0,0 +1,127 @@
+"""
+Session context: groups the spans of one conversation or task.
+
+    with agentbay.session("conversation-42", user_id="u-7"):
+        run_agent()
+
+Every span started inside the block (decorated functions, LLM calls, LangChain runs)
+gets `session.id` and `user.id` attributes, stamped at span start by
+`processors.SessionSpanProcessor`. The session is stored in the OpenTelemetry context,
+which is a `contextvars` variable: asyncio tasks created inside the block inherit it,
+threads do when started with a copy of the context (`contextvars.copy_context().run`).
+
+The same holds for the current span. Thread pools don't copy the context of the caller,
+so spans of submitted work would start new traces; `wrap_executor()`, `submit()` and
+`map_in_context()` run the work in a copy of the submitting context, keeping parallel calls as
+sibling spans under their parent. `asyncio.to_thread()` already copies the context.
+"""
+import contextlib
+import contextvars
+import uuid
+from concurrent.futures import Executor, Future
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, TypeVar
+
+T = TypeVar("T")
+
+SESSION_ID = "session.id"
+USER_ID = "user.id"
+
+# OpenTelemetry context key holding the attributes of the current session
+SESSION_KEY = "agentbay-session"
+
+def get_session_attributes(context: Optional[Any] = None) -> Optional[Dict[str, Any]]:
+    """
+    Returns the attributes of the session active in `context` (default: the current
+    context), or None outside of `session()`.
+    """
+    from opentelemetry import context as otel_context
+
+    return otel_context.get_value(SESSION_KEY, context)
+
+@contextlib.contextmanager
+def session(
+    session_id: Optional[str] = None,
+    user_id: Optional[str] = None,
+    attributes: Optional[Dict[str, Any]] = None,
+) -> Iterator[str]:
+    """
+    Marks every span started in the block as part of session `session_id` (a random
+    UUID if not given), and of `user_id` if given. `attributes` are stamped on those
+    spans as well. Sessions nest: an inner session keeps the outer attributes it
+    doesn't override.
+
+    Yields the session id.
+    """
+    from opentelemetry import context as otel_context
+
+    session_id = session_id or str(uuid.uuid4())
+    stamped = dict(otel_context.get_value(SESSION_KEY) or {})
+    if attributes:
+        stamped.update(attributes)
+    stamped[SESSION_ID] = session_id
+    if user_id is not None:
+        stamped[USER_ID] = user_id
+
+    token = otel_context.attach(otel_context.set_value(SESSION_KEY, stamped))
+    try:
+        yield session_id
+    finally:
+        otel_context.detach(token)
+
+def submit(executor: Executor, fn: Callable[..., T], *args: Any, **kwargs: Any) -> "Future[T]":
+    """
+    `executor.submit(fn, *args, **kwargs)`, running `fn` in a copy of the current context.
+    """
+    return executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+def map_in_context(
+    executor: Executor,
+    fn: Callable[..., T],
+    *iterables: Iterable[Any],
+    timeout: Optional[float] = None,
+    chunksize: int = 1,
+) -> Iterator[T]:
+    """
+    `executor.map(fn, *iterables)`, running each call in a copy of the current context.
+    """
+    context = contextvars.copy_context()
+
+    def run(*args: Any) -> T:
+        # A context can only be entered by one thread at a time, so each call gets its own copy
+        return context.copy().run(fn, *args)
+
+    return executor.map(run, *iterables, timeout=timeout, chunksize=chunksize)
+
+class ContextExecutor(Executor):
+    """
+    Wraps an executor so that submitted callables run in a copy of the submitting
+    context (current span, `session()`). Other attributes are those of the wrapped executor.
+    """
+    def __init__(self, executor: Executor):
+        self.executor = executor
+
+    def submit(self, fn: Callable[..., T], /, *args: Any, **kwargs: Any) -> "Future[T]":
+        # Executor.map() goes through submit(), so it propagates the context too
+        return submit(self.executor, fn, *args, **kwargs)
+
+    def shutdown(self, wait: bool = True, **kwargs: Any):
+        self.executor.shutdown(wait, **kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        if name == "executor":
+            raise AttributeError(name)
+        return getattr(self.executor, name)
+
+def wrap_executor(executor: Executor) -> ContextExecutor:
+    """
+    Returns `executor` wrapped so that work submitted to it keeps the caller's span as
+    parent (and its `session()`), e.g. for tool calls fanned out to a thread pool:
+
+        pool = agentbay.wrap_executor(ThreadPoolExecutor(8))
+        results = list(pool.map(call_tool, tools))
+
+    For thread pools: process pools can't pickle the context.
+    """
+    if isinstance(executor, ContextExecutor):
+        return executor
+    return ContextExecutor(executor)
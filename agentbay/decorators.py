@@ -1,45 +1,369 @@
+import contextlib
 import functools
-from typing import Callable
-from opentelemetry import trace as otel_trace
-from opentelemetry.trace import Status, StatusCode
+import inspect
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
 
-# Create a global tracer for the SDK
-# tracer = otel_trace.get_tracer("agentbay") 
-# We shouldn't create it globaly at import time because the provider might not be set yet.
+from .runtime import state
+from .serialization import set_attribute
 
-def trace(func: Callable) -> Callable:
+class _TracerCache:
+    """
+    The "agentbay" tracer of the global tracer provider, looked up again only when
+    the provider changes (e.g. after `agentbay.init()`).
+
+    OpenTelemetry is imported on the first traced call, not when `agentbay` is imported:
+    decorating functions at import time must not pay for it (e.g. serverless cold starts).
+    """
+    __slots__ = ("api", "provider", "tracer")
+
+    def __init__(self):
+        self.api = None
+        self.provider = None
+        self.tracer = None
+
+    def get(self):
+        """
+        Returns the tracer, or None when no SDK provider is configured (spans would be no-ops).
+        """
+        api = self.api
+        if api is None:
+            from opentelemetry import trace as api
+            self.api = api
+
+        provider = api.get_tracer_provider()
+        if provider is not self.provider:
+            self.provider = provider
+            self.tracer = None if isinstance(provider, api.ProxyTracerProvider) else provider.get_tracer("agentbay")
+        return self.tracer
+
+_tracers = _TracerCache()
+
+REDACTED = "[REDACTED]"
+
+class _TraceOptions:
+    """
+    Per-function options of `trace`, resolved once at decoration time so the
+    per-call work only covers what is actually captured.
+    """
+    __slots__ = ("name", "function", "capture_args", "capture_result", "arg_serializer",
+                 "redact", "redact_positions", "attributes")
+
+    def __init__(self, func: Callable, name: Optional[str] = None, capture_args: bool = True,
+                 capture_result: bool = True, arg_serializer: Optional[Callable[[Any], Any]] = None,
+                 redact: Optional[Iterable[str]] = None, attributes: Optional[Dict[str, Any]] = None):
+        self.name = name or func.__name__
+        self.function = func.__name__
+        self.capture_args = capture_args
+        self.capture_result = capture_result
+        self.arg_serializer = arg_serializer
+        self.attributes = dict(attributes) if attributes else None
+
+        # Redacted parameters are matched by name: keyword arguments directly, positional
+        # ones through the indices of the named parameters in the signature
+        self.redact = frozenset(redact) if redact else frozenset()
+        self.redact_positions: Tuple[int, ...] = ()
+        if self.redact:
+            try:
+                parameters = inspect.signature(func).parameters.values()
+            except (TypeError, ValueError):
+                parameters = ()
+            self.redact_positions = tuple(
+                i for i, p in enumerate(parameters)
+                if p.name in self.redact
+                and p.kind in (p.POSITIONAL_ONLY, p.POSITIONAL_OR_KEYWORD)
+            )
+
+    def inputs(self, args, kwargs):
+        """
+        Returns the (args, kwargs) to record: redacted values are replaced and never
+        handed to `arg_serializer`.
+        """
+        serializer = self.arg_serializer
+        positions = self.redact_positions
+        redact = self.redact
+
+        if serializer is not None or positions:
+            args = tuple(
+                REDACTED if i in positions else serializer(value) if serializer else value
+                for i, value in enumerate(args)
+            )
+        if kwargs and (serializer is not None or redact):
+            kwargs = {
+                key: REDACTED if key in redact else serializer(value) if serializer else value
+                for key, value in kwargs.items()
+            }
+        return args, kwargs
+
+def _record_inputs(span, options: _TraceOptions, args, kwargs):
+    """
+    Records the function name and (unless disabled) its inputs on the span.
+    """
+    if not span.is_recording():
+        return
+    span.set_attribute("code.function", options.function)
+    if not options.capture_args:
+        return
+    args, kwargs = options.inputs(args, kwargs)
+    # We convert to a (size-capped) string to ensure it fits in a span attribute
+    set_attribute(span, "input.args", args)
+    set_attribute(span, "input.kwargs", kwargs)
+
+def _record_output(span, options: _TraceOptions, result):
+    if options.capture_result:
+        set_attribute(span, "output", result)
+
+def _record_error(span, e: BaseException):
+    """
+    Records an exception on the span and marks it as failed.
+    """
+    from opentelemetry.trace import Status, StatusCode
+
+    span.record_exception(e)
+    span.set_status(Status(StatusCode.ERROR, str(e)))
+
+def _record_ok(span):
+    if not span.is_recording():
+        return
+    from opentelemetry.trace import Status, StatusCode
+
+    span.set_status(Status(StatusCode.OK))
+
+def _use_span(span):
+    """
+    Makes `span` the current span for one step of a generator.
+    Errors are recorded by the wrappers themselves, so OTel must not record them twice.
+    """
+    from opentelemetry import trace as otel_trace
+
+    return otel_trace.use_span(
+        span, end_on_exit=False, record_exception=False, set_status_on_exception=False
+    )
+
+def trace(
+    func: Optional[Callable] = None,
+    *,
+    name: Optional[str] = None,
+    capture_args: bool = True,
+    capture_result: bool = True,
+    arg_serializer: Optional[Callable[[Any], Any]] = None,
+    redact: Optional[Iterable[str]] = None,
+    attributes: Optional[Dict[str, Any]] = None,
+) -> Callable:
     """
     Decorator to track the execution of a function as an OTel Span.
+    Usable bare (`@trace`) or with options (`@trace(name="embed", capture_args=False)`).
+
+    Coroutine functions, async generators and generators are supported: the span
+    stays open until the coroutine returns or the generator is exhausted (or closed),
+    so the recorded latency covers the real work and not just object creation.
+
+    When the SDK is disabled (`enabled=False` / AGENTBAY_DISABLED) or no tracer provider
+    is configured, calls go straight to the function.
+
+    Args:
+        name: Span name (defaults to the function name).
+        capture_args: Record `input.args` / `input.kwargs`. When False, arguments are never touched.
+        capture_result: Record `output`. When False, the result is never stringified.
+        arg_serializer: Called with each argument; its return value is recorded instead
+            (e.g. `lambda a: getattr(a, "shape", a)` for large arrays).
+        redact: Parameter names whose values are recorded as "[REDACTED]".
+        attributes: Static attributes set on every span (also visible to samplers).
     """
+    if func is None:
+        return functools.partial(
+            trace, name=name, capture_args=capture_args, capture_result=capture_result,
+            arg_serializer=arg_serializer, redact=redact, attributes=attributes,
+        )
+
+    options = _TraceOptions(func, name, capture_args, capture_result, arg_serializer, redact, attributes)
+
+    if inspect.iscoroutinefunction(func):
+        return _trace_coroutine(func, options)
+    if inspect.isasyncgenfunction(func):
+        return _trace_async_generator(func, options)
+    if inspect.isgeneratorfunction(func):
+        return _trace_generator(func, options)
+
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        # Get the tracer at runtime, so it uses the configured provider
-        tracer = otel_trace.get_tracer("agentbay")
-        
-        # Start a new span. 'start_as_current_span' automatically handles 
+        # Disabled: a single attribute check, then straight to the function
+        if not state.enabled:
+            return func(*args, **kwargs)
+        tracer = _tracers.get()
+        if tracer is None:
+            return func(*args, **kwargs)
+
+        # Start a new span. 'start_as_current_span' automatically handles
         # parent/child relationships if one function calls another.
-        with tracer.start_as_current_span(func.__name__) as span:
-            
+        with tracer.start_as_current_span(options.name, attributes=options.attributes) as span:
+
             # Record Inputs
-            # We convert to string to ensure it fits in a span attribute
-            span.set_attribute("code.function", func.__name__)
-            span.set_attribute("input.args", str(args))
-            span.set_attribute("input.kwargs", str(kwargs))
+            _record_inputs(span, options, args, kwargs)
 
             try:
                 # Run user function
                 result = func(*args, **kwargs)
-                
+
                 # Record Output
-                span.set_attribute("output", str(result))
-                span.set_status(Status(StatusCode.OK))
-                
+                _record_output(span, options, result)
+                _record_ok(span)
+
                 return result
 
             except Exception as e:
                 # Record Error
-                span.record_exception(e)
-                span.set_status(Status(StatusCode.ERROR, str(e)))
-                raise e
+                _record_error(span, e)
+                raise
+
+    return wrapper
+
+def _trace_coroutine(func: Callable, options: _TraceOptions) -> Callable:
+    """
+    Wraps an `async def` function. The span covers the awaited result,
+    and the coroutine runs inside it so nested spans get the right parent.
+    """
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        if not state.enabled:
+            return await func(*args, **kwargs)
+        tracer = _tracers.get()
+        if tracer is None:
+            return await func(*args, **kwargs)
+
+        with tracer.start_as_current_span(options.name, attributes=options.attributes) as span:
+            _record_inputs(span, options, args, kwargs)
+
+            try:
+                result = await func(*args, **kwargs)
+
+                _record_output(span, options, result)
+                _record_ok(span)
+
+                return result
+
+            except Exception as e:
+                _record_error(span, e)
+                raise
+
+    return wrapper
+
+def _trace_generator(func: Callable, options: _TraceOptions) -> Callable:
+    """
+    Wraps a generator function. The span starts on the first `next()` and ends
+    when the generator is exhausted, raises or is closed by the consumer.
+
+    The span is only made current while the generator body runs, never in between
+    items, so the consumer's own spans are not parented to it by accident.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        tracer = _tracers.get() if state.enabled else None
+        if tracer is None:
+            return (yield from func(*args, **kwargs))
+
+        span = tracer.start_span(options.name, attributes=options.attributes)
+        _record_inputs(span, options, args, kwargs)
+
+        count = 0
+        try:
+            with _use_span(span):
+                gen = func(*args, **kwargs)
+                item = next(gen)
+
+            while True:
+                count += 1
+                try:
+                    sent = yield item
+                except GeneratorExit:
+                    # Consumer stopped early (break, close() or garbage collection)
+                    with _use_span(span):
+                        gen.close()
+                    raise
+                except BaseException as e:
+                    with _use_span(span):
+                        item = gen.throw(e)
+                else:
+                    with _use_span(span):
+                        item = gen.send(sent)
+
+        except StopIteration as stop:
+            span.set_attribute("output.count", count)
+            if stop.value is not None:
+                _record_output(span, options, stop.value)
+            _record_ok(span)
+            return stop.value
+
+        except GeneratorExit:
+            span.set_attribute("output.count", count)
+            _record_ok(span)
+            raise
+
+        except Exception as e:
+            _record_error(span, e)
+            raise
+
+        finally:
+            span.end()
+
+    return wrapper
+
+def _trace_async_generator(func: Callable, options: _TraceOptions) -> Callable:
+    """
+    Wraps an async generator function. Same lifecycle as `_trace_generator`,
+    but every step is awaited on the caller's event loop (no thread hops).
+
+    There is no `yield from` for async generators, so when tracing is off the
+    same stepping runs without a span.
+    """
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        tracer = _tracers.get() if state.enabled else None
+        span = None
+        activate = contextlib.nullcontext
+        if tracer is not None:
+            span = tracer.start_span(options.name, attributes=options.attributes)
+            _record_inputs(span, options, args, kwargs)
+            activate = functools.partial(_use_span, span)
+
+        count = 0
+        try:
+            with activate():
+                agen = func(*args, **kwargs)
+                item = await agen.__anext__()
+
+            while True:
+                count += 1
+                try:
+                    sent = yield item
+                except GeneratorExit:
+                    with activate():
+                        await agen.aclose()
+                    raise
+                except BaseException as e:
+                    with activate():
+                        item = await agen.athrow(e)
+                else:
+                    with activate():
+                        item = await agen.asend(sent)
+
+        except StopAsyncIteration:
+            if span is not None:
+                span.set_attribute("output.count", count)
+                _record_ok(span)
+
+        except GeneratorExit:
+            if span is not None:
+                span.set_attribute("output.count", count)
+                _record_ok(span)
+            raise
+
+        except Exception as e:
+            if span is not None:
+                _record_error(span, e)
+            raise
+
+        finally:
+            if span is not None:
+                span.end()
 
     return wrapper
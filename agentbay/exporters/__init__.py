@@ -0,0 +1,20 @@
+from .deferred import DeferredAttributeExporter
+from .file import FILE_FORMATS, FileSpanExporter
+from .memory import MemorySpanExporter
+from .otlp import COMPRESSIONS, AgentBaySpanExporter
+
+# Where `agentbay.init(exporter=...)` sends spans
+EXPORTER_HTTP = "http"
+EXPORTER_FILE = "file"
+EXPORTER_MEMORY = "memory"
+EXPORTERS = (EXPORTER_HTTP, EXPORTER_FILE, EXPORTER_MEMORY)
+
+__all__ = [
+    "AgentBaySpanExporter",
+    "COMPRESSIONS",
+    "DeferredAttributeExporter",
+    "EXPORTERS",
+    "FILE_FORMATS",
+    "FileSpanExporter",
+    "MemorySpanExporter",
+]
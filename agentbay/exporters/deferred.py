@@ -0,0 +1,39 @@
+from typing import Sequence
+
+from opentelemetry.sdk.trace import ReadableSpan
+from opentelemetry.sdk.trace.export import SpanExporter, SpanExportResult
+
+from .. import serialization
+from ..utils import copy_span
+
+class DeferredAttributeExporter(SpanExporter):
+    """
+    Wraps another exporter and serializes attributes that were deferred by
+    `agentbay.serialization.set_attribute` right before export.
+
+    With a `BatchSpanProcessor` this runs on the export thread, so the cost of
+    stringifying prompts and responses never lands on the instrumented call.
+    """
+    def __init__(self, exporter: SpanExporter):
+        self.exporter = exporter
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        return self.exporter.export([self._materialize(span) for span in spans])
+
+    def _materialize(self, span: ReadableSpan) -> ReadableSpan:
+        ctx = span.context
+        entries = serialization.pending.pop((ctx.trace_id, ctx.span_id))
+        if not entries:
+            return span
+
+        attributes = {
+            key: serialization.serialize(value, max_bytes)
+            for key, value, max_bytes in entries
+        }
+        return copy_span(span, attributes)
+
+    def shutdown(self):
+        self.exporter.shutdown()
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return self.exporter.force_flush(timeout_millis)
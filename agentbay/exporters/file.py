@@ -0,0 +1,319 @@
+"""
+Local file capture of spans, for air-gapped hosts and high-volume batch jobs.
+
+`FileSpanExporter` writes each exported batch as one OTLP `ExportTraceServiceRequest`
+record to rotating files; `agentbay replay` (see `agentbay.cli`) uploads them later.
+
+Formats:
+- "protobuf" (`.pb`): records prefixed with their varint length (protobuf's delimited format).
+- "json" (`.jsonl`): one OTLP/JSON request per line (hex trace and span ids).
+
+A file is written as `<name>.part` and renamed once it is rotated or the exporter shuts
+down, so readers only pick up complete files.
+"""
+import base64
+import binascii
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+from opentelemetry.sdk.trace import ReadableSpan
+from opentelemetry.sdk.trace.export import SpanExporter, SpanExportResult
+
+logger = logging.getLogger(__name__)
+
+FORMAT_PROTOBUF = "protobuf"
+FORMAT_JSON = "json"
+FILE_FORMATS = (FORMAT_PROTOBUF, FORMAT_JSON)
+
+_SUFFIXES = {FORMAT_PROTOBUF: ".pb", FORMAT_JSON: ".jsonl"}
+PARTIAL_SUFFIX = ".part"
+
+# OTLP/JSON encodes these ids as hex; protobuf's JSON mapping would use base64
+_ID_FIELDS = ("traceId", "spanId", "parentSpanId")
+
+def _encode_varint(value: int) -> bytes:
+    out = bytearray()
+    while True:
+        bits = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(bits | 0x80)
+        else:
+            out.append(bits)
+            return bytes(out)
+
+def _convert_ids(request: Dict[str, Any], convert):
+    for resource_spans in request.get("resourceSpans", ()):
+        for scope_spans in resource_spans.get("scopeSpans", ()):
+            for span in scope_spans.get("spans", ()):
+                for item in [span, *span.get("links", ())]:
+                    for field in _ID_FIELDS:
+                        if item.get(field):
+                            item[field] = convert(item[field])
+
+def to_otlp_json(payload: bytes) -> str:
+    """
+    Converts an encoded `ExportTraceServiceRequest` to a single line of OTLP/JSON.
+    """
+    from google.protobuf.json_format import MessageToDict
+    from opentelemetry.proto.collector.trace.v1.trace_service_pb2 import ExportTraceServiceRequest
+
+    request = ExportTraceServiceRequest()
+    request.ParseFromString(payload)
+    data = MessageToDict(request, use_integers_for_enums=True)
+    _convert_ids(data, lambda value: base64.b64decode(value).hex())
+    return json.dumps(data, separators=(",", ":"))
+
+def from_otlp_json(line: str) -> bytes:
+    """
+    Converts a line of OTLP/JSON back to an encoded `ExportTraceServiceRequest`.
+    """
+    from google.protobuf.json_format import ParseDict
+    from opentelemetry.proto.collector.trace.v1.trace_service_pb2 import ExportTraceServiceRequest
+
+    data = json.loads(line)
+    _convert_ids(data, lambda value: base64.b64encode(binascii.unhexlify(value)).decode("ascii"))
+    return ParseDict(data, ExportTraceServiceRequest()).SerializeToString()
+
+def read_records(path: str) -> Iterator[bytes]:
+    """
+    Yields the encoded `ExportTraceServiceRequest`s stored in a capture file.
+    A record cut short (e.g. the process was killed mid-write) ends the file with a warning.
+    """
+    base = path[:-len(PARTIAL_SUFFIX)] if path.endswith(PARTIAL_SUFFIX) else path
+    if base.endswith(_SUFFIXES[FORMAT_JSON]):
+        with open(path, encoding="utf-8") as f:
+            for number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    yield from_otlp_json(line)
+                except ValueError:
+                    logger.warning("AgentBay SDK: Skipping invalid record on line %d of %s", number, path)
+        return
+
+    with open(path, "rb") as f:
+        data = f.read()
+    position = 0
+    while position < len(data):
+        length = shift = 0
+        while position < len(data):
+            byte = data[position]
+            position += 1
+            length |= (byte & 0x7F) << shift
+            shift += 7
+            if not byte & 0x80:
+                break
+        else:
+            logger.warning("AgentBay SDK: Truncated record at the end of %s", path)
+            return
+        if position + length > len(data):
+            logger.warning("AgentBay SDK: Truncated record at the end of %s", path)
+            return
+        yield data[position:position + length]
+        position += length
+
+def list_capture_files(paths: Sequence[str], include_partial: bool = False) -> List[str]:
+    """
+    Expands directories to the capture files they contain, oldest name first.
+    Files still being written (`.part`) are skipped unless `include_partial` is set.
+    """
+    suffixes = tuple(_SUFFIXES.values())
+    if include_partial:
+        suffixes += tuple(suffix + PARTIAL_SUFFIX for suffix in _SUFFIXES.values())
+
+    files: List[str] = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(
+                os.path.join(path, name) for name in os.listdir(path) if name.endswith(suffixes)
+            ))
+        else:
+            files.append(path)
+    return files
+
+def _any_value(value: Any) -> Any:
+    kind = value.WhichOneof("value")
+    if kind == "array_value":
+        return tuple(_any_value(item) for item in value.array_value.values)
+    if kind is None or kind == "kvlist_value":
+        return None
+    return getattr(value, kind)
+
+def read_spans(path: str) -> Iterator[ReadableSpan]:
+    """
+    Decodes the spans of a capture file back into `ReadableSpan`s (name, ids, parent,
+    times, attributes, status and kind), e.g. for `agentbay.analysis.analyze()`.
+    """
+    from opentelemetry.proto.collector.trace.v1.trace_service_pb2 import ExportTraceServiceRequest
+    from opentelemetry.trace import SpanContext, SpanKind, Status, StatusCode
+
+    for record in read_records(path):
+        request = ExportTraceServiceRequest()
+        request.ParseFromString(record)
+        for resource_spans in request.resource_spans:
+            for scope_spans in resource_spans.scope_spans:
+                for span in scope_spans.spans:
+                    trace_id = int.from_bytes(span.trace_id, "big")
+                    parent = None
+                    if span.parent_span_id:
+                        parent = SpanContext(trace_id, int.from_bytes(span.parent_span_id, "big"), is_remote=False)
+                    yield ReadableSpan(
+                        name=span.name,
+                        context=SpanContext(trace_id, int.from_bytes(span.span_id, "big"), is_remote=False),
+                        parent=parent,
+                        attributes={attribute.key: _any_value(attribute.value) for attribute in span.attributes},
+                        # OTLP kinds are the SDK kinds shifted by one (0 is "unspecified")
+                        kind=SpanKind(max(span.kind - 1, 0)),
+                        status=Status(StatusCode(span.status.code), span.status.message or None),
+                        start_time=span.start_time_unix_nano,
+                        end_time=span.end_time_unix_nano,
+                    )
+
+class FileSpanExporter(SpanExporter):
+    """
+    Writes span batches to rotating local files instead of sending them over the network.
+
+    Writes go through a `buffer_bytes` in-memory buffer, so a batch costs an encode and
+    a memory copy; the buffer is written out when it fills up, on rotation, `force_flush()`
+    and `shutdown()` (a crash loses at most the buffered records). A file is rotated once
+    it reaches `max_file_bytes`. File names carry the process id, so forked workers never
+    share a file.
+
+    Args:
+        directory: Where the files are written (created if missing).
+        format: "protobuf" (compact, default) or "json" (OTLP/JSON lines, human readable).
+        max_file_bytes: Size at which a file is closed and a new one started.
+        buffer_bytes: Size of the write buffer.
+        prefix: File name prefix.
+    """
+    def __init__(
+        self,
+        directory: str,
+        format: str = FORMAT_PROTOBUF,
+        max_file_bytes: int = 64 * 1024 * 1024,
+        buffer_bytes: int = 1024 * 1024,
+        prefix: str = "spans",
+    ):
+        if format not in FILE_FORMATS:
+            raise ValueError(f"Unknown file format {format!r}, expected one of {FILE_FORMATS}.")
+
+        self.directory = directory
+        self.format = format
+        self.max_file_bytes = max_file_bytes
+        self.buffer_bytes = buffer_bytes
+        self.prefix = prefix
+
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._fd: Optional[int] = None
+        self._path: Optional[str] = None
+        self._buffer = bytearray()
+        self._file_bytes = 0
+        self._sequence = 0
+        self._pid = os.getpid()
+        self._shutdown = False
+        self._stats: Dict[str, int] = {"file_batches": 0, "file_bytes": 0, "files_written": 0}
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        from opentelemetry.exporter.otlp.proto.common.trace_encoder import encode_spans
+
+        return self.export_serialized(encode_spans(spans).SerializeToString())
+
+    def export_serialized(self, payload: bytes) -> SpanExportResult:
+        """
+        Writes an already encoded `ExportTraceServiceRequest` (e.g. from the spill queue).
+        """
+        if self.format == FORMAT_JSON:
+            record = (to_otlp_json(payload) + "\n").encode("utf-8")
+        else:
+            record = _encode_varint(len(payload)) + payload
+
+        with self._lock:
+            if self._shutdown:
+                return SpanExportResult.FAILURE
+            try:
+                if self._pid != os.getpid():
+                    self._reset_after_fork()
+                if self._fd is None:
+                    self._open()
+                self._buffer += record
+                self._file_bytes += len(record)
+                self._stats["file_batches"] += 1
+                self._stats["file_bytes"] += len(record)
+                if self._file_bytes >= self.max_file_bytes:
+                    self._close()
+                elif len(self._buffer) >= self.buffer_bytes:
+                    self._flush()
+            except OSError as e:
+                logger.warning("AgentBay SDK Error: Failed to write spans to %s: %s", self._path, e)
+                return SpanExportResult.FAILURE
+        return SpanExportResult.SUCCESS
+
+    def _reset_after_fork(self):
+        # The parent's file and buffered records belong to the parent: drop them without
+        # writing (the buffer is a plain bytearray, so nothing flushes it behind our back)
+        if self._fd is not None:
+            os.close(self._fd)
+        self._fd = None
+        self._buffer = bytearray()
+        self._pid = os.getpid()
+
+    def _open(self):
+        self._sequence += 1
+        stamp = time.strftime("%Y%m%dT%H%M%S", time.gmtime())
+        name = f"{self.prefix}-{stamp}-{self._pid}-{self._sequence:06d}{_SUFFIXES[self.format]}"
+        self._path = os.path.join(self.directory, name)
+        self._fd = os.open(self._path + PARTIAL_SUFFIX, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        self._file_bytes = 0
+
+    def _flush(self):
+        view = memoryview(self._buffer)
+        while view:
+            written = os.write(self._fd, view)
+            view = view[written:]
+        view.release()
+        self._buffer.clear()
+
+    def _close(self):
+        if self._fd is None:
+            return
+        try:
+            self._flush()
+        finally:
+            os.close(self._fd)
+            self._fd = None
+        os.replace(self._path + PARTIAL_SUFFIX, self._path)
+        self._stats["files_written"] += 1
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Returns batches and bytes written, and the number of completed (rotated or closed) files.
+        """
+        with self._lock:
+            return dict(self._stats)
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        with self._lock:
+            if self._fd is None or self._pid != os.getpid():
+                return True
+            try:
+                self._flush()
+            except OSError as e:
+                logger.warning("AgentBay SDK Error: Failed to write spans to %s: %s", self._path, e)
+                return False
+        return True
+
+    def shutdown(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._reset_after_fork()
+            try:
+                self._close()
+            except OSError as e:
+                logger.warning("AgentBay SDK Error: Failed to close %s: %s", self._path, e)
+            self._shutdown = True
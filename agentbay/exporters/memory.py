@@ -0,0 +1,59 @@
+import collections
+import threading
+from typing import Deque, Dict, List, Sequence
+
+from opentelemetry.sdk.trace import ReadableSpan
+from opentelemetry.sdk.trace.export import SpanExporter, SpanExportResult
+
+from ..query import SpanQuery
+
+class MemorySpanExporter(SpanExporter):
+    """
+    Keeps the last `max_spans` finished spans in memory (a ring buffer: the oldest spans
+    are dropped first), for local profiling and performance assertions without a backend.
+
+    Enabled with `agentbay.init(exporter="memory")`; query the spans with `query()`.
+    """
+    def __init__(self, max_spans: int = 10000):
+        self.max_spans = max_spans
+        self._spans: Deque[ReadableSpan] = collections.deque(maxlen=max_spans)
+        self._lock = threading.Lock()
+        self._stats: Dict[str, int] = {"memory_spans_dropped": 0}
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        with self._lock:
+            overflow = len(self._spans) + len(spans) - self.max_spans
+            if overflow > 0:
+                self._stats["memory_spans_dropped"] += overflow
+            self._spans.extend(spans)
+        return SpanExportResult.SUCCESS
+
+    def get_finished_spans(self) -> List[ReadableSpan]:
+        """
+        Returns the buffered spans, oldest first.
+        """
+        with self._lock:
+            return list(self._spans)
+
+    def query(self) -> SpanQuery:
+        """
+        Returns a `SpanQuery` over a snapshot of the buffered spans.
+        """
+        return SpanQuery(self.get_finished_spans())
+
+    def clear(self):
+        with self._lock:
+            self._spans.clear()
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Returns the number of spans buffered (`memory_spans`) and dropped because the buffer was full.
+        """
+        with self._lock:
+            return {"memory_spans": len(self._spans), **self._stats}
+
+    def shutdown(self):
+        pass
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return True
@@ -0,0 +1,161 @@
+import gzip
+import logging
+import threading
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+from opentelemetry.sdk.trace import ReadableSpan
+from opentelemetry.sdk.trace.export import SpanExporter, SpanExportResult
+
+from ..utils import register_after_fork
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIONS = ("none", "gzip", "zstd")
+
+def _zstd_compressor(level: Optional[int]) -> Optional[Callable[[bytes], bytes]]:
+    """
+    Returns a zstd compress function if a zstd implementation is installed, else None.
+    """
+    try:
+        import zstandard
+
+        compressor = zstandard.ZstdCompressor(level=level if level is not None else 3)
+        return compressor.compress
+    except ImportError:
+        pass
+    try:
+        # Python 3.14+ standard library
+        from compression import zstd
+
+        return lambda data: zstd.compress(data, level=level)
+    except ImportError:
+        return None
+
+def resolve_compression(compression: str, level: Optional[int] = None) -> Tuple[str, Optional[Callable[[bytes], bytes]]]:
+    """
+    Maps a compression name to (Content-Encoding, compress function).
+    "zstd" falls back to gzip when no zstd implementation is installed.
+    """
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Unknown compression {compression!r}, expected one of {COMPRESSIONS}.")
+
+    if compression == "zstd":
+        compress = _zstd_compressor(level)
+        if compress is not None:
+            return "zstd", compress
+        logger.warning("AgentBay SDK: zstd compression requested but `zstandard` is not installed, using gzip.")
+        compression = "gzip"
+
+    if compression == "gzip":
+        gzip_level = level if level is not None else 6
+        return "gzip", lambda data: gzip.compress(data, compresslevel=gzip_level)
+
+    return "none", None
+
+class AgentBaySpanExporter(SpanExporter):
+    """
+    OTLP/HTTP (protobuf) span exporter tuned for large LLM payloads.
+
+    - Bodies are compressed (gzip by default, zstd when available); prompt and
+      response text typically shrinks by an order of magnitude.
+    - One `requests.Session` with a sized connection pool is reused for every
+      batch, so connections are kept alive instead of re-established per export.
+    - `get_stats()` reports bytes before and after compression.
+
+    Each call makes a single attempt; retries are left to the batch processor.
+    """
+    def __init__(
+        self,
+        endpoint: str,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: float = 10.0,
+        compression: str = "gzip",
+        compression_level: Optional[int] = None,
+        pool_connections: int = 1,
+        pool_maxsize: int = 4,
+        keep_alive: bool = True,
+        session=None,
+    ):
+        self.endpoint = endpoint
+        self.timeout = timeout
+        self.compression, self._compress = resolve_compression(compression, compression_level)
+
+        self.session = session or self._create_session(pool_connections, pool_maxsize)
+        self.session.headers.update(headers or {})
+        self.session.headers["Content-Type"] = "application/x-protobuf"
+        if self._compress is not None:
+            self.session.headers["Content-Encoding"] = self.compression
+        if not keep_alive:
+            self.session.headers["Connection"] = "close"
+
+        self._lock = threading.Lock()
+        self._stats: Dict[str, int] = {
+            "requests": 0,
+            "failed_requests": 0,
+            "bytes_uncompressed": 0,
+            "bytes_sent": 0,
+        }
+
+        # Pooled connections are shared with the parent after a fork; children open their own
+        register_after_fork(self._reset_connections)
+
+    def _reset_connections(self):
+        self._lock = threading.Lock()
+        for adapter in self.session.adapters.values():
+            poolmanager = getattr(adapter, "poolmanager", None)
+            if poolmanager is not None:
+                poolmanager.clear()
+
+    @staticmethod
+    def _create_session(pool_connections: int, pool_maxsize: int):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        from opentelemetry.exporter.otlp.proto.common.trace_encoder import encode_spans
+
+        payload = encode_spans(spans).SerializeToString()
+        return self.export_serialized(payload)
+
+    def export_serialized(self, payload: bytes) -> SpanExportResult:
+        """
+        Sends an already encoded `ExportTraceServiceRequest` (e.g. from the aggregator or spill queue).
+        """
+        body = self._compress(payload) if self._compress is not None else payload
+
+        try:
+            response = self.session.post(self.endpoint, data=body, timeout=self.timeout)
+            ok = response.ok
+            if not ok:
+                logger.warning("AgentBay SDK Error: Failed to export spans: HTTP %s %s", response.status_code, response.text[:200])
+        except Exception as e:
+            logger.warning("AgentBay SDK Error: Failed to export spans: %s", e)
+            ok = False
+
+        with self._lock:
+            self._stats["requests"] += 1
+            self._stats["bytes_uncompressed"] += len(payload)
+            self._stats["bytes_sent"] += len(body)
+            if not ok:
+                self._stats["failed_requests"] += 1
+
+        return SpanExportResult.SUCCESS if ok else SpanExportResult.FAILURE
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Returns request counts and payload bytes before (`bytes_uncompressed`) and after (`bytes_sent`) compression.
+        """
+        with self._lock:
+            return dict(self._stats)
+
+    def shutdown(self):
+        self.session.close()
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return True
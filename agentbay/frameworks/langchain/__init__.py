@@ -1,16 +1,31 @@
-from .callback import AgentBayCallbackHandler
+from typing import Any
+
+from ... import instrumentation
+
+# Handler classes are imported on first access (PEP 562), together with OpenTelemetry
+_LAZY = {
+    "AgentBayCallbackHandler": ".callback",
+    "AsyncAgentBayCallbackHandler": ".callback",
+    "RunRegistry": ".registry",
+}
 
 def instrument():
     """
     Auto-instruments LangChain by setting a global callback handler.
     Note: This requires the user to have 'langchain' installed.
+    Calling it again is a no-op; `uninstrument()` removes the handler.
     """
+    if instrumentation.is_instrumented("langchain"):
+        return
+
     try:
         # Try importing the global handler configuration
         # Note: This path changes often in LangChain versions.
         # We support the modern 'langchain_core' or 'langchain' approach.
         import langchain
         
+        from .callback import AgentBayCallbackHandler
+
         # Create our handler
         handler = AgentBayCallbackHandler()
         
@@ -22,6 +37,7 @@ def instrument():
         # If it's already a list, append
         if isinstance(langchain.callbacks, list):
             langchain.callbacks.append(handler)
+            instrumentation.on_uninstrument("langchain", lambda: langchain.callbacks.remove(handler))
         else:
             # If it's something else (manager?), we might just print a warning
             # For now, we assume standard usage.
@@ -30,4 +46,17 @@ def instrument():
     except ImportError:
         pass
 
-__all__ = ["AgentBayCallbackHandler", "instrument"]
+def __getattr__(name: str) -> Any:
+    if name in _LAZY:
+        import importlib
+
+        return getattr(importlib.import_module(_LAZY[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def uninstrument():
+    """
+    Removes the global callback handler added by `instrument()`.
+    """
+    instrumentation.uninstrument("langchain")
+
+__all__ = ["AgentBayCallbackHandler", "AsyncAgentBayCallbackHandler", "RunRegistry", "instrument", "uninstrument"]
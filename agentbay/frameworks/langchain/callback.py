@@ -1,100 +1,319 @@
+import time
 from typing import Any, Dict, List, Optional, Union
-from uuid import UUID
 
+from opentelemetry import context as otel_context
 from opentelemetry import trace
 from opentelemetry.trace import Status, StatusCode
 
+from ... import pricing
+from ...metrics import record_llm_call
+from ...runtime import state
+from ...serialization import serialize, set_attribute
+from ...streaming import StreamMetrics
+from .registry import RunRegistry
+
 # Try to import BaseCallbackHandler. If not available, we create a dummy class
 # so the code doesn't crash on import (though instrument() will check this).
 try:
-    from langchain_core.callbacks import BaseCallbackHandler
+    from langchain_core.callbacks import AsyncCallbackHandler, BaseCallbackHandler
     from langchain_core.outputs import LLMResult
 except ImportError:
     class BaseCallbackHandler:
         pass
+    class AsyncCallbackHandler:
+        pass
     LLMResult = Any
 
 tracer = trace.get_tracer("agentbay.frameworks.langchain")
 
-class AgentBayCallbackHandler(BaseCallbackHandler):
+def _run_name(serialized: Optional[Dict[str, Any]], kwargs: Dict[str, Any], default: str) -> str:
+    # Runnables pass their name as a keyword; `serialized` may be None for them
+    return kwargs.get("name") or (serialized or {}).get("name") or default
+
+def _model_name(kwargs: Dict[str, Any]) -> Optional[str]:
+    params = kwargs.get("invocation_params") or {}
+    return params.get("model_name") or params.get("model")
+
+class _LLMRun:
     """
-    Callback handler for LangChain that sends telemetry to AgentBay via OpenTelemetry.
+    Registry data of an LLM / chat model run: stream timing and the model for metrics.
     """
-    def __init__(self):
+    __slots__ = ("stream", "model")
+
+    def __init__(self, model: Optional[str]):
+        self.stream = StreamMetrics()
+        self.model = model
+
+    def record_call(self, span: Any, usage: Dict[str, Any], error: Optional[BaseException] = None):
+        """
+        Records the estimated cost on the span, and the run in the metrics (for every run, sampled or not).
+        """
+        prompt_tokens = usage.get("prompt_tokens")
+        completion_tokens = usage.get("completion_tokens")
+        cost = pricing.cost(self.model, prompt_tokens, completion_tokens)
+        if cost is not None and span is not None:
+            span.set_attribute("llm.usage.cost_usd", cost)
+        record_llm_call(
+            "langchain", self.model, time.perf_counter() - self.stream.start,
+            prompt_tokens, completion_tokens, error, cost,
+        )
+
+class _RunCallbacks:
+    """
+    Span bookkeeping shared by the sync and async handlers. None of these
+    callbacks block: they only start, annotate and end spans.
+
+    Every run (chain, LLM, chat model, tool, retriever) becomes a span. Runs are linked
+    through `parent_run_id`, so a multi-step agent shows up as one trace; top-level runs
+    are children of the span that is current when they start (e.g. a `@trace` function).
+    While the SDK is disabled (`agentbay.init(enabled=False)`), runs start no spans.
+
+    Args:
+        run_ttl_seconds: Runs that never end (cancelled, crashed) are ended with an error after this long.
+        max_runs: Maximum number of open runs; beyond it, the oldest run is ended with an error.
+    """
+    def __init__(self, run_ttl_seconds: float = 3600.0, max_runs: int = 10000):
         super().__init__()
         # We need to track active spans by run_id to close them later
-        self.spans: Dict[UUID, trace.Span] = {}
+        self.spans = RunRegistry(ttl_seconds=run_ttl_seconds, max_runs=max_runs)
+
+    def _start_run(self, name: str, kwargs: Dict[str, Any], data: Any = None) -> trace.Span:
+        """
+        Starts the span of a run as a child of its parent run's span, if that is known.
+        """
+        parent = self.spans.get(kwargs.get("parent_run_id"))
+        ctx = trace.set_span_in_context(parent) if parent is not None else otel_context.get_current()
+        span = tracer.start_span(name, context=ctx)
+
+        run_id = kwargs.get("run_id")
+        if run_id:
+            self.spans.add(run_id, span, data)
+        return span
+
+    def _fail_run(self, error: BaseException, kwargs: Dict[str, Any]):
+        span = self.spans.pop(kwargs.get("run_id"))
+        if span:
+            span.record_exception(error)
+            span.set_status(Status(StatusCode.ERROR, str(error)))
+            span.end()
+
+    # LLMs and chat models
 
     def on_llm_start(
         self, serialized: Dict[str, Any], prompts: List[str], **kwargs: Any
     ) -> Any:
         """Run when LLM starts running."""
-        run_id = kwargs.get("run_id")
-        name = "langchain.llm"
-        
-        # Start Span
-        span = tracer.start_span(name)
+        if not state.enabled:
+            return
+        model = _model_name(kwargs)
+        span = self._start_run("langchain.llm", kwargs, _LLMRun(model))
         span.set_attribute("llm.system", "langchain")
-        span.set_attribute("llm.prompts", str(prompts))
-        
-        if run_id:
-            self.spans[run_id] = span
+        if model:
+            span.set_attribute("llm.request.model", model)
+        set_attribute(span, "llm.prompts", prompts)
+
+    def on_chat_model_start(
+        self, serialized: Dict[str, Any], messages: List[List[Any]], **kwargs: Any
+    ) -> Any:
+        """Run when a chat model starts running."""
+        if not state.enabled:
+            return
+        model = _model_name(kwargs)
+        span = self._start_run("langchain.chat_model", kwargs, _LLMRun(model))
+        span.set_attribute("llm.system", "langchain")
+        if model:
+            span.set_attribute("llm.request.model", model)
+        set_attribute(span, "llm.prompts", messages)
+
+    def on_llm_new_token(self, token: str, **kwargs: Any) -> Any:
+        """Run on each streamed token: only a clock read, attributes are set when the run ends."""
+        run = self.spans.get_data(kwargs.get("run_id"))
+        if run is not None:
+            run.stream.tick()
 
     def on_llm_end(self, response: LLMResult, **kwargs: Any) -> Any:
         """Run when LLM ends running."""
-        run_id = kwargs.get("run_id")
-        span = self.spans.pop(run_id, None)
-        
+        span, run = self.spans.pop_run(kwargs.get("run_id"))
+
         if span:
             # Record Output
             # LangChain response structure is complex, we simplify it for now
-            span.set_attribute("llm.output", str(response))
+            set_attribute(span, "llm.output", response)
+
+            usage = (getattr(response, "llm_output", None) or {}).get("token_usage") or {}
+            for key in ("prompt_tokens", "completion_tokens", "total_tokens"):
+                if isinstance(usage.get(key), int):
+                    span.set_attribute(f"llm.usage.{key}", usage[key])
+
+            if run is not None:
+                run.stream.record(span, usage.get("completion_tokens"))
+                run.record_call(span, usage)
             span.set_status(Status(StatusCode.OK))
             span.end()
 
     def on_llm_error(self, error: BaseException, **kwargs: Any) -> Any:
         """Run when LLM errors."""
-        run_id = kwargs.get("run_id")
-        span = self.spans.pop(run_id, None)
-        
-        if span:
-            span.record_exception(error)
-            span.set_status(Status(StatusCode.ERROR, str(error)))
-            span.end()
+        run = self.spans.get_data(kwargs.get("run_id"))
+        if run is not None:
+            run.record_call(None, {}, error)
+        self._fail_run(error, kwargs)
+
+    # Chains (and agents, which run as chains)
 
     def on_chain_start(
         self, serialized: Dict[str, Any], inputs: Dict[str, Any], **kwargs: Any
     ) -> Any:
         """Run when chain starts running."""
-        run_id = kwargs.get("run_id")
+        if not state.enabled:
+            return
         # Use the chain class name if available
-        name = serialized.get("name", "langchain.chain")
-        
-        span = tracer.start_span(name)
-        span.set_attribute("langchain.inputs", str(inputs))
-        
-        if run_id:
-            self.spans[run_id] = span
+        span = self._start_run(_run_name(serialized, kwargs, "langchain.chain"), kwargs)
+        set_attribute(span, "langchain.inputs", inputs)
 
     def on_chain_end(self, outputs: Dict[str, Any], **kwargs: Any) -> Any:
         """Run when chain ends running."""
-        run_id = kwargs.get("run_id")
-        span = self.spans.pop(run_id, None)
-        
+        span = self.spans.pop(kwargs.get("run_id"))
+
         if span:
-            span.set_attribute("langchain.outputs", str(outputs))
+            set_attribute(span, "langchain.outputs", outputs)
             span.set_status(Status(StatusCode.OK))
             span.end()
 
     def on_chain_error(self, error: BaseException, **kwargs: Any) -> Any:
         """Run when chain errors."""
-        run_id = kwargs.get("run_id")
-        span = self.spans.pop(run_id, None)
-        
+        self._fail_run(error, kwargs)
+
+    def on_agent_action(self, action: Any, **kwargs: Any) -> Any:
+        """Run when an agent decides on a tool call: recorded as an event on the agent's span."""
+        span = self.spans.get(kwargs.get("run_id"))
+        if span and span.is_recording():
+            span.add_event("agent.action", {
+                "agent.tool": str(getattr(action, "tool", "")),
+                "agent.tool_input": serialize(getattr(action, "tool_input", "")),
+            })
+
+    def on_agent_finish(self, finish: Any, **kwargs: Any) -> Any:
+        """Run when an agent returns its final answer."""
+        span = self.spans.get(kwargs.get("run_id"))
+        if span and span.is_recording():
+            span.add_event("agent.finish", {
+                "agent.output": serialize(getattr(finish, "return_values", "")),
+            })
+
+    # Tools
+
+    def on_tool_start(
+        self, serialized: Dict[str, Any], input_str: str, **kwargs: Any
+    ) -> Any:
+        """Run when tool starts running."""
+        if not state.enabled:
+            return
+        name = _run_name(serialized, kwargs, "tool")
+        span = self._start_run(f"langchain.tool.{name}", kwargs)
+        span.set_attribute("langchain.tool.name", name)
+        set_attribute(span, "langchain.inputs", kwargs.get("inputs") or input_str)
+
+    def on_tool_end(self, output: Any, **kwargs: Any) -> Any:
+        """Run when tool ends running."""
+        span = self.spans.pop(kwargs.get("run_id"))
         if span:
-            span.record_exception(error)
-            span.set_status(Status(StatusCode.ERROR, str(error)))
+            set_attribute(span, "langchain.outputs", output)
+            span.set_status(Status(StatusCode.OK))
             span.end()
 
-    # We can add on_tool_start / on_tool_end similarly
+    def on_tool_error(self, error: BaseException, **kwargs: Any) -> Any:
+        """Run when tool errors."""
+        self._fail_run(error, kwargs)
+
+    # Retrievers
+
+    def on_retriever_start(
+        self, serialized: Dict[str, Any], query: str, **kwargs: Any
+    ) -> Any:
+        """Run when retriever starts running."""
+        if not state.enabled:
+            return
+        span = self._start_run(_run_name(serialized, kwargs, "langchain.retriever"), kwargs)
+        set_attribute(span, "langchain.retriever.query", query)
+
+    def on_retriever_end(self, documents: Union[List[Any], Any], **kwargs: Any) -> Any:
+        """Run when retriever ends running."""
+        span = self.spans.pop(kwargs.get("run_id"))
+        if span:
+            if isinstance(documents, list):
+                span.set_attribute("langchain.retriever.document_count", len(documents))
+            set_attribute(span, "langchain.outputs", documents)
+            span.set_status(Status(StatusCode.OK))
+            span.end()
+
+    def on_retriever_error(self, error: BaseException, **kwargs: Any) -> Any:
+        """Run when retriever errors."""
+        self._fail_run(error, kwargs)
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Returns the number of open runs (`live_runs`) and of orphaned runs reaped or evicted.
+        """
+        return self.spans.get_stats()
+
+class AgentBayCallbackHandler(_RunCallbacks, BaseCallbackHandler):
+    """
+    Callback handler for LangChain that sends telemetry to AgentBay via OpenTelemetry.
+    Use `AsyncAgentBayCallbackHandler` for async chains (`ainvoke`, `astream`).
+    """
+
+class AsyncAgentBayCallbackHandler(_RunCallbacks, AsyncCallbackHandler):
+    """
+    Async variant of `AgentBayCallbackHandler` for `ainvoke` / `astream` pipelines.
+
+    LangChain runs sync handlers of async chains in a thread pool, one executor hop per
+    event (per token when streaming). This handler's callbacks are coroutines that do
+    the same bookkeeping inline on the event loop instead.
+    """
+    async def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], **kwargs: Any) -> None:
+        _RunCallbacks.on_llm_start(self, serialized, prompts, **kwargs)
+
+    async def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[List[Any]], **kwargs: Any) -> None:
+        _RunCallbacks.on_chat_model_start(self, serialized, messages, **kwargs)
+
+    async def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        _RunCallbacks.on_llm_new_token(self, token, **kwargs)
+
+    async def on_llm_end(self, response: LLMResult, **kwargs: Any) -> None:
+        _RunCallbacks.on_llm_end(self, response, **kwargs)
+
+    async def on_llm_error(self, error: BaseException, **kwargs: Any) -> None:
+        _RunCallbacks.on_llm_error(self, error, **kwargs)
+
+    async def on_chain_start(self, serialized: Dict[str, Any], inputs: Dict[str, Any], **kwargs: Any) -> None:
+        _RunCallbacks.on_chain_start(self, serialized, inputs, **kwargs)
+
+    async def on_chain_end(self, outputs: Dict[str, Any], **kwargs: Any) -> None:
+        _RunCallbacks.on_chain_end(self, outputs, **kwargs)
+
+    async def on_chain_error(self, error: BaseException, **kwargs: Any) -> None:
+        _RunCallbacks.on_chain_error(self, error, **kwargs)
+
+    async def on_agent_action(self, action: Any, **kwargs: Any) -> None:
+        _RunCallbacks.on_agent_action(self, action, **kwargs)
+
+    async def on_agent_finish(self, finish: Any, **kwargs: Any) -> None:
+        _RunCallbacks.on_agent_finish(self, finish, **kwargs)
+
+    async def on_tool_start(self, serialized: Dict[str, Any], input_str: str, **kwargs: Any) -> None:
+        _RunCallbacks.on_tool_start(self, serialized, input_str, **kwargs)
+
+    async def on_tool_end(self, output: Any, **kwargs: Any) -> None:
+        _RunCallbacks.on_tool_end(self, output, **kwargs)
+
+    async def on_tool_error(self, error: BaseException, **kwargs: Any) -> None:
+        _RunCallbacks.on_tool_error(self, error, **kwargs)
+
+    async def on_retriever_start(self, serialized: Dict[str, Any], query: str, **kwargs: Any) -> None:
+        _RunCallbacks.on_retriever_start(self, serialized, query, **kwargs)
+
+    async def on_retriever_end(self, documents: Union[List[Any], Any], **kwargs: Any) -> None:
+        _RunCallbacks.on_retriever_end(self, documents, **kwargs)
 
+    async def on_retriever_error(self, error: BaseException, **kwargs: Any) -> None:
+        _RunCallbacks.on_retriever_error(self, error, **kwargs)
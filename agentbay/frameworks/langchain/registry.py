@@ -0,0 +1,229 @@
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from uuid import UUID
+
+from opentelemetry import trace
+from opentelemetry.trace import Status, StatusCode
+
+from ...utils import register_after_fork
+
+# How often the background reaper checks the registries for expired runs, in seconds
+REAPER_INTERVAL = 1.0
+
+# Registries of the live handlers, checked by a single reaper thread (started with the
+# first registry, and stopped once none are left)
+_registries: "weakref.WeakSet[RunRegistry]" = weakref.WeakSet()
+_registries_lock = threading.Lock()
+_reaper: Optional[threading.Thread] = None
+
+class RunRegistry:
+    """
+    Open spans of a callback handler, keyed by LangChain `run_id`.
+
+    LangChain doesn't always fire the matching `*_end` / `*_error` callback (cancelled
+    tasks, crashed workers, aborted streams), so the registry is bounded:
+
+    - runs open for longer than `ttl_seconds` are reaped: their span is ended with an
+      error status. Expired runs are checked at most once per `reap_interval` seconds,
+      by a background thread (so runs are reaped even when no new run starts) and on
+      `add()`, and by an explicit `reap()`.
+    - beyond `max_runs`, the oldest run is evicted the same way.
+
+    Safe to use from several threads. Supports the dict operations the handler used
+    on its former `spans` dict (`[]`, `get`, `pop`, `in`, `len`).
+    """
+    def __init__(self, ttl_seconds: float = 3600.0, max_runs: int = 10000, reap_interval: float = 1.0):
+        self.ttl_seconds = ttl_seconds
+        self.max_runs = max_runs
+        self.reap_interval = reap_interval
+
+        # run_id -> (span, start time, per-run data). Insertion order is start order,
+        # so expired runs are always at the front.
+        self._runs: "OrderedDict[UUID, Tuple[trace.Span, float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._next_reap = 0.0
+        self._stats: Dict[str, int] = {"reaped_runs": 0, "evicted_runs": 0}
+
+        register_after_fork(self._at_fork_reinit)
+        _track(self)
+
+    def _at_fork_reinit(self):
+        """
+        Runs in a forked child: the open runs belong to the parent, which ends them.
+        """
+        self._runs = OrderedDict()
+        self._lock = threading.Lock()
+        self._next_reap = 0.0
+
+    def add(self, run_id: UUID, span: trace.Span, data: Any = None):
+        """
+        Registers the span of a run that just started, with optional per-run `data`
+        (e.g. streaming metrics) that is dropped together with the run.
+        """
+        now = time.monotonic()
+        orphans: List[Tuple[trace.Span, str]] = []
+        restart = False
+        with self._lock:
+            self._runs[run_id] = (span, now, data)
+            self._runs.move_to_end(run_id)
+            if now >= self._next_reap:
+                orphans.extend(self._expire(now))
+                restart = _reaper is None
+            while len(self._runs) > self.max_runs:
+                _, (old, _, _) = self._runs.popitem(last=False)
+                self._stats["evicted_runs"] += 1
+                orphans.append((old, f"LangChain run evicted: more than {self.max_runs} runs open"))
+
+        # Ending a span runs span processors, keep that outside the lock
+        for orphan, reason in orphans:
+            _end_orphan(orphan, reason)
+        if restart:
+            _track(self)
+
+    def _expire(self, now: float) -> List[Tuple[trace.Span, str]]:
+        """
+        Removes runs older than the TTL. Called with the lock held.
+        """
+        self._next_reap = now + self.reap_interval
+        expired = []
+        deadline = now - self.ttl_seconds
+        while self._runs:
+            run_id, (span, started, _) = next(iter(self._runs.items()))
+            if started > deadline:
+                break
+            del self._runs[run_id]
+            self._stats["reaped_runs"] += 1
+            expired.append((span, f"LangChain run never ended (reaped after {self.ttl_seconds:g}s)"))
+        return expired
+
+    def _reap_due(self, now: float):
+        """
+        Called by the reaper thread: reaps expired runs unless that was done recently.
+        """
+        with self._lock:
+            if now < self._next_reap:
+                return
+            orphans = self._expire(now)
+        for orphan, reason in orphans:
+            _end_orphan(orphan, reason)
+
+    def reap(self) -> int:
+        """
+        Ends the spans of all expired runs now. Returns how many were reaped.
+        """
+        with self._lock:
+            orphans = self._expire(time.monotonic())
+        for orphan, reason in orphans:
+            _end_orphan(orphan, reason)
+        return len(orphans)
+
+    def get(self, run_id: Optional[UUID], default: Optional[trace.Span] = None) -> Optional[trace.Span]:
+        with self._lock:
+            entry = self._runs.get(run_id)
+        return entry[0] if entry is not None else default
+
+    def pop(self, run_id: Optional[UUID], default: Optional[trace.Span] = None) -> Optional[trace.Span]:
+        """
+        Removes and returns the span of a run that ended.
+        """
+        with self._lock:
+            entry = self._runs.pop(run_id, None)
+        return entry[0] if entry is not None else default
+
+    def get_data(self, run_id: Optional[UUID]) -> Any:
+        """
+        Returns the `data` registered with a run, or None.
+        """
+        with self._lock:
+            entry = self._runs.get(run_id)
+        return entry[2] if entry is not None else None
+
+    def pop_run(self, run_id: Optional[UUID]) -> Tuple[Optional[trace.Span], Any]:
+        """
+        Removes a run that ended and returns (span, data), or (None, None) if unknown.
+        """
+        with self._lock:
+            entry = self._runs.pop(run_id, None)
+        return (entry[0], entry[2]) if entry is not None else (None, None)
+
+    def __getitem__(self, run_id: UUID) -> trace.Span:
+        with self._lock:
+            return self._runs[run_id][0]
+
+    def __setitem__(self, run_id: UUID, span: trace.Span):
+        self.add(run_id, span)
+
+    def __contains__(self, run_id: object) -> bool:
+        with self._lock:
+            return run_id in self._runs
+
+    def __len__(self) -> int:
+        return len(self._runs)
+
+    def __iter__(self) -> Iterator[UUID]:
+        with self._lock:
+            return iter(list(self._runs))
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Returns the number of open runs (`live_runs`) and of runs reaped or evicted so far.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["live_runs"] = len(self._runs)
+            return stats
+
+def _track(registry: RunRegistry):
+    global _reaper
+    with _registries_lock:
+        _registries.add(registry)
+        if _reaper is None:
+            _reaper = threading.Thread(target=_reap_loop, name="agentbay-langchain-reaper", daemon=True)
+            _reaper.start()
+
+def _reap_loop():
+    global _reaper
+    while True:
+        time.sleep(REAPER_INTERVAL)
+        with _registries_lock:
+            registries = list(_registries)
+            if not registries:
+                _reaper = None
+                return
+        now = time.monotonic()
+        for registry in registries:
+            registry._reap_due(now)  # pylint: disable=protected-access
+        del registries
+
+def _reinit_reaper():
+    """
+    Runs in a forked child: the reaper thread didn't survive the fork. The next `add()`
+    starts a new one, once the registries have reset their own locks.
+    """
+    global _registries_lock, _reaper
+    _registries_lock = threading.Lock()
+    _reaper = None
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reinit_reaper)
+
+def get_run_stats() -> Dict[str, int]:
+    """
+    Returns the stats of all live registries added up (see `RunRegistry.get_stats()`),
+    or an empty dict if there are none. Reported as the `langchain.runs.*` metrics.
+    """
+    with _registries_lock:
+        registries = list(_registries)
+    totals: Dict[str, int] = {}
+    for registry in registries:
+        for key, value in registry.get_stats().items():
+            totals[key] = totals.get(key, 0) + value
+    return totals
+
+def _end_orphan(span: trace.Span, reason: str):
+    span.set_status(Status(StatusCode.ERROR, reason))
+    span.end()
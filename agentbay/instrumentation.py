@@ -0,0 +1,143 @@
+"""
+Registry of the patches applied by the `instrument()` functions of the integrations.
+
+Wrapping goes through `wrap_method`, which marks each wrapper and records what it
+replaced. This makes `instrument()` idempotent (a method that already carries an
+AgentBay wrapper is left alone, so repeated calls don't stack wrappers) and lets
+`uninstrument()` put the originals back at runtime, e.g. to shed load without a restart.
+
+A wrapper that someone else patched over can't be taken out of their chain: `uninstrument()`
+makes it inert instead (wrappers check `is_inert()` and call straight through), and
+`instrument()` turns it back on rather than stacking a second wrapper.
+"""
+import importlib
+import inspect
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Set on every wrapper installed by `wrap_method`
+_MARKER = "__agentbay_wrapped__"
+_ORIGINAL = "__agentbay_original__"
+_INERT = "__agentbay_inert__"
+
+# Integrations that `instrument()` / `uninstrument()` know about, by module
+INTEGRATIONS = {
+    "openai": "agentbay.llms.openai",
+    "gemini": "agentbay.llms.gemini",
+    "langchain": "agentbay.frameworks.langchain",
+}
+
+_lock = threading.RLock()
+# integration -> {(owner, attribute): installed wrapper}
+_patches: Dict[str, Dict[Tuple[Any, str], Any]] = {}
+# integration -> cleanup callbacks for anything that isn't a method patch
+_cleanups: Dict[str, List[Callable[[], None]]] = {}
+
+def is_wrapped(func: Any) -> bool:
+    return getattr(func, _MARKER, False) is True
+
+def is_inert(wrapper: Any) -> bool:
+    """
+    Whether `wrapper` was uninstrumented while patched over; it should then only call the original.
+    """
+    return getattr(wrapper, _INERT, False)
+
+def _wraps(func: Any, wrapper: Any) -> bool:
+    """
+    Whether `wrapper` is reached through the `__wrapped__` chain of `func`
+    (set by `functools.wraps`, wrapt and most other patching libraries).
+    """
+    try:
+        return inspect.unwrap(func, stop=lambda f: f is wrapper) is wrapper
+    except ValueError:  # cycle
+        return False
+
+def wrap_method(integration: str, owner: Any, attribute: str, make_wrapper: Callable[[Any], Any]) -> bool:
+    """
+    Replaces `owner.attribute` with `make_wrapper(original)`, unless it is already an
+    AgentBay wrapper. Returns True if the method was wrapped by this call.
+    """
+    with _lock:
+        original = getattr(owner, attribute)
+        inert = _patches.get(integration, {}).get((owner, attribute))
+        if inert is not None and is_inert(inert) and _wraps(original, inert):
+            # Still in place beneath someone else's patch: turn it back on
+            setattr(inert, _INERT, False)
+            return True
+        if is_wrapped(original):
+            return False
+
+        wrapper = make_wrapper(original)
+        setattr(wrapper, _MARKER, True)
+        setattr(wrapper, _ORIGINAL, original)
+        setattr(wrapper, _INERT, False)
+        setattr(owner, attribute, wrapper)
+        _patches.setdefault(integration, {})[(owner, attribute)] = wrapper
+        return True
+
+def on_uninstrument(integration: str, cleanup: Callable[[], None]):
+    """
+    Registers a callback that undoes something an integration set up (e.g. a global handler).
+    """
+    with _lock:
+        _cleanups.setdefault(integration, []).append(cleanup)
+
+def is_instrumented(integration: str) -> bool:
+    with _lock:
+        return any(
+            getattr(owner, attribute, None) is wrapper
+            or (not is_inert(wrapper) and _wraps(getattr(owner, attribute, None), wrapper))
+            for (owner, attribute), wrapper in _patches.get(integration, {}).items()
+        ) or bool(_cleanups.get(integration))
+
+def _restore(integration: str):
+    with _lock:
+        patches = _patches.pop(integration, {})
+        cleanups = _cleanups.pop(integration, [])
+
+    buried = {}
+    for (owner, attribute), wrapper in patches.items():
+        current = getattr(owner, attribute, None)
+        if current is wrapper:
+            setattr(owner, attribute, getattr(wrapper, _ORIGINAL))
+        else:
+            # Replaced or re-wrapped by someone else since: restoring would drop their patch.
+            # If it's still called through theirs, it only passes calls on from now on.
+            logger.warning("AgentBay SDK: %s.%s was patched after AgentBay, leaving it in place", owner, attribute)
+            setattr(wrapper, _INERT, True)
+            if _wraps(current, wrapper):
+                buried[(owner, attribute)] = wrapper
+
+    if buried:
+        # Kept, so that `instrument()` turns them back on instead of wrapping again
+        with _lock:
+            _patches.setdefault(integration, {}).update(buried)
+
+    for cleanup in reversed(cleanups):
+        try:
+            cleanup()
+        except Exception as e:
+            logger.warning("AgentBay SDK Error: Failed to uninstrument %s: %s", integration, e)
+
+def instrument(*integrations: str):
+    """
+    Instruments the given integrations ("openai", "gemini", "langchain"), or all of them.
+    Libraries that aren't installed are skipped; calling this again is a no-op.
+    """
+    for name in integrations or tuple(INTEGRATIONS):
+        if name not in INTEGRATIONS:
+            raise ValueError(f"Unknown integration {name!r}. Expected one of: {', '.join(INTEGRATIONS)}.")
+        importlib.import_module(INTEGRATIONS[name]).instrument()
+
+def uninstrument(*integrations: str):
+    """
+    Restores the original methods of the given integrations, or of all of them.
+    Spans already started still end normally.
+    """
+    with _lock:
+        names = integrations or tuple(set(_patches) | set(_cleanups))
+    for name in names:
+        _restore(name)
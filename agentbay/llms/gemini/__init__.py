@@ -1,10 +1,14 @@
-from .chat import instrument_chat
+from typing import Any
+
+from ... import instrumentation
 
 def instrument():
     """
     Auto-instruments the Google Gemini SDK.
     Call this function after `agentbay.init()` and before using `google.generativeai`.
     """
+    from .chat import instrument_chat
+
     # We try to import google.generativeai here to ensure it's available
     try:
         import google.generativeai as genai
@@ -12,3 +16,17 @@ def instrument():
     except ImportError:
         # If google.generativeai is not installed, we simply do nothing or could log a warning
         pass
+
+def __getattr__(name: str) -> Any:
+    # PEP 562: the instrumentation code (and OpenTelemetry) is only imported when used
+    if name == "instrument_chat":
+        from .chat import instrument_chat
+
+        return instrument_chat
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def uninstrument():
+    """
+    Restores the original Gemini methods (and gRPC, if AgentBay instrumented it).
+    """
+    instrumentation.uninstrument("gemini")
@@ -1,22 +1,385 @@
-from typing import Any
+from contextvars import ContextVar
+from typing import Any, Dict, Optional, Tuple
 import functools
 import json
+import time
 from opentelemetry import trace
 from opentelemetry.trace import Status, StatusCode
 
+from ... import pricing
+from ...instrumentation import is_inert, on_uninstrument, wrap_method
+from ...metrics import record_llm_call
+from ...runtime import state
+from ...serialization import serialize, set_attribute
+from ...streaming import StreamMetrics
+
 # Get our tracer
 tracer = trace.get_tracer("agentbay.llms.gemini")
 
+# Set while a traced Gemini call runs. `ChatSession.send_message` calls `generate_content`
+# (several times with automatic function calling); those calls belong to the turn's span.
+_in_traced_call: ContextVar[bool] = ContextVar("agentbay_gemini_in_traced_call", default=False)
+
+def _record_request(span, model: str, contents: Any, tools: Any, stream: bool):
+    """
+    Records the request attributes shared by all Gemini calls.
+    """
+    # 1. Record Input Attributes (Semantic Conventions)
+    span.set_attribute("llm.system", "gemini")
+    span.set_attribute("llm.request.model", model)
+    if stream:
+        span.set_attribute("llm.request.stream", True)
+
+    # We can serialize complex objects (contents) to a size-capped string for now
+    # In future, we might map them to specific OTel semantic events
+    set_attribute(span, "llm.request.messages", contents)
+
+    # Track tools if provided to agent
+    if tools and span.is_recording():
+        try:
+            tools_str = json.dumps(tools) if isinstance(tools, (list, dict)) else str(tools)
+        except (TypeError, ValueError):
+            # Fallback to string representation if JSON serialization fails
+            tools_str = str(tools)
+        span.set_attribute("llm.request.tools", serialize(tools_str))
+        if isinstance(tools, list):
+            span.set_attribute("llm.request.tool_count", len(tools))
+
+def _record_function_calls(span, candidate: Any):
+    """
+    Serializes all function calls of a candidate as JSON for complete tracking.
+    """
+    function_calls_data = []
+    for func_call in candidate.function_calls:
+        func_data = {
+            'name': getattr(func_call, 'name', None),
+        }
+        # Handle arguments - serialize as JSON if it's a dict/object
+        arguments = getattr(func_call, 'arguments', None)
+        if arguments is not None:
+            if isinstance(arguments, (dict, list)):
+                try:
+                    func_data['arguments'] = json.dumps(arguments)
+                except (TypeError, ValueError):
+                    # Fallback to string representation if JSON serialization fails
+                    func_data['arguments'] = str(arguments)
+            else:
+                func_data['arguments'] = str(arguments)
+        else:
+            func_data['arguments'] = None
+
+        if hasattr(func_call, 'response') and func_call.response:
+            func_data['response'] = str(func_call.response)
+        if hasattr(func_call, 'error') and func_call.error:
+            func_data['error'] = str(func_call.error)
+        function_calls_data.append(func_data)
+
+    try:
+        function_calls_str = json.dumps(function_calls_data)
+    except (TypeError, ValueError):
+        # Fallback to string representation if JSON serialization fails
+        function_calls_str = str(function_calls_data)
+    span.set_attribute("llm.response.function_calls", serialize(function_calls_str))
+    span.set_attribute("llm.response.function_call_count", len(candidate.function_calls))
+
+def _record_usage(span, usage: Any):
+    if hasattr(usage, 'prompt_token_count'):
+        span.set_attribute("llm.usage.prompt_tokens", usage.prompt_token_count)
+    if hasattr(usage, 'candidates_token_count'):
+        span.set_attribute("llm.usage.completion_tokens", usage.candidates_token_count)
+    if hasattr(usage, 'total_token_count'):
+        span.set_attribute("llm.usage.total_tokens", usage.total_token_count)
+
+def _record_response(span, response: Any, usage: bool = True):
+    """
+    Records text, function calls and (optionally) usage of a complete response.
+    """
+    # 2. Record Response Attributes
+    try:
+        text = response.text
+    except Exception:
+        # `.text` raises when the response has no text part (e.g. only function calls)
+        text = None
+    if text:
+        set_attribute(span, "llm.response.content", text)
+
+    # Track function/tool calls if used in the agent
+    if span.is_recording() and hasattr(response, 'candidates') and response.candidates:
+        candidate = response.candidates[0]
+        if hasattr(candidate, 'function_calls') and candidate.function_calls:
+            _record_function_calls(span, candidate)
+
+    if usage and hasattr(response, 'usage_metadata') and response.usage_metadata:
+        _record_usage(span, response.usage_metadata)
+
+def _record_error(span, e: BaseException):
+    span.record_exception(e)
+    span.set_status(Status(StatusCode.ERROR, str(e)))
+
+def _record_call(span, model: str, start: float, usage: Any = None, error: Optional[BaseException] = None):
+    """
+    Records the estimated cost on the span, and the call in the metrics (for every call, sampled or not).
+    """
+    prompt_tokens = getattr(usage, "prompt_token_count", None)
+    completion_tokens = getattr(usage, "candidates_token_count", None)
+    cost = pricing.cost(model, prompt_tokens, completion_tokens)
+    if cost is not None:
+        span.set_attribute("llm.usage.cost_usd", cost)
+    record_llm_call("gemini", model, time.perf_counter() - start, prompt_tokens, completion_tokens, error, cost)
+
+class _StreamRecorder:
+    """
+    Times the chunks of a streamed response and ends the span once the stream is done.
+    Shared by the sync and async stream wrappers.
+
+    The Gemini SDK already merges chunks into the response object as they arrive, so
+    nothing is collected per chunk here: content and function calls are read from the
+    merged response at the end. Anything else (`text`, `candidates`, ...) is delegated
+    to the wrapped response.
+    """
+    def __init__(self, response: Any, span: Any, metrics: StreamMetrics, model: str = "unknown"):
+        self._response = response
+        self._span = span
+        self._metrics = metrics
+        self._model = model
+        self._usage: Any = None
+        self._ended = False
+
+    def __getattr__(self, name: str):
+        return getattr(self._response, name)
+
+    def __del__(self):
+        # A response the caller never iterated or resolved, or dropped partway: end the span
+        # (and record the metrics) with what was received. Looked up in __dict__, as
+        # __init__ may not have run.
+        if not self.__dict__.get("_ended", True):
+            self._end(abandoned=True)
+
+    def _process(self, chunk: Any):
+        self._metrics.tick()
+        # Every chunk carries the usage so far; the last one has the final counts
+        usage = getattr(chunk, "usage_metadata", None)
+        if usage:
+            self._usage = usage
+
+    def _end(self, error: Optional[BaseException] = None, abandoned: bool = False):
+        if self._ended:
+            return
+        self._ended = True
+        span = self._span
+
+        if span.is_recording():
+            if abandoned:
+                # The merged response is incomplete: only what the chunks carried is recorded
+                span.set_attribute("llm.response.abandoned", True)
+            elif error is None:
+                _record_response(span, self._response, usage=False)
+            if self._usage:
+                _record_usage(span, self._usage)
+
+            tokens = getattr(self._usage, "candidates_token_count", None) if self._usage else None
+            self._metrics.record(span, tokens)
+
+        _record_call(span, self._model, self._metrics.start, self._usage, error)
+        if error is not None:
+            _record_error(span, error)
+        elif abandoned:
+            span.set_status(Status(StatusCode.ERROR, "Stream abandoned before it was consumed"))
+        else:
+            span.set_status(Status(StatusCode.OK))
+        span.end()
+
+class TracedStream(_StreamRecorder):
+    """
+    Pass-through wrapper around the response of `generate_content(stream=True)` /
+    `send_message(stream=True)`. The span ends when iteration finishes, fails or is
+    abandoned, or when the response is resolved.
+    """
+    def __iter__(self):
+        error = None
+        try:
+            for chunk in self._response:
+                self._process(chunk)
+                yield chunk
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self._end(error)
+
+    def resolve(self):
+        """
+        Consumes the rest of the stream (see the SDK's `resolve`) and ends the span.
+        """
+        error = None
+        try:
+            return self._response.resolve()
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self._end(error)
+
+class TracedAsyncStream(_StreamRecorder):
+    """
+    Async counterpart of `TracedStream`, returned by `generate_content_async(stream=True)`
+    and `send_message_async(stream=True)`.
+    """
+    async def __aiter__(self):
+        error = None
+        try:
+            async for chunk in self._response:
+                self._process(chunk)
+                yield chunk
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self._end(error)
+
+    async def resolve(self):
+        error = None
+        try:
+            return await self._response.resolve()
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self._end(error)
+
+def _start_span(operation: str, model: str, args: Tuple[Any, ...], kwargs: Dict[str, Any]):
+    """
+    Starts (but does not activate) the span for a Gemini call.
+    The span can outlive the call (streaming), so it is always ended explicitly.
+    """
+    contents = args[0] if args else kwargs.get('contents', kwargs.get('content', []))
+    tools = kwargs.get('tools', [])
+    stream = bool(kwargs.get('stream'))
+
+    # Semantic Convention: "gemini.chat.generate_content" / "gemini.chat.send_message"
+    span_name = f"gemini.chat.{operation} {model}"
+
+    span = tracer.start_span(span_name)
+    _record_request(span, model, contents, tools, stream)
+    return span, stream
+
+def _activate(span):
+    """
+    Makes `span` current while the request is sent, so nested (e.g. gRPC) spans are its children.
+    """
+    return trace.use_span(span, end_on_exit=False, record_exception=False, set_status_on_exception=False)
+
+def _finish(span, response: Any, model: str, start: float):
+    _record_response(span, response)
+    _record_call(span, model, start, getattr(response, "usage_metadata", None))
+    span.set_status(Status(StatusCode.OK))
+    span.end()
+
+def _fail(span, e: BaseException, model: str, start: float):
+    _record_error(span, e)
+    _record_call(span, model, start, error=e)
+    span.end()
+
+def _wrap(original: Any, operation: str, get_model: Any):
+    """
+    Traces a sync Gemini method: one span per call, streaming responses are wrapped.
+    """
+    @functools.wraps(original)
+    def wrapped(self, *args, **kwargs):
+        if not state.enabled or is_inert(wrapped) or _in_traced_call.get():
+            return original(self, *args, **kwargs)
+
+        model = get_model(self)
+        span, stream = _start_span(operation, model, args, kwargs)
+        start = time.perf_counter()
+        metrics = StreamMetrics(start) if stream else None
+
+        token = _in_traced_call.set(True)
+        try:
+            with _activate(span):
+                response = original(self, *args, **kwargs)
+
+            if stream:
+                return TracedStream(response, span, metrics, model)
+
+            _finish(span, response, model, start)
+            return response
+
+        except Exception as e:
+            _fail(span, e, model, start)
+            raise
+        finally:
+            _in_traced_call.reset(token)
+
+    return wrapped
+
+def _wrap_async(original: Any, operation: str, get_model: Any):
+    """
+    Async counterpart of `_wrap`; the only await is the request itself.
+    """
+    @functools.wraps(original)
+    async def wrapped(self, *args, **kwargs):
+        if not state.enabled or is_inert(wrapped) or _in_traced_call.get():
+            return await original(self, *args, **kwargs)
+
+        model = get_model(self)
+        span, stream = _start_span(operation, model, args, kwargs)
+        start = time.perf_counter()
+        metrics = StreamMetrics(start) if stream else None
+
+        token = _in_traced_call.set(True)
+        try:
+            with _activate(span):
+                response = await original(self, *args, **kwargs)
+
+            if stream:
+                return TracedAsyncStream(response, span, metrics, model)
+
+            _finish(span, response, model, start)
+            return response
+
+        except Exception as e:
+            _fail(span, e, model, start)
+            raise
+        finally:
+            _in_traced_call.reset(token)
+
+    return wrapped
+
+def _model_name(model: Any) -> str:
+    return getattr(model, "model_name", "unknown")
+
+def _session_model_name(session: Any) -> str:
+    return _model_name(getattr(session, "model", None))
+
+def _instrument_grpc():
+    """
+    Instruments the gRPC client once per process: the OpenTelemetry instrumentor is a
+    singleton, and it is only undone by `uninstrument()` if this call enabled it.
+    """
+    from opentelemetry.instrumentation.grpc import GrpcInstrumentorClient
+
+    grpc_instrumentor = GrpcInstrumentorClient()
+    if grpc_instrumentor.is_instrumented_by_opentelemetry:
+        return
+    grpc_instrumentor.instrument()
+    on_uninstrument("gemini", grpc_instrumentor.uninstrument)
+
 def instrument_chat(gemini_module: Any):
     """
     Instruments the Google Gemini Chat API with OpenTelemetry.
     Also instruments underlying gRPC calls if available.
+
+    `generate_content` and `ChatSession.send_message` (and their async variants) get
+    one span per call; a chat turn is a single span even when the session calls
+    `generate_content` several times. Streaming calls return a `TracedStream` /
+    `TracedAsyncStream` whose span ends with the stream.
+
+    Safe to call more than once: methods that are already wrapped are left alone.
     """
     # 1. Instrument gRPC client (Gemini uses gRPC under the hood)
     try:
-        from opentelemetry.instrumentation.grpc import GrpcInstrumentorClient
-        grpc_instrumentor = GrpcInstrumentorClient()
-        grpc_instrumentor.instrument()
+        _instrument_grpc()
     except Exception:
         # Catch all exceptions to ensure gRPC instrumentation failures don't break
         # the main Gemini instrumentation. gRPC instrumentation is optional.
@@ -28,97 +391,20 @@ def instrument_chat(gemini_module: Any):
     except ImportError:
         return
 
-    original_generate_content = GenerativeModel.generate_content
-
-    @functools.wraps(original_generate_content)
-    def wrapped_generate_content(self, *args, **kwargs):
-        model = getattr(self, "model_name", "unknown")
-        contents = args[0] if args else kwargs.get('contents', [])
-        tools = kwargs.get('tools', [])
-
-        # Semantic Convention: "gemini.chat.generate_content"
-        span_name = f"gemini.chat.generate_content {model}"
-
-        with tracer.start_as_current_span(span_name) as span:
-            # 1. Record Input Attributes (Semantic Conventions)
-            span.set_attribute("llm.system", "gemini")
-            span.set_attribute("llm.request.model", model)
-            
-            # We can serialize complex objects (contents) to string for now
-            # In future, we might map them to specific OTel semantic events
-            span.set_attribute("llm.request.messages", str(contents))
-            
-            # Track tools if provided to agent
-            if tools:
-                try:
-                    tools_str = json.dumps(tools) if isinstance(tools, (list, dict)) else str(tools)
-                except (TypeError, ValueError):
-                    # Fallback to string representation if JSON serialization fails
-                    tools_str = str(tools)
-                span.set_attribute("llm.request.tools", tools_str)
-                if isinstance(tools, list):
-                    span.set_attribute("llm.request.tool_count", len(tools))
-
-            try:
-                response = original_generate_content(self, *args, **kwargs)
-
-                # 2. Record Response Attributes
-                if hasattr(response, 'text') and response.text:
-                    span.set_attribute("llm.response.content", str(response.text))
-
-                # Track function/tool calls if used in the agent
-                if hasattr(response, 'candidates') and response.candidates:
-                    candidate = response.candidates[0]
-                    if hasattr(candidate, 'function_calls') and candidate.function_calls:
-                        # Serialize all function calls as JSON for complete tracking
-                        function_calls_data = []
-                        for func_call in candidate.function_calls:
-                            func_data = {
-                                'name': getattr(func_call, 'name', None),
-                            }
-                            # Handle arguments - serialize as JSON if it's a dict/object
-                            arguments = getattr(func_call, 'arguments', None)
-                            if arguments is not None:
-                                if isinstance(arguments, (dict, list)):
-                                    try:
-                                        func_data['arguments'] = json.dumps(arguments)
-                                    except (TypeError, ValueError):
-                                        # Fallback to string representation if JSON serialization fails
-                                        func_data['arguments'] = str(arguments)
-                                else:
-                                    func_data['arguments'] = str(arguments)
-                            else:
-                                func_data['arguments'] = None
-                            
-                            if hasattr(func_call, 'response') and func_call.response:
-                                func_data['response'] = str(func_call.response)
-                            if hasattr(func_call, 'error') and func_call.error:
-                                func_data['error'] = str(func_call.error)
-                            function_calls_data.append(func_data)
-                        
-                        try:
-                            function_calls_str = json.dumps(function_calls_data)
-                        except (TypeError, ValueError):
-                            # Fallback to string representation if JSON serialization fails
-                            function_calls_str = str(function_calls_data)
-                        span.set_attribute("llm.response.function_calls", function_calls_str)
-                        span.set_attribute("llm.response.function_call_count", len(candidate.function_calls))
-
-                if hasattr(response, 'usage_metadata') and response.usage_metadata:
-                    usage = response.usage_metadata
-                    if hasattr(usage, 'prompt_token_count'):
-                        span.set_attribute("llm.usage.prompt_tokens", usage.prompt_token_count)
-                    if hasattr(usage, 'candidates_token_count'):
-                        span.set_attribute("llm.usage.completion_tokens", usage.candidates_token_count)
-                    if hasattr(usage, 'total_token_count'):
-                        span.set_attribute("llm.usage.total_tokens", usage.total_token_count)
-
-                span.set_status(Status(StatusCode.OK))
-                return response
-
-            except Exception as e:
-                span.record_exception(e)
-                span.set_status(Status(StatusCode.ERROR, str(e)))
-                raise e
-
-    GenerativeModel.generate_content = wrapped_generate_content
\ No newline at end of file
+    wrap_method("gemini", GenerativeModel, "generate_content",
+                lambda original: _wrap(original, "generate_content", _model_name))
+    if hasattr(GenerativeModel, "generate_content_async"):
+        wrap_method("gemini", GenerativeModel, "generate_content_async",
+                    lambda original: _wrap_async(original, "generate_content", _model_name))
+
+    # 3. Instrument chat sessions: one span per turn
+    try:
+        from google.generativeai import ChatSession
+    except ImportError:
+        return
+
+    wrap_method("gemini", ChatSession, "send_message",
+                lambda original: _wrap(original, "send_message", _session_model_name))
+    if hasattr(ChatSession, "send_message_async"):
+        wrap_method("gemini", ChatSession, "send_message_async",
+                    lambda original: _wrap_async(original, "send_message", _session_model_name))
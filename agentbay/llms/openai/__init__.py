@@ -1,10 +1,14 @@
-from .chat import instrument_chat
+from typing import Any
+
+from ... import instrumentation
 
 def instrument():
     """
     Auto-instruments the OpenAI SDK.
     Call this function after `agentbay.init()` and before using `openai`.
     """
+    from .chat import instrument_chat
+
     # We try to import openai here to ensure it's available
     try:
         import openai
@@ -12,3 +16,17 @@ def instrument():
     except ImportError:
         # If openai is not installed, we simply do nothing or could log a warning
         pass
+
+def __getattr__(name: str) -> Any:
+    # PEP 562: the instrumentation code (and OpenTelemetry) is only imported when used
+    if name == "instrument_chat":
+        from .chat import instrument_chat
+
+        return instrument_chat
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def uninstrument():
+    """
+    Restores the original OpenAI methods.
+    """
+    instrumentation.uninstrument("openai")
@@ -1,59 +1,357 @@
-from typing import Any
+from typing import Any, Dict, List, Optional
 import functools
 import json
+import time
 from opentelemetry import trace
 from opentelemetry.trace import Status, StatusCode
 
+from ... import pricing
+from ...instrumentation import is_inert, wrap_method
+from ...metrics import record_llm_call
+from ...runtime import state
+from ...serialization import serialize, set_attribute
+from ...streaming import StreamMetrics
+
 # Get our tracer
 tracer = trace.get_tracer("agentbay.llms.openai")
 
-def instrument_chat(openai_module: Any):
+def _record_request(span, model: str, messages: Any, stream: bool):
     """
-    Instruments the OpenAI Chat Completions API with OpenTelemetry.
+    Records the request attributes shared by all chat completion calls.
     """
-    try:
-        from openai.resources.chat.completions import Completions
-    except ImportError:
-        return
+    # 1. Record Input Attributes (Semantic Conventions)
+    span.set_attribute("llm.system", "openai")
+    span.set_attribute("llm.request.model", model)
+    if stream:
+        span.set_attribute("llm.request.stream", True)
+
+    # We can serialize complex objects (messages) to a size-capped string for now
+    # In future, we might map them to specific OTel semantic events
+    set_attribute(span, "llm.request.messages", messages)
+
+def _record_usage(span, usage: Any):
+    span.set_attribute("llm.usage.prompt_tokens", usage.prompt_tokens)
+    span.set_attribute("llm.usage.completion_tokens", usage.completion_tokens)
+    span.set_attribute("llm.usage.total_tokens", usage.total_tokens)
+
+def _record_response(span, response: Any):
+    """
+    Records the attributes of a fully materialized (non-streamed) response.
+    """
+    if response.choices:
+        content = response.choices[0].message.content
+        set_attribute(span, "llm.response.content", content)
+
+    if response.usage:
+        _record_usage(span, response.usage)
+
+def _record_error(span, e: BaseException):
+    span.record_exception(e)
+    span.set_status(Status(StatusCode.ERROR, str(e)))
+
+def _record_call(span, model: str, start: float, usage: Any = None, error: Optional[BaseException] = None):
+    """
+    Records the estimated cost on the span, and the call in the metrics (for every call, sampled or not).
+    """
+    prompt_tokens = getattr(usage, "prompt_tokens", None)
+    completion_tokens = getattr(usage, "completion_tokens", None)
+    cost = pricing.cost(model, prompt_tokens, completion_tokens)
+    if cost is not None:
+        span.set_attribute("llm.usage.cost_usd", cost)
+    record_llm_call("openai", model, time.perf_counter() - start, prompt_tokens, completion_tokens, error, cost)
+
+class _StreamRecorder:
+    """
+    Collects the deltas of a streamed response and ends the span once the stream is done.
+    Shared by the sync and async stream wrappers.
+
+    Chunks are handed to the caller untouched. Content and tool-call deltas are
+    collected by reference and only joined once, when the stream ends.
+    Anything else (e.g. `response`) is delegated to the wrapped stream.
+    """
+    def __init__(self, stream: Any, span: Any, metrics: StreamMetrics, model: str = "unknown"):
+        self._stream = stream
+        self._span = span
+        self._metrics = metrics
+        self._model = model
+        self._content: List[str] = []
+        self._tool_calls: Dict[int, Dict[str, Any]] = {}
+        self._finish_reason: Optional[str] = None
+        self._usage: Any = None
+        self._ended = False
+
+    def __getattr__(self, name: str):
+        return getattr(self._stream, name)
+
+    def __del__(self):
+        # A stream the caller broke out of and dropped: end the span (and record the
+        # metrics) with what was received. Looked up in __dict__, as __init__ may not have run.
+        if not self.__dict__.get("_ended", True):
+            self._end()
+
+    def _process(self, chunk: Any):
+        # Only sent as the last chunk when `stream_options={"include_usage": True}`
+        usage = getattr(chunk, "usage", None)
+        if usage:
+            self._usage = usage
+
+        if not chunk.choices:
+            return
+        choice = chunk.choices[0]
+        delta = choice.delta
+
+        if delta is not None:
+            tool_calls = getattr(delta, "tool_calls", None)
+            # One tick per chunk, even when it carries both content and tool-call deltas
+            if delta.content or tool_calls:
+                self._metrics.tick()
+
+            if delta.content:
+                self._content.append(delta.content)
+
+            if tool_calls:
+                for tool_call in tool_calls:
+                    self._add_tool_call_delta(tool_call)
+
+        if choice.finish_reason:
+            self._finish_reason = choice.finish_reason
+
+    def _add_tool_call_delta(self, tool_call: Any):
+        # Tool calls arrive as fragments keyed by index: id and name once, arguments in pieces
+        entry = self._tool_calls.get(tool_call.index)
+        if entry is None:
+            entry = self._tool_calls[tool_call.index] = {"id": None, "name": None, "arguments": []}
+        if tool_call.id:
+            entry["id"] = tool_call.id
+        function = tool_call.function
+        if function is not None:
+            if function.name:
+                entry["name"] = function.name
+            if function.arguments:
+                entry["arguments"].append(function.arguments)
+
+    def _end(self, error: Optional[BaseException] = None):
+        if self._ended:
+            return
+        self._ended = True
+        span = self._span
+
+        if span.is_recording():
+            if self._content:
+                set_attribute(span, "llm.response.content", "".join(self._content))
+
+            if self._tool_calls:
+                tool_calls = [
+                    {"id": entry["id"], "name": entry["name"], "arguments": "".join(entry["arguments"])}
+                    for _, entry in sorted(self._tool_calls.items())
+                ]
+                span.set_attribute("llm.response.tool_calls", serialize(json.dumps(tool_calls)))
+                span.set_attribute("llm.response.tool_call_count", len(tool_calls))
+
+            if self._finish_reason:
+                span.set_attribute("llm.response.finish_reason", self._finish_reason)
+
+            if self._usage:
+                _record_usage(span, self._usage)
+
+            tokens = self._usage.completion_tokens if self._usage else None
+            self._metrics.record(span, tokens)
+
+        _record_call(span, self._model, self._metrics.start, self._usage, error)
+        if error is not None:
+            _record_error(span, error)
+        else:
+            span.set_status(Status(StatusCode.OK))
+        span.end()
+
+class TracedStream(_StreamRecorder):
+    """
+    Pass-through wrapper around the stream returned by `create(stream=True)`.
+    The span is ended when the stream is exhausted, fails, is closed or is abandoned
+    (garbage collected before the end).
+    """
+    def __init__(self, stream: Any, span: Any, metrics: StreamMetrics, model: str = "unknown"):
+        super().__init__(stream, span, metrics, model)
+        self._iterator = iter(stream)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            chunk = next(self._iterator)
+        except StopIteration:
+            self._end()
+            raise
+        except Exception as e:
+            self._end(e)
+            raise
+
+        self._process(chunk)
+        return chunk
 
-    original_create = Completions.create
+    def __enter__(self):
+        return self
 
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """
+        Closes the underlying stream (releasing the HTTP connection) and ends the span.
+        """
+        try:
+            close = getattr(self._stream, "close", None)
+            if close is not None:
+                close()
+        finally:
+            self._end()
+
+class TracedAsyncStream(_StreamRecorder):
+    """
+    Async counterpart of `TracedStream`, returned by `AsyncCompletions.create(stream=True)`.
+    Chunk bookkeeping is synchronous, so no extra awaits are added per chunk.
+    """
+    def __init__(self, stream: Any, span: Any, metrics: StreamMetrics, model: str = "unknown"):
+        super().__init__(stream, span, metrics, model)
+        self._iterator = stream.__aiter__()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            chunk = await self._iterator.__anext__()
+        except StopAsyncIteration:
+            self._end()
+            raise
+        except Exception as e:
+            self._end(e)
+            raise
+
+        self._process(chunk)
+        return chunk
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def close(self):
+        """
+        Closes the underlying stream (releasing the HTTP connection) and ends the span.
+        """
+        try:
+            close = getattr(self._stream, "close", None)
+            if close is not None:
+                await close()
+        finally:
+            self._end()
+
+def _start_span(kwargs: Dict[str, Any]):
+    """
+    Starts (but does not activate) the span for a chat completion call.
+    The span can outlive the call (streaming), so it is always ended explicitly.
+    """
+    model = kwargs.get("model", "unknown")
+    messages = kwargs.get("messages", [])
+    stream = bool(kwargs.get("stream"))
+
+    # Semantic Convention: "chat.completions" or "llm.openai.chat_completions"
+    span_name = f"openai.chat.completions.create {model}"
+
+    span = tracer.start_span(span_name)
+    _record_request(span, model, messages, stream)
+    return span, model, stream
+
+def _activate(span):
+    """
+    Makes `span` current while the request is sent, so nested (e.g. HTTP) spans are its children.
+    """
+    return trace.use_span(span, end_on_exit=False, record_exception=False, set_status_on_exception=False)
+
+def _finish(span, response: Any, model: str, start: float):
+    # 2. Record Response Attributes
+    _record_response(span, response)
+    _record_call(span, model, start, getattr(response, "usage", None))
+    span.set_status(Status(StatusCode.OK))
+    span.end()
+
+def _fail(span, e: BaseException, model: str, start: float):
+    _record_error(span, e)
+    _record_call(span, model, start, error=e)
+    span.end()
+
+def _wrap_create(original_create: Any):
     @functools.wraps(original_create)
     def wrapped_create(self, *args, **kwargs):
-        model = kwargs.get("model", "unknown")
-        messages = kwargs.get("messages", [])
-
-        # Semantic Convention: "chat.completions" or "llm.openai.chat_completions"
-        span_name = f"openai.chat.completions.create {model}"
-        
-        with tracer.start_as_current_span(span_name) as span:
-            # 1. Record Input Attributes (Semantic Conventions)
-            span.set_attribute("llm.system", "openai")
-            span.set_attribute("llm.request.model", model)
-            
-            # We can serialize complex objects (messages) to string for now
-            # In future, we might map them to specific OTel semantic events
-            span.set_attribute("llm.request.messages", str(messages))
-
-            try:
+        if not state.enabled or is_inert(wrapped_create):
+            return original_create(self, *args, **kwargs)
+        span, model, stream = _start_span(kwargs)
+        start = time.perf_counter()
+        metrics = StreamMetrics(start) if stream else None
+
+        try:
+            with _activate(span):
                 response = original_create(self, *args, **kwargs)
 
-                # 2. Record Response Attributes
-                if response.choices:
-                    content = response.choices[0].message.content
-                    span.set_attribute("llm.response.content", str(content))
+            if stream:
+                return TracedStream(response, span, metrics, model)
+
+            _finish(span, response, model, start)
+            return response
+
+        except Exception as e:
+            _fail(span, e, model, start)
+            raise
+
+    return wrapped_create
+
+def _wrap_async_create(original_async_create: Any):
+    @functools.wraps(original_async_create)
+    async def wrapped_async_create(self, *args, **kwargs):
+        if not state.enabled or is_inert(wrapped_async_create):
+            return await original_async_create(self, *args, **kwargs)
+        # Same bookkeeping as the sync path; the only await is the request itself
+        span, model, stream = _start_span(kwargs)
+        start = time.perf_counter()
+        metrics = StreamMetrics(start) if stream else None
+
+        try:
+            with _activate(span):
+                response = await original_async_create(self, *args, **kwargs)
 
-                if response.usage:
-                    span.set_attribute("llm.usage.prompt_tokens", response.usage.prompt_tokens)
-                    span.set_attribute("llm.usage.completion_tokens", response.usage.completion_tokens)
-                    span.set_attribute("llm.usage.total_tokens", response.usage.total_tokens)
+            if stream:
+                return TracedAsyncStream(response, span, metrics, model)
 
-                span.set_status(Status(StatusCode.OK))
-                return response
+            _finish(span, response, model, start)
+            return response
+
+        except Exception as e:
+            _fail(span, e, model, start)
+            raise
+
+    return wrapped_async_create
+
+def instrument_chat(openai_module: Any):
+    """
+    Instruments the OpenAI Chat Completions API (sync and async) with OpenTelemetry.
+    Streaming calls (`stream=True`) return a `TracedStream` / `TracedAsyncStream`
+    whose span ends with the stream.
 
-            except Exception as e:
-                span.record_exception(e)
-                span.set_status(Status(StatusCode.ERROR, str(e)))
-                raise e
+    Safe to call more than once: methods that are already wrapped are left alone.
+    """
+    try:
+        from openai.resources.chat.completions import Completions
+    except ImportError:
+        return
+
+    wrap_method("openai", Completions, "create", _wrap_create)
+
+    try:
+        from openai.resources.chat.completions import AsyncCompletions
+    except ImportError:
+        return
 
-    Completions.create = wrapped_create
+    wrap_method("openai", AsyncCompletions, "create", _wrap_async_create)
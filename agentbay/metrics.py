@@ -0,0 +1,122 @@
+from typing import Any, Callable, Dict, Iterable, Optional
+
+# Attribute keys shared with the span attributes of the LLM integrations
+SYSTEM = "llm.system"
+MODEL = "llm.request.model"
+TOKEN_TYPE = "llm.token.type"
+ERROR_TYPE = "error.type"
+
+class LLMMetrics:
+    """
+    OTel instruments for LLM calls, aggregated in-process by the `MeterProvider`
+    and exported periodically.
+
+    Every call is recorded, whether or not its trace is sampled, so token, latency,
+    error and cost totals stay exact when traces are sampled down. All instruments
+    are broken down by `llm.system` and `llm.request.model`:
+
+    - `llm.requests` (counter): calls made
+    - `llm.errors` (counter): failed calls, also by `error.type`
+    - `llm.request.duration` (histogram, s): latency, including streaming
+    - `llm.usage.tokens` (counter): tokens, by `llm.token.type` ("prompt" / "completion")
+    - `llm.request.tokens` (histogram): tokens per call, by `llm.token.type`
+    - `llm.usage.cost` (counter, USD): estimated cost, when the model's price is known
+    """
+    def __init__(self, meter: Any):
+        self.requests = meter.create_counter(
+            "llm.requests", unit="{request}", description="LLM calls made")
+        self.errors = meter.create_counter(
+            "llm.errors", unit="{request}", description="LLM calls that failed")
+        self.duration = meter.create_histogram(
+            "llm.request.duration", unit="s", description="Duration of LLM calls")
+        self.tokens = meter.create_counter(
+            "llm.usage.tokens", unit="{token}", description="Tokens used by LLM calls")
+        self.request_tokens = meter.create_histogram(
+            "llm.request.tokens", unit="{token}", description="Tokens used per LLM call")
+        self.cost = meter.create_counter(
+            "llm.usage.cost", unit="USD", description="Estimated cost of LLM calls")
+
+    def record(
+        self,
+        system: str,
+        model: Optional[str],
+        duration: float,
+        prompt_tokens: Optional[int] = None,
+        completion_tokens: Optional[int] = None,
+        error: Optional[BaseException] = None,
+        cost: Optional[float] = None,
+    ):
+        attributes: Dict[str, Any] = {SYSTEM: system, MODEL: model or "unknown"}
+
+        self.requests.add(1, attributes)
+        self.duration.record(duration, attributes)
+        if error is not None:
+            self.errors.add(1, {**attributes, ERROR_TYPE: type(error).__name__})
+
+        for token_type, count in (("prompt", prompt_tokens), ("completion", completion_tokens)):
+            if isinstance(count, int) and count >= 0:
+                token_attributes = {**attributes, TOKEN_TYPE: token_type}
+                self.tokens.add(count, token_attributes)
+                self.request_tokens.record(count, token_attributes)
+
+        if cost is not None:
+            self.cost.add(cost, attributes)
+
+def _observe_runs(stat: str) -> Callable[[Any], Iterable[Any]]:
+    def callback(options: Any) -> Iterable[Any]:
+        from opentelemetry.metrics import Observation
+
+        from .frameworks.langchain.registry import get_run_stats
+
+        stats = get_run_stats()
+        return [Observation(stats[stat])] if stat in stats else []
+    return callback
+
+def create_run_gauges(meter: Any):
+    """
+    Gauges of the LangChain handlers' open runs (see `RunRegistry`), observed at each
+    export, summed over all handlers; nothing is reported while there are none:
+
+    - `langchain.runs.live`: runs started but not ended yet
+    - `langchain.runs.reaped`: runs ended by the SDK after their TTL so far
+    - `langchain.runs.evicted`: runs ended by the SDK because `max_runs` was reached so far
+    """
+    for name, stat, description in (
+        ("langchain.runs.live", "live_runs", "Open LangChain runs"),
+        ("langchain.runs.reaped", "reaped_runs", "LangChain runs that never ended, ended after their TTL"),
+        ("langchain.runs.evicted", "evicted_runs", "LangChain runs ended early because too many were open"),
+    ):
+        meter.create_observable_gauge(name, callbacks=[_observe_runs(stat)], unit="{run}", description=description)
+
+# Set by `AgentBay` when metrics are enabled; None means recording is a no-op
+_metrics: Optional[LLMMetrics] = None
+
+def configure(meter_provider: Any):
+    """
+    Creates the LLM instruments and LangChain run gauges on `meter_provider`
+    (None turns recording off).
+    """
+    global _metrics
+    if meter_provider is None:
+        _metrics = None
+        return
+    meter = meter_provider.get_meter("agentbay")
+    _metrics = LLMMetrics(meter)
+    create_run_gauges(meter)
+
+def record_llm_call(
+    system: str,
+    model: Optional[str],
+    duration: float,
+    prompt_tokens: Optional[int] = None,
+    completion_tokens: Optional[int] = None,
+    error: Optional[BaseException] = None,
+    cost: Optional[float] = None,
+):
+    """
+    Records one LLM call (see `LLMMetrics`). Called by the integrations for every call,
+    sampled or not; does nothing until `agentbay.init()` has set up metrics.
+    """
+    metrics = _metrics
+    if metrics is not None:
+        metrics.record(system, model, duration, prompt_tokens, completion_tokens, error, cost)
@@ -0,0 +1,165 @@
+import json
+import threading
+from typing import Any, Dict, NamedTuple, Optional
+
+class ModelPrice(NamedTuple):
+    """
+    USD per 1M tokens.
+    """
+    prompt: float
+    completion: float
+
+# List prices (USD per 1M tokens) of common models. Override them with `set_price`,
+# `load` or `agentbay.init(model_prices=..., pricing_file=...)` for negotiated rates.
+DEFAULT_PRICES: Dict[str, ModelPrice] = {
+    # OpenAI
+    "gpt-4.1": ModelPrice(2.0, 8.0),
+    "gpt-4.1-mini": ModelPrice(0.4, 1.6),
+    "gpt-4.1-nano": ModelPrice(0.1, 0.4),
+    "gpt-4o": ModelPrice(2.5, 10.0),
+    "gpt-4o-mini": ModelPrice(0.15, 0.6),
+    "gpt-4-turbo": ModelPrice(10.0, 30.0),
+    "gpt-4-32k": ModelPrice(60.0, 120.0),
+    "gpt-4": ModelPrice(30.0, 60.0),
+    "gpt-3.5-turbo": ModelPrice(0.5, 1.5),
+    "o1": ModelPrice(15.0, 60.0),
+    "o1-mini": ModelPrice(1.1, 4.4),
+    "o3": ModelPrice(2.0, 8.0),
+    "o3-mini": ModelPrice(1.1, 4.4),
+    "o4-mini": ModelPrice(1.1, 4.4),
+    # Google Gemini (prompts up to 128k/200k tokens)
+    "gemini-2.5-pro": ModelPrice(1.25, 10.0),
+    "gemini-2.5-flash": ModelPrice(0.3, 2.5),
+    "gemini-2.0-flash": ModelPrice(0.1, 0.4),
+    "gemini-2.0-flash-lite": ModelPrice(0.075, 0.3),
+    "gemini-1.5-pro": ModelPrice(1.25, 5.0),
+    "gemini-1.5-flash": ModelPrice(0.075, 0.3),
+    "gemini-1.5-flash-8b": ModelPrice(0.0375, 0.15),
+    # Anthropic (through LangChain)
+    "claude-3-5-sonnet": ModelPrice(3.0, 15.0),
+    "claude-3-5-haiku": ModelPrice(0.8, 4.0),
+    "claude-3-opus": ModelPrice(15.0, 75.0),
+    "claude-3-haiku": ModelPrice(0.25, 1.25),
+}
+
+# Upper bound on memoized lookups, so arbitrary model names can't grow memory
+_MAX_CACHED_NAMES = 4096
+
+def normalize(model: str) -> str:
+    """
+    Canonical form of a model name: lowercase, without provider prefix
+    ("models/gemini-1.5-pro", "openai/gpt-4o") or fine-tune wrapper ("ft:gpt-4o-mini:org::id").
+    """
+    name = model.strip().lower()
+    if name.startswith("ft:"):
+        name = name.split(":", 2)[1]
+    return name.rsplit("/", 1)[-1]
+
+class PricingTable:
+    """
+    Model prices with O(1) lookup per call.
+
+    Names are matched on their normalized form, then without trailing all-digit
+    segments, so dated and versioned variants ("gpt-4o-2024-08-06", "gpt-4-0613",
+    "gemini-1.5-pro-002") resolve to their base model. Other variants ("o1-pro",
+    "gpt-4o-realtime-preview") are priced differently, so they are unknown unless
+    listed. Each distinct name is resolved once and memoized; later lookups are a
+    single dict hit.
+    """
+    def __init__(self, prices: Optional[Dict[str, Any]] = None):
+        self._prices: Dict[str, ModelPrice] = {}
+        self._resolved: Dict[str, Optional[ModelPrice]] = {}
+        self._lock = threading.Lock()
+        if prices:
+            self.update(prices)
+
+    def update(self, prices: Dict[str, Any]):
+        """
+        Adds or replaces prices. Values are `ModelPrice`, (prompt, completion) pairs or
+        {"prompt": ..., "completion": ...} dicts, in USD per 1M tokens.
+        """
+        parsed = {normalize(model): _parse_price(model, price) for model, price in prices.items()}
+        with self._lock:
+            self._prices.update(parsed)
+            # Prefix matches may change, so everything is resolved again
+            self._resolved = {}
+
+    def lookup(self, model: Optional[str]) -> Optional[ModelPrice]:
+        """
+        Returns the price of `model`, or None if it is unknown.
+        """
+        if not model:
+            return None
+        resolved = self._resolved
+        try:
+            return resolved[model]
+        except KeyError:
+            pass
+
+        price = self._resolve(normalize(model))
+        if len(resolved) >= _MAX_CACHED_NAMES:
+            resolved.clear()
+        resolved[model] = price
+        return price
+
+    def _resolve(self, name: str) -> Optional[ModelPrice]:
+        prices = self._prices
+        while name:
+            price = prices.get(name)
+            if price is not None:
+                return price
+            cut = name.rfind("-")
+            if cut <= 0 or not name[cut + 1:].isdigit():
+                return None
+            name = name[:cut]
+        return None
+
+    def cost(self, model: Optional[str], prompt_tokens: Any, completion_tokens: Any) -> Optional[float]:
+        """
+        Returns the cost in USD of a call, or None if the model or both token counts are unknown.
+        """
+        prompt_tokens = prompt_tokens if isinstance(prompt_tokens, int) else None
+        completion_tokens = completion_tokens if isinstance(completion_tokens, int) else None
+        if prompt_tokens is None and completion_tokens is None:
+            return None
+        price = self.lookup(model)
+        if price is None:
+            return None
+        return ((prompt_tokens or 0) * price.prompt + (completion_tokens or 0) * price.completion) / 1_000_000
+
+def _parse_price(model: str, price: Any) -> ModelPrice:
+    try:
+        if isinstance(price, dict):
+            return ModelPrice(float(price["prompt"]), float(price["completion"]))
+        prompt, completion = price
+        return ModelPrice(float(prompt), float(completion))
+    except (KeyError, TypeError, ValueError):
+        raise ValueError(
+            f"Invalid price for model {model!r}: expected {{'prompt': ..., 'completion': ...}} "
+            f"in USD per 1M tokens, got {price!r}."
+        ) from None
+
+table = PricingTable(DEFAULT_PRICES)
+
+def set_price(model: str, prompt: float, completion: float):
+    """
+    Sets the price (USD per 1M prompt / completion tokens) of `model` and its dated variants.
+    """
+    table.update({model: ModelPrice(prompt, completion)})
+
+def load(path: str):
+    """
+    Loads prices from a JSON file: {"model": {"prompt": 2.5, "completion": 10.0}, ...}
+    in USD per 1M tokens. Entries override the defaults.
+    """
+    with open(path, encoding="utf-8") as f:
+        prices = json.load(f)
+    if not isinstance(prices, dict):
+        raise ValueError(f"Pricing file {path!r} must contain a JSON object of model prices.")
+    table.update(prices)
+
+def cost(model: Optional[str], prompt_tokens: Any, completion_tokens: Any) -> Optional[float]:
+    """
+    Returns the estimated cost in USD of a call with the default table (see `PricingTable.cost`).
+    """
+    return table.cost(model, prompt_tokens, completion_tokens)
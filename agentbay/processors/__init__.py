@@ -0,0 +1,19 @@
+from .batch import (
+    BLOCK,
+    DROP_NEWEST,
+    DROP_OLDEST,
+    OVERFLOW_POLICIES,
+    BoundedBatchSpanProcessor,
+    ExportStats,
+)
+from .session import SessionSpanProcessor
+
+__all__ = [
+    "BLOCK",
+    "DROP_NEWEST",
+    "DROP_OLDEST",
+    "OVERFLOW_POLICIES",
+    "BoundedBatchSpanProcessor",
+    "ExportStats",
+    "SessionSpanProcessor",
+]
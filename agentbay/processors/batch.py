@@ -0,0 +1,242 @@
+import collections
+import logging
+import threading
+from typing import Deque, Dict, List, Optional
+
+from opentelemetry.context import Context
+from opentelemetry.sdk.trace import ReadableSpan, Span, SpanProcessor
+from opentelemetry.sdk.trace.export import SpanExporter, SpanExportResult
+
+from .. import serialization
+from ..utils import register_after_fork
+
+logger = logging.getLogger(__name__)
+
+# What to do with a finished span when the queue is full
+DROP_NEWEST = "drop_newest"  # discard the incoming span (never blocks the caller)
+DROP_OLDEST = "drop_oldest"  # evict the oldest queued span to make room
+BLOCK = "block"              # wait up to `block_timeout_millis` for room, then drop the incoming span
+OVERFLOW_POLICIES = (DROP_NEWEST, DROP_OLDEST, BLOCK)
+
+class ExportStats:
+    """
+    Thread-safe counters for the export pipeline.
+
+    - enqueued: spans accepted into the queue
+    - exported: spans successfully handed to the backend
+    - dropped: spans discarded because the queue was full (or the processor shut down)
+    - retried: spans whose export was attempted again after a failure
+    - failed: spans given up on after the last retry
+    """
+    FIELDS = ("enqueued", "exported", "dropped", "retried", "failed")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts: Dict[str, int] = dict.fromkeys(self.FIELDS, 0)
+
+    def reset(self):
+        """
+        Zeroes all counters. Used in forked children, which count their own spans.
+        """
+        self._lock = threading.Lock()
+        self._counts = dict.fromkeys(self.FIELDS, 0)
+
+    def add(self, name: str, count: int = 1):
+        with self._lock:
+            self._counts[name] += count
+
+    def snapshot(self) -> Dict[str, int]:
+        """
+        Returns a copy of all counters.
+        """
+        with self._lock:
+            return dict(self._counts)
+
+class BoundedBatchSpanProcessor(SpanProcessor):
+    """
+    Batches finished spans and exports them from a background thread, like OTel's
+    `BatchSpanProcessor`, but with a hard cap on queued spans, a choice of overflow
+    policy, export retries and `ExportStats` counters.
+
+    Memory stays flat when the backend is slow or down: at most `max_queue_size`
+    spans are held, and everything beyond that is counted in `stats.dropped`.
+    """
+    def __init__(
+        self,
+        exporter: SpanExporter,
+        max_queue_size: int = 2048,
+        max_export_batch_size: int = 512,
+        schedule_delay_millis: float = 5000,
+        export_timeout_millis: float = 30000,
+        overflow_policy: str = DROP_NEWEST,
+        block_timeout_millis: float = 100,
+        max_export_retries: int = 2,
+        retry_backoff_millis: float = 500,
+        stats: Optional[ExportStats] = None,
+    ):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy {overflow_policy!r}, expected one of {OVERFLOW_POLICIES}.")
+        if max_export_batch_size > max_queue_size:
+            raise ValueError("`max_export_batch_size` must be less than or equal to `max_queue_size`.")
+
+        self.exporter = exporter
+        self.max_queue_size = max_queue_size
+        self.max_export_batch_size = max_export_batch_size
+        self.schedule_delay = schedule_delay_millis / 1000.0
+        self.export_timeout = export_timeout_millis / 1000.0
+        self.overflow_policy = overflow_policy
+        self.block_timeout = block_timeout_millis / 1000.0
+        self.max_export_retries = max_export_retries
+        self.retry_backoff = retry_backoff_millis / 1000.0
+        self.stats = stats or ExportStats()
+
+        self._shutdown = False
+        self._shutdown_event = threading.Event()
+        self._init_worker()
+
+        # A forked child (gunicorn pre-fork, multiprocessing) inherits the queue and lock
+        # but not the worker thread, so it gets a fresh pipeline of its own.
+        register_after_fork(self._at_fork_reinit)
+
+    def _init_worker(self):
+        self._queue: Deque[ReadableSpan] = collections.deque()
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        self._flush_events: List[threading.Event] = []
+
+        self._worker = threading.Thread(target=self._run, name="agentbay-span-export", daemon=True)
+        self._worker.start()
+
+    def _at_fork_reinit(self):
+        """
+        Runs in the child right after a fork. Spans queued by the parent are discarded
+        (the parent still exports them), and a new worker thread is started.
+        """
+        if self._shutdown:
+            return
+        self.stats.reset()
+        self._init_worker()
+
+    def on_start(self, span: Span, parent_context: Optional[Context] = None):
+        pass
+
+    def on_end(self, span: ReadableSpan):
+        if not (span.context and span.context.trace_flags.sampled):
+            return
+
+        with self._lock:
+            if self._shutdown:
+                self._drop(span)
+                return
+
+            if len(self._queue) >= self.max_queue_size:
+                if self.overflow_policy == DROP_OLDEST:
+                    self._drop(self._queue.popleft())
+                elif self.overflow_policy == BLOCK and self._wait_for_room():
+                    pass
+                else:
+                    self._drop(span)
+                    return
+
+            self._queue.append(span)
+            self.stats.add("enqueued")
+            if len(self._queue) >= self.max_export_batch_size:
+                self._not_empty.notify()
+
+    def _drop(self, span: ReadableSpan):
+        self.stats.add("dropped")
+        serialization.discard(span)
+
+    def _wait_for_room(self) -> bool:
+        """
+        Waits (holding the lock) until the worker frees a slot. Returns False on timeout.
+        """
+        return self._not_full.wait_for(
+            lambda: self._shutdown or len(self._queue) < self.max_queue_size,
+            timeout=self.block_timeout,
+        ) and not self._shutdown
+
+    def _ready(self) -> bool:
+        return self._shutdown or bool(self._flush_events) or len(self._queue) >= self.max_export_batch_size
+
+    def _run(self):
+        """
+        Worker loop: export a batch when it is full or `schedule_delay` has passed;
+        drain everything on flush and shutdown.
+        """
+        while True:
+            with self._lock:
+                if not self._ready():
+                    self._not_empty.wait(self.schedule_delay)
+                shutdown = self._shutdown
+                flush_events, self._flush_events = self._flush_events, []
+
+            self._export_pending(drain=shutdown or bool(flush_events))
+
+            for event in flush_events:
+                event.set()
+            if shutdown:
+                return
+
+    def _export_pending(self, drain: bool):
+        while True:
+            with self._lock:
+                if not self._queue:
+                    return
+                count = min(self.max_export_batch_size, len(self._queue))
+                batch = [self._queue.popleft() for _ in range(count)]
+                self._not_full.notify_all()
+
+            self._export_batch(batch)
+            if not drain:
+                return
+
+    def _export_batch(self, batch: List[ReadableSpan]):
+        attempt = 0
+        while True:
+            try:
+                result = self.exporter.export(batch)
+            except Exception:
+                logger.exception("AgentBay SDK Error: Exception while exporting spans")
+                result = SpanExportResult.FAILURE
+
+            if result == SpanExportResult.SUCCESS:
+                self.stats.add("exported", len(batch))
+                return
+
+            if attempt >= self.max_export_retries or self._shutdown_event.is_set():
+                self.stats.add("failed", len(batch))
+                return
+
+            attempt += 1
+            self.stats.add("retried", len(batch))
+            # Exponential backoff, interrupted by shutdown
+            self._shutdown_event.wait(self.retry_backoff * (2 ** (attempt - 1)))
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        """
+        Exports everything queued so far. Returns False if it did not finish in time.
+        """
+        event = threading.Event()
+        with self._lock:
+            if self._shutdown:
+                return False
+            self._flush_events.append(event)
+            self._not_empty.notify()
+        return event.wait(timeout_millis / 1000.0)
+
+    def shutdown(self):
+        """
+        Exports the remaining spans (without retries) and stops the worker thread.
+        """
+        with self._lock:
+            if self._shutdown:
+                return
+            self._shutdown = True
+            self._shutdown_event.set()
+            self._not_empty.notify()
+            self._not_full.notify_all()
+
+        self._worker.join(timeout=self.export_timeout)
+        self.exporter.shutdown()
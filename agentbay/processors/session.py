@@ -0,0 +1,29 @@
+from typing import Optional
+
+from opentelemetry import context as otel_context
+from opentelemetry.sdk.trace import ReadableSpan, Span, SpanProcessor
+
+from ..context import SESSION_KEY
+
+class SessionSpanProcessor(SpanProcessor):
+    """
+    Stamps the attributes of the active `agentbay.session()` on every span at start,
+    so the spans of a session can be grouped (and rolled up) by `session.id` without
+    joining over trace ids.
+    """
+    def on_start(self, span: Span, parent_context: Optional[otel_context.Context] = None):
+        attributes = otel_context.get_value(SESSION_KEY, parent_context)
+        if attributes is None and parent_context is not None:
+            # An explicitly built parent context (e.g. extracted from headers) may not carry it
+            attributes = otel_context.get_value(SESSION_KEY)
+        if attributes:
+            span.set_attributes(attributes)
+
+    def on_end(self, span: ReadableSpan):
+        pass
+
+    def shutdown(self):
+        pass
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return True
@@ -0,0 +1,166 @@
+"""
+Queries over finished spans, for local profiling and performance assertions in tests.
+
+    client = agentbay.init(exporter="memory")
+    run_agent()
+    spans = client.query()
+    spans.filter(name="openai.chat.completions.create gpt-4o").slowest(5)
+    spans.aggregate()["retrieve"]["p95_ms"]
+"""
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from opentelemetry.trace import StatusCode
+
+from .streaming import _percentile
+
+_TOKEN_KEYS = ("prompt_tokens", "completion_tokens", "total_tokens")
+
+def duration_ms(span: Any) -> float:
+    """
+    Duration of a finished span in milliseconds.
+    """
+    if span.end_time is None or span.start_time is None:
+        return 0.0
+    return (span.end_time - span.start_time) / 1e6
+
+def _is_error(span: Any) -> bool:
+    return span.status is not None and span.status.status_code == StatusCode.ERROR
+
+class SpanNode:
+    """
+    A span and its child spans (in start order), as built by `SpanQuery.tree()`.
+    """
+    __slots__ = ("span", "children")
+
+    def __init__(self, span: Any):
+        self.span = span
+        self.children: List["SpanNode"] = []
+
+    @property
+    def name(self) -> str:
+        return self.span.name
+
+    @property
+    def duration_ms(self) -> float:
+        return duration_ms(self.span)
+
+    def walk(self) -> Iterator["SpanNode"]:
+        """
+        Yields this node and all its descendants, depth first.
+        """
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(reversed(node.children))
+
+    def __repr__(self) -> str:
+        return f"SpanNode({self.name!r}, {self.duration_ms:.1f}ms, {len(self.children)} children)"
+
+class SpanQuery:
+    """
+    An immutable selection of finished spans. Filters return a new `SpanQuery`.
+    """
+    def __init__(self, spans: Iterable[Any]):
+        self.spans: List[Any] = list(spans)
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self.spans)
+
+    def __len__(self) -> int:
+        return len(self.spans)
+
+    def filter(
+        self,
+        name: Optional[str] = None,
+        attributes: Optional[Dict[str, Any]] = None,
+        predicate: Optional[Callable[[Any], bool]] = None,
+    ) -> "SpanQuery":
+        """
+        Keeps spans with this exact `name`, these attribute values (e.g.
+        `{"llm.request.model": "gpt-4o"}`) and for which `predicate(span)` is true.
+        """
+        spans = self.spans
+        if name is not None:
+            spans = [span for span in spans if span.name == name]
+        if attributes:
+            items = attributes.items()
+            spans = [
+                span for span in spans
+                if all((span.attributes or {}).get(key) == value for key, value in items)
+            ]
+        if predicate is not None:
+            spans = [span for span in spans if predicate(span)]
+        return SpanQuery(spans)
+
+    def trace(self, trace_id: int) -> "SpanQuery":
+        """
+        Keeps the spans of one trace.
+        """
+        return SpanQuery(span for span in self.spans if span.context.trace_id == trace_id)
+
+    def session(self, session_id: str) -> "SpanQuery":
+        """
+        Keeps the spans of one `agentbay.session()`.
+        """
+        return self.filter(attributes={"session.id": session_id})
+
+    def slowest(self, n: int = 10) -> List[Any]:
+        """
+        Returns the `n` longest spans, longest first.
+        """
+        return sorted(self.spans, key=duration_ms, reverse=True)[:n]
+
+    def errors(self) -> "SpanQuery":
+        """
+        Keeps spans with an ERROR status.
+        """
+        return self.filter(predicate=_is_error)
+
+    def tree(self) -> List[SpanNode]:
+        """
+        Links spans to their parents and returns the roots (spans whose parent is not
+        in the selection), in start order. Children are in start order too.
+        """
+        ordered = sorted(self.spans, key=lambda span: span.start_time or 0)
+        nodes = {span.context.span_id: SpanNode(span) for span in ordered}
+        roots: List[SpanNode] = []
+        for node in nodes.values():
+            parent = node.span.parent
+            parent_node = nodes.get(parent.span_id) if parent is not None else None
+            if parent_node is not None:
+                parent_node.children.append(node)
+            else:
+                roots.append(node)
+        return roots
+
+    def aggregate(self) -> Dict[str, Dict[str, float]]:
+        """
+        Returns latency and token statistics per span name: count, errors, total/mean/
+        p50/p95/max in milliseconds, and summed `llm.usage.*` tokens.
+        """
+        durations: Dict[str, List[float]] = {}
+        results: Dict[str, Dict[str, float]] = {}
+        for span in self.spans:
+            stats = results.get(span.name)
+            if stats is None:
+                stats = results[span.name] = {"count": 0, "errors": 0, **{key: 0 for key in _TOKEN_KEYS}}
+                durations[span.name] = []
+            stats["count"] += 1
+            durations[span.name].append(duration_ms(span))
+            if _is_error(span):
+                stats["errors"] += 1
+            attributes = span.attributes or {}
+            for key in _TOKEN_KEYS:
+                value = attributes.get(f"llm.usage.{key}")
+                if isinstance(value, int):
+                    stats[key] += value
+
+        for name, stats in results.items():
+            values = sorted(durations[name])
+            stats["total_ms"] = sum(values)
+            stats["mean_ms"] = stats["total_ms"] / len(values)
+            stats["p50_ms"] = _percentile(values, 50)
+            stats["p95_ms"] = _percentile(values, 95)
+            stats["max_ms"] = values[-1]
+        return results
@@ -0,0 +1,19 @@
+import os
+
+def disabled_by_env() -> bool:
+    return os.environ.get("AGENTBAY_DISABLED", "").strip().lower() in ("1", "true", "yes", "on")
+
+class _State:
+    """
+    Process-wide switch read on every traced call, so it is a single attribute.
+    Disabled with `AGENTBAY_DISABLED=1` (read at import) or `agentbay.init(enabled=False)`.
+    """
+    __slots__ = ("enabled",)
+
+    def __init__(self):
+        self.enabled = not disabled_by_env()
+
+state = _State()
+
+def set_enabled(enabled: bool):
+    state.enabled = enabled
@@ -0,0 +1,190 @@
+import collections
+import threading
+from typing import Dict, List, Optional
+
+from opentelemetry.context import Context
+from opentelemetry.sdk.trace import ReadableSpan, Span, SpanProcessor
+from opentelemetry.sdk.trace.sampling import ALWAYS_ON, ParentBased, Sampler, TraceIdRatioBased
+from opentelemetry.trace import StatusCode
+
+from . import serialization
+from .utils import register_after_fork
+
+# Decisions remembered for traces no longer buffered, applied to their late spans
+_MAX_DECIDED_TRACES = 10000
+
+# Same bound TraceIdRatioBased uses, so head and tail ratios agree on which trace ids they keep
+_TRACE_ID_LIMIT = (1 << 64) - 1
+
+def create_sampler(sample_rate: float = 1.0) -> Sampler:
+    """
+    Head sampler: keeps `sample_rate` of new traces, chosen by trace id.
+    Child spans follow their parent's decision, so a trace is never half-sampled.
+    """
+    if sample_rate >= 1.0:
+        return ParentBased(ALWAYS_ON)
+    return ParentBased(TraceIdRatioBased(sample_rate))
+
+class _TraceBuffer:
+    """
+    Finished spans of one trace waiting for the tail sampling decision.
+    """
+    __slots__ = ("spans", "error", "tokens")
+
+    def __init__(self):
+        self.spans: List[ReadableSpan] = []
+        self.error = False
+        self.tokens = 0
+
+class TailSamplingProcessor(SpanProcessor):
+    """
+    Buffers the spans of each trace until its local root span ends, then decides
+    whether to pass the whole trace to `downstream` (usually the batch processor):
+
+    - kept if any span has an error status,
+    - kept if the root span took longer than `latency_threshold_millis`,
+    - kept if the trace used more than `token_threshold` tokens (`llm.usage.total_tokens`),
+    - otherwise kept for `keep_ratio` of traces (by trace id) and dropped for the rest.
+
+    At most `max_buffered_spans` spans are held. When the buffer is full, the oldest
+    trace is decided early with what is known so far (errors and tokens). Decisions of
+    recent traces are remembered, so spans that end after their trace was decided follow
+    the same decision instead of starting a new, fragmentary trace.
+    """
+    def __init__(
+        self,
+        downstream: SpanProcessor,
+        latency_threshold_millis: Optional[float] = None,
+        token_threshold: Optional[int] = None,
+        keep_ratio: float = 0.0,
+        max_buffered_spans: int = 10000,
+    ):
+        self.downstream = downstream
+        self.latency_threshold_ns = None if latency_threshold_millis is None else int(latency_threshold_millis * 1e6)
+        self.token_threshold = token_threshold
+        self.keep_bound = int(keep_ratio * _TRACE_ID_LIMIT)
+        self.max_buffered_spans = max_buffered_spans
+
+        self._traces: "collections.OrderedDict[int, _TraceBuffer]" = collections.OrderedDict()
+        self._decided: "collections.OrderedDict[int, bool]" = collections.OrderedDict()
+        self._buffered = 0
+        self._lock = threading.Lock()
+        self._stats: Dict[str, int] = {"kept": 0, "dropped": 0, "evicted": 0}
+
+        register_after_fork(self._at_fork_reinit)
+
+    def _at_fork_reinit(self):
+        """
+        Runs in a forked child: traces buffered by the parent belong to the parent.
+        """
+        self._traces = collections.OrderedDict()
+        self._decided = collections.OrderedDict()
+        self._buffered = 0
+        self._lock = threading.Lock()
+        self._stats = {"kept": 0, "dropped": 0, "evicted": 0}
+
+    def on_start(self, span: Span, parent_context: Optional[Context] = None):
+        self.downstream.on_start(span, parent_context=parent_context)
+
+    def on_end(self, span: ReadableSpan):
+        if not (span.context and span.context.trace_flags.sampled):
+            return
+
+        decided: List[ReadableSpan] = []
+        with self._lock:
+            trace_id = span.context.trace_id
+            keep = self._decided.get(trace_id)
+            if keep is not None:
+                # A late span of a trace that was already decided (e.g. evicted early)
+                if keep:
+                    decided.append(span)
+                else:
+                    serialization.discard(span)
+            else:
+                self._add(trace_id, span, decided)
+
+        # Forward outside the lock: the downstream processor may block (e.g. "block" overflow policy)
+        for kept in decided:
+            self.downstream.on_end(kept)
+
+    def _add(self, trace_id: int, span: ReadableSpan, decided: List[ReadableSpan]):
+        """
+        Buffers a span, deciding its trace when it is the local root and the oldest traces
+        when the buffer is full. Kept spans are appended to `decided`. Called with the lock held.
+        """
+        buffer = self._traces.get(trace_id)
+        if buffer is None:
+            buffer = self._traces[trace_id] = _TraceBuffer()
+
+        buffer.spans.append(span)
+        self._buffered += 1
+        if span.status.status_code == StatusCode.ERROR:
+            buffer.error = True
+        tokens = (span.attributes or {}).get("llm.usage.total_tokens")
+        if isinstance(tokens, int):
+            buffer.tokens += tokens
+
+        # A span without a local parent closes the trace in this process
+        if span.parent is None or span.parent.is_remote:
+            del self._traces[trace_id]
+            self._buffered -= len(buffer.spans)
+            if self._keep(trace_id, buffer, span):
+                decided.extend(buffer.spans)
+
+        while self._buffered > self.max_buffered_spans and self._traces:
+            old_id, old = self._traces.popitem(last=False)
+            self._buffered -= len(old.spans)
+            self._stats["evicted"] += 1
+            if self._keep(old_id, old, None):
+                decided.extend(old.spans)
+
+    def _keep(self, trace_id: int, buffer: _TraceBuffer, root: Optional[ReadableSpan]) -> bool:
+        """
+        Makes the sampling decision for one trace. Called with the lock held.
+        """
+        keep = buffer.error or (trace_id & _TRACE_ID_LIMIT) < self.keep_bound
+        if not keep and self.token_threshold is not None:
+            keep = buffer.tokens > self.token_threshold
+        if not keep and root is not None and self.latency_threshold_ns is not None:
+            keep = (root.end_time - root.start_time) > self.latency_threshold_ns
+
+        self._stats["kept" if keep else "dropped"] += 1
+        self._decided[trace_id] = keep
+        if len(self._decided) > _MAX_DECIDED_TRACES:
+            self._decided.popitem(last=False)
+        if not keep:
+            # Raw values held for deferred serialization would otherwise wait to be evicted
+            for span in buffer.spans:
+                serialization.discard(span)
+        return keep
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Returns the number of traces kept, dropped and evicted early (buffer full),
+        plus the spans and traces currently buffered.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["buffered_spans"] = self._buffered
+            stats["buffered_traces"] = len(self._traces)
+            return stats
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        # Incomplete traces stay buffered: their decision isn't known yet
+        return self.downstream.force_flush(timeout_millis)
+
+    def shutdown(self):
+        """
+        Decides all buffered traces with what is known, then shuts down `downstream`.
+        """
+        decided: List[ReadableSpan] = []
+        with self._lock:
+            while self._traces:
+                trace_id, buffer = self._traces.popitem(last=False)
+                if self._keep(trace_id, buffer, None):
+                    decided.extend(buffer.spans)
+            self._buffered = 0
+
+        for kept in decided:
+            self.downstream.on_end(kept)
+        self.downstream.shutdown()
@@ -0,0 +1,271 @@
+import os
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, List, Optional, Tuple
+
+# Default cap for a single serialized span attribute (inputs, outputs, prompts, responses).
+DEFAULT_MAX_ATTRIBUTE_BYTES = 32 * 1024
+
+# Appended to a value that was cut at the cap, so truncation is visible in the backend.
+TRUNCATION_MARKER = "...[truncated]"
+
+# Nested containers deeper than this are rendered as "..." instead of being walked.
+_MAX_DEPTH = 16
+
+# Upper bound on the (estimated) size of raw values waiting for deferred serialization
+# (see `set_attribute`).
+_MAX_PENDING_BYTES = 64 * 1024 * 1024
+
+# Items of a container looked at when estimating its size; the rest are assumed similar.
+_SIZE_SAMPLE_ITEMS = 64
+
+class _Settings:
+    """
+    Process-wide serialization settings. Configured by `AgentBay` from `Config`.
+    """
+    def __init__(self):
+        self.max_attribute_bytes = DEFAULT_MAX_ATTRIBUTE_BYTES
+        self.defer = False
+
+settings = _Settings()
+
+def configure(max_attribute_bytes: Optional[int] = None, defer: Optional[bool] = None):
+    """
+    Updates the process-wide serialization settings. `None` leaves a setting unchanged.
+    """
+    if max_attribute_bytes is not None:
+        settings.max_attribute_bytes = max_attribute_bytes
+    if defer is not None:
+        settings.defer = defer
+
+class _Full(Exception):
+    """Raised by `_BoundedWriter` once the cap is reached, to stop walking the value."""
+
+class _BoundedWriter:
+    """
+    Collects string fragments until `limit` characters have been written.
+    """
+    __slots__ = ("parts", "remaining")
+
+    def __init__(self, limit: int):
+        self.parts: List[str] = []
+        self.remaining = limit
+
+    def write(self, text: str):
+        if len(text) > self.remaining:
+            self.parts.append(text[:self.remaining])
+            self.remaining = 0
+            raise _Full()
+        self.parts.append(text)
+        self.remaining -= len(text)
+
+def _write_items(writer: _BoundedWriter, items, seen: set, depth: int):
+    for i, item in enumerate(items):
+        if i:
+            writer.write(", ")
+        _write_value(writer, item, True, seen, depth)
+
+def _write_value(writer: _BoundedWriter, value: Any, nested: bool, seen: set, depth: int):
+    """
+    Writes `str(value)` (or `repr(value)` when nested in a container) into `writer`.
+    Built-in containers are walked item by item, so a huge list or dict is only
+    rendered up to the cap instead of being stringified in full first.
+    """
+    if isinstance(value, str):
+        # Only the part that can still fit is sliced (and quoted) - never the full string
+        text = value[:writer.remaining]
+        writer.write(repr(text) if nested else text)
+        return
+
+    if value is None or isinstance(value, (bool, int, float)):
+        writer.write(repr(value))
+        return
+
+    kind = type(value)
+    if kind not in (dict, list, tuple, set):
+        # Arbitrary objects only know how to render themselves in full
+        writer.write(repr(value) if nested else str(value))
+        return
+
+    if depth >= _MAX_DEPTH:
+        writer.write("...")
+        return
+
+    # Self-referencing containers are rendered the way Python does it
+    if id(value) in seen:
+        writer.write("{...}" if kind is dict else "[...]" if kind is list else "(...)")
+        return
+    seen.add(id(value))
+
+    try:
+        if kind is dict:
+            writer.write("{")
+            for i, (key, item) in enumerate(value.items()):
+                if i:
+                    writer.write(", ")
+                _write_value(writer, key, True, seen, depth + 1)
+                writer.write(": ")
+                _write_value(writer, item, True, seen, depth + 1)
+            writer.write("}")
+        elif kind is list:
+            writer.write("[")
+            _write_items(writer, value, seen, depth + 1)
+            writer.write("]")
+        elif kind is tuple:
+            writer.write("(")
+            _write_items(writer, value, seen, depth + 1)
+            writer.write(",)" if len(value) == 1 else ")")
+        elif value:
+            writer.write("{")
+            _write_items(writer, value, seen, depth + 1)
+            writer.write("}")
+        else:
+            writer.write("set()")
+    finally:
+        seen.discard(id(value))
+
+def serialize(value: Any, max_bytes: Optional[int] = None) -> str:
+    """
+    Converts `value` to a string for use as a span attribute, capped at `max_bytes`
+    UTF-8 bytes (defaults to `settings.max_attribute_bytes`).
+
+    The output matches `str(value)` for values under the cap. Longer values are cut
+    while they are being rendered and end with `TRUNCATION_MARKER`.
+    """
+    limit = settings.max_attribute_bytes if max_bytes is None else max_bytes
+
+    # A character is at most 4 UTF-8 bytes, so writing `limit` characters always
+    # produces enough text to fill the byte cap.
+    writer = _BoundedWriter(limit)
+    truncated = False
+    try:
+        _write_value(writer, value, False, set(), 0)
+    except _Full:
+        truncated = True
+
+    text = "".join(writer.parts)
+    if not truncated and len(text) * 4 <= limit:
+        return text
+
+    encoded = text.encode("utf-8", "ignore")
+    if not truncated and len(encoded) <= limit:
+        return text
+
+    budget = max(limit - len(TRUNCATION_MARKER), 0)
+    return encoded[:budget].decode("utf-8", "ignore") + TRUNCATION_MARKER
+
+def _estimate_size(value: Any, depth: int = 0) -> int:
+    """
+    Rough size in bytes of a raw value held for deferred serialization. Strings and bytes
+    count their length; containers a sample of their items, so estimating stays cheap.
+    """
+    if isinstance(value, (str, bytes, bytearray)):
+        return len(value)
+    kind = type(value)
+    if kind not in (dict, list, tuple, set) or depth >= 2 or not value:
+        return sys.getsizeof(value)
+
+    items = value.items() if kind is dict else value
+    sampled = 0
+    total = 0
+    for item in items:
+        if sampled == _SIZE_SAMPLE_ITEMS:
+            break
+        if kind is dict:
+            total += _estimate_size(item[0], depth + 1) + _estimate_size(item[1], depth + 1)
+        else:
+            total += _estimate_size(item, depth + 1)
+        sampled += 1
+    return sys.getsizeof(value) + total * len(value) // sampled
+
+class _PendingSpan:
+    __slots__ = ("values", "size")
+
+    def __init__(self):
+        self.values: List[Tuple[str, Any, Optional[int]]] = []
+        self.size = 0
+
+class _PendingAttributes:
+    """
+    Raw values waiting to be serialized on the export thread, keyed by span.
+
+    Entries are removed when the span is exported (`pop`) or dropped on the way there
+    (`discard`: tail sampling, queue overflow). Bounded by the estimated size of the held
+    values: past `max_bytes`, the oldest spans lose their deferred values.
+    """
+    def __init__(self, max_bytes: int = _MAX_PENDING_BYTES):
+        self.max_bytes = max_bytes
+        self._spans: "OrderedDict[Tuple[int, int], _PendingSpan]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def add(self, span_key: Tuple[int, int], key: str, value: Any, max_bytes: Optional[int]):
+        size = _estimate_size(value)
+        with self._lock:
+            entry = self._spans.get(span_key)
+            if entry is None:
+                entry = self._spans[span_key] = _PendingSpan()
+            entry.values.append((key, value, max_bytes))
+            entry.size += size
+            self._bytes += size
+            while self._bytes > self.max_bytes and len(self._spans) > 1:
+                _, oldest = self._spans.popitem(last=False)
+                self._bytes -= oldest.size
+
+    def pop(self, span_key: Tuple[int, int]) -> Optional[List[Tuple[str, Any, Optional[int]]]]:
+        with self._lock:
+            entry = self._spans.pop(span_key, None)
+            if entry is None:
+                return None
+            self._bytes -= entry.size
+            return entry.values
+
+    @property
+    def size(self) -> int:
+        """
+        Estimated bytes of raw values currently held.
+        """
+        return self._bytes
+
+    def __len__(self) -> int:
+        return len(self._spans)
+
+    def _at_fork_reinit(self):
+        # The parent's spans are exported by the parent; the lock may have been held mid-fork
+        self._spans = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+pending = _PendingAttributes()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=pending._at_fork_reinit)
+
+def discard(span: Any):
+    """
+    Releases the deferred values of a finished span that won't be exported (dropped by
+    tail sampling or a full export queue), instead of holding them until evicted.
+    """
+    if pending:
+        ctx = span.context
+        pending.pop((ctx.trace_id, ctx.span_id))
+
+def set_attribute(span: Any, key: str, value: Any, max_bytes: Optional[int] = None):
+    """
+    Serializes `value` with `serialize()` and sets it on `span`.
+
+    Nothing is serialized when the span is not recording (e.g. sampled out).
+    When deferred serialization is enabled, the raw value is kept (by reference)
+    and only stringified by `agentbay.exporters.DeferredAttributeExporter` on the
+    export thread, keeping the work off the caller's thread.
+    """
+    if not span.is_recording():
+        return
+
+    if settings.defer:
+        ctx = span.get_span_context()
+        pending.add((ctx.trace_id, ctx.span_id), key, value, max_bytes)
+        return
+
+    span.set_attribute(key, serialize(value, max_bytes))
@@ -1,6 +1,7 @@
 # IMPORTANT NOTE: This session layer is deprecated and will be removed in the future.
 # We are using the OpenTelemetry SDK to send data to the AgentBay backend.
 # The OpenTelemetry SDK is a more robust and feature-rich SDK that is more suited for this purpose.
+# Use `with agentbay.session(session_id, user_id=...)` to group spans by session instead.
 
 import uuid
 import time
@@ -0,0 +1,317 @@
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+from typing import BinaryIO, Dict, List, Optional, Sequence, Tuple
+
+from opentelemetry.sdk.trace import ReadableSpan
+from opentelemetry.sdk.trace.export import SpanExporter, SpanExportResult
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# fsync policies for appended records
+FSYNC_ALWAYS = "always"  # after every record: survives power loss, slowest
+FSYNC_BATCH = "batch"    # when a segment is rotated and at most every `fsync_interval` seconds
+FSYNC_NEVER = "never"    # leave it to the OS: survives process crashes, not power loss
+FSYNC_POLICIES = (FSYNC_ALWAYS, FSYNC_BATCH, FSYNC_NEVER)
+
+# Record header: payload length and CRC32 of the payload
+_RECORD_HEADER = struct.Struct(">II")
+_SEGMENT_SUFFIX = ".seg"
+_LOCK_FILE = ".lock"
+
+class SpillDirectoryLocked(OSError):
+    """
+    Raised when another process already owns the spill directory.
+    """
+
+class SpillQueue:
+    """
+    Durable FIFO of encoded span batches: an append-only log split into segment files.
+
+    - `append()` writes a record to the newest segment, rotating it at `segment_bytes`.
+    - When the log exceeds `max_bytes`, the oldest segments are deleted (oldest-first eviction).
+    - `next_record()` / `commit()` read records oldest-first; a segment is deleted once
+      all its records are committed. Segments left by a previous run are picked up on start.
+
+    Delivery is at-least-once: records read but not committed before a crash are replayed again.
+
+    A directory has a single owner: the queue holds an exclusive `flock` on it until `close()`,
+    and raises `SpillDirectoryLocked` if another process (e.g. a sibling worker) owns it.
+    Segment numbers and replay assume no other writer, so each process needs its own directory.
+    """
+    def __init__(
+        self,
+        directory: str,
+        max_bytes: int = 256 * 1024 * 1024,
+        segment_bytes: int = 8 * 1024 * 1024,
+        fsync: str = FSYNC_BATCH,
+        fsync_interval: float = 1.0,
+    ):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy {fsync!r}, expected one of {FSYNC_POLICIES}.")
+
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.segment_bytes = segment_bytes
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+
+        self._lock = threading.Lock()
+        self._stats: Dict[str, int] = {"spilled": 0, "replayed": 0, "evicted_bytes": 0, "corrupt_segments": 0}
+
+        os.makedirs(directory, exist_ok=True)
+        self._lock_fd = self._acquire(directory)
+        self._segments: List[int] = sorted(
+            int(name[:-len(_SEGMENT_SUFFIX)])
+            for name in os.listdir(directory)
+            if name.endswith(_SEGMENT_SUFFIX) and name[:-len(_SEGMENT_SUFFIX)].isdigit()
+        )
+        self._sizes: Dict[int, int] = {seq: os.path.getsize(self._path(seq)) for seq in self._segments}
+
+        # Writer: always a new segment, never appending to a file from a previous run
+        self._active_seq = (self._segments[-1] + 1) if self._segments else 0
+        self._active: Optional[BinaryIO] = None
+        self._last_fsync = time.monotonic()
+
+        # Reader: position inside the oldest segment
+        self._read_offset = 0
+
+    @staticmethod
+    def _acquire(directory: str) -> Optional[int]:
+        if fcntl is None:
+            return None
+        fd = os.open(os.path.join(directory, _LOCK_FILE), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            raise SpillDirectoryLocked(f"Spill directory {directory!r} is in use by another process.") from None
+        return fd
+
+    def _path(self, seq: int) -> str:
+        return os.path.join(self.directory, f"{seq:020d}{_SEGMENT_SUFFIX}")
+
+    @property
+    def size_bytes(self) -> int:
+        return sum(self._sizes.values())
+
+    def __len__(self) -> int:
+        """Number of segments on disk (including the one being written)."""
+        return len(self._segments)
+
+    def append(self, payload: bytes):
+        """
+        Appends one record, then evicts the oldest segments if the log is over `max_bytes`.
+        """
+        record = _RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+        with self._lock:
+            if self._active is None:
+                self._open_segment()
+            elif self._sizes[self._active_seq] + len(record) > self.segment_bytes and self._sizes[self._active_seq]:
+                self._close_segment()
+                self._open_segment()
+
+            self._active.write(record)
+            self._active.flush()
+            self._sizes[self._active_seq] += len(record)
+            self._stats["spilled"] += 1
+
+            if self.fsync == FSYNC_ALWAYS or (
+                self.fsync == FSYNC_BATCH and time.monotonic() - self._last_fsync >= self.fsync_interval
+            ):
+                self._sync()
+
+            self._evict()
+
+    def _open_segment(self):
+        self._active = open(self._path(self._active_seq), "ab")
+        self._segments.append(self._active_seq)
+        self._sizes[self._active_seq] = 0
+
+    def _close_segment(self):
+        if self.fsync != FSYNC_NEVER:
+            self._sync()
+        self._active.close()
+        self._active = None
+        self._active_seq += 1
+
+    def _sync(self):
+        os.fsync(self._active.fileno())
+        self._last_fsync = time.monotonic()
+
+    def _evict(self):
+        while self.size_bytes > self.max_bytes and len(self._segments) > 1:
+            self._delete_oldest(evicted=True)
+
+    def _delete_oldest(self, evicted: bool = False):
+        seq = self._segments.pop(0)
+        size = self._sizes.pop(seq)
+        if evicted:
+            self._stats["evicted_bytes"] += size
+            logger.warning("AgentBay SDK: spill queue over %d bytes, dropped oldest segment (%d bytes)", self.max_bytes, size)
+        self._read_offset = 0
+        try:
+            os.unlink(self._path(seq))
+        except FileNotFoundError:
+            pass
+
+    def next_record(self) -> Optional[Tuple[Tuple[int, int, int], bytes]]:
+        """
+        Returns (position, payload) of the oldest uncommitted record, or None if the queue is empty.
+        The segment being written is rotated first, so the reader never shares a file with the writer.
+        """
+        with self._lock:
+            while self._segments:
+                seq = self._segments[0]
+                if seq == self._active_seq and self._active is not None:
+                    self._close_segment()
+
+                if self._read_offset >= self._sizes[seq]:
+                    self._delete_oldest()
+                    continue
+
+                payload = self._read(seq, self._read_offset)
+                if payload is None:
+                    # Torn write or corruption: the rest of the segment can't be trusted
+                    self._stats["corrupt_segments"] += 1
+                    self._delete_oldest()
+                    continue
+                end = self._read_offset + _RECORD_HEADER.size + len(payload)
+                return (seq, self._read_offset, end), payload
+            return None
+
+    def _read(self, seq: int, offset: int) -> Optional[bytes]:
+        with open(self._path(seq), "rb") as f:
+            f.seek(offset)
+            header = f.read(_RECORD_HEADER.size)
+            if len(header) < _RECORD_HEADER.size:
+                return None
+            size, crc = _RECORD_HEADER.unpack(header)
+            payload = f.read(size)
+        if len(payload) < size or zlib.crc32(payload) != crc:
+            return None
+        return payload
+
+    def commit(self, position: Tuple[int, int, int]):
+        """
+        Marks the record at `position` (from `next_record`) as delivered.
+        """
+        seq, offset, end = position
+        with self._lock:
+            if not self._segments or self._segments[0] != seq or self._read_offset != offset:
+                # Evicted while it was being replayed
+                return
+            self._stats["replayed"] += 1
+            self._read_offset = end
+            if self._read_offset >= self._sizes[seq]:
+                self._delete_oldest()
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["spill_bytes"] = self.size_bytes
+            return stats
+
+    def close(self):
+        with self._lock:
+            if self._active is not None:
+                self._close_segment()
+            if self._lock_fd is not None:
+                # Closing the descriptor releases the lock
+                os.close(self._lock_fd)
+                self._lock_fd = None
+
+class SpillingExporter(SpanExporter):
+    """
+    Wraps an exporter with `export_serialized()` (HTTP or aggregator socket). Batches that
+    fail to export are written to a `SpillQueue` instead of being retried in memory, and a
+    background thread replays them with exponential backoff once the backend is reachable.
+
+    Replay sends one record at a time, at most every `replay_interval` seconds, so it
+    never competes with live export for more than a single request.
+
+    The spill directory belongs to the process that created the exporter: forked
+    children don't spill, their failed batches are retried in memory by the processor.
+    """
+    def __init__(
+        self,
+        exporter: SpanExporter,
+        queue: SpillQueue,
+        replay_interval: float = 0.05,
+        min_backoff: float = 1.0,
+        max_backoff: float = 60.0,
+    ):
+        self.exporter = exporter
+        self.queue = queue
+        self.replay_interval = replay_interval
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+
+        self._pid = os.getpid()
+        self._backoff = min_backoff
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._replayer = threading.Thread(target=self._replay_loop, name="agentbay-spill-replay", daemon=True)
+        self._replayer.start()
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        from opentelemetry.exporter.otlp.proto.common.trace_encoder import encode_spans
+
+        payload = encode_spans(spans).SerializeToString()
+        result = self.exporter.export_serialized(payload)
+        if self._pid != os.getpid():
+            return result
+
+        if result == SpanExportResult.SUCCESS:
+            # Connectivity is back: replay what was spilled without waiting for the backoff
+            if self._backoff > self.min_backoff:
+                self._backoff = self.min_backoff
+                self._wake.set()
+            return SpanExportResult.SUCCESS
+
+        try:
+            self.queue.append(payload)
+        except OSError as e:
+            logger.warning("AgentBay SDK Error: Failed to spill spans to disk: %s", e)
+            return SpanExportResult.FAILURE
+        # Stored durably: the batch processor must not also retry it in memory
+        return SpanExportResult.SUCCESS
+
+    def _replay_loop(self):
+        while not self._stop.is_set():
+            record = self.queue.next_record()
+            if record is None:
+                self._wake.wait(self.min_backoff)
+                self._wake.clear()
+                continue
+
+            position, payload = record
+            if self.exporter.export_serialized(payload) == SpanExportResult.SUCCESS:
+                self.queue.commit(position)
+                self._backoff = self.min_backoff
+                self._stop.wait(self.replay_interval)
+            else:
+                self._wake.wait(self._backoff)
+                self._wake.clear()
+                self._backoff = min(self._backoff * 2, self.max_backoff)
+
+    def get_stats(self) -> Dict[str, int]:
+        return self.queue.get_stats()
+
+    def shutdown(self):
+        self._stop.set()
+        self._wake.set()
+        self._replayer.join(timeout=5.0)
+        self.queue.close()
+        self.exporter.shutdown()
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return self.exporter.force_flush(timeout_millis)
@@ -0,0 +1,67 @@
+import math
+import time
+from typing import Any, List, Optional
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    index = max(math.ceil(pct / 100.0 * len(sorted_values)) - 1, 0)
+    return sorted_values[index]
+
+class StreamMetrics:
+    """
+    Timing of a streamed LLM response, shared by all streaming integrations.
+
+    Call `tick()` for every chunk that carries generated output. The cost per chunk is
+    one clock read and one list append; percentiles are only computed in `record()`.
+    """
+    __slots__ = ("start", "first", "last", "chunks", "gaps")
+
+    def __init__(self, start: Optional[float] = None):
+        # `start` is when the request was sent, so time-to-first-token includes the request itself
+        self.start = time.perf_counter() if start is None else start
+        self.first: Optional[float] = None
+        self.last: Optional[float] = None
+        self.chunks = 0
+        self.gaps: List[float] = []
+
+    def tick(self):
+        now = time.perf_counter()
+        if self.first is None:
+            self.first = now
+        else:
+            self.gaps.append(now - self.last)
+        self.last = now
+        self.chunks += 1
+
+    @property
+    def time_to_first_token(self) -> Optional[float]:
+        """Seconds between the request and the first chunk, or None if nothing arrived."""
+        if self.first is None:
+            return None
+        return self.first - self.start
+
+    def record(self, span: Any, tokens: Optional[int] = None):
+        """
+        Sets the streaming attributes on `span`.
+        `tokens` is the completion token count if the provider reported one; otherwise
+        every chunk counts as one token.
+        """
+        if self.first is None or not span.is_recording():
+            return
+
+        span.set_attribute("llm.response.time_to_first_token_ms", (self.first - self.start) * 1000.0)
+        span.set_attribute("llm.response.chunk_count", self.chunks)
+
+        if self.gaps:
+            gaps = sorted(self.gaps)
+            span.set_attribute("llm.response.inter_token_latency.p50_ms", _percentile(gaps, 50) * 1000.0)
+            span.set_attribute("llm.response.inter_token_latency.p90_ms", _percentile(gaps, 90) * 1000.0)
+            span.set_attribute("llm.response.inter_token_latency.p99_ms", _percentile(gaps, 99) * 1000.0)
+
+        # Throughput over the generation phase (first to last chunk)
+        generation = self.last - self.first
+        if generation > 0:
+            count = tokens if tokens else self.chunks
+            span.set_attribute("llm.response.tokens_per_second", count / generation)
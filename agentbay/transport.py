@@ -13,14 +13,18 @@ class Transport:
     Handles asynchronous data transmission to the AgentBay backend.
     Uses a background thread to batch and send events.
     """
-    def __init__(self, config: Config, batch_size: int = 10, flush_interval: float = 2.0):
+    def __init__(self, config: Config, batch_size: int = 10, flush_interval: float = 2.0, max_queue_size: int = 1000):
         self.config = config
-        self.queue: queue.Queue = queue.Queue()
+        # Bounded, so a slow backend can't grow memory without limit
+        self.queue: queue.Queue = queue.Queue(maxsize=max_queue_size)
+        self.dropped = 0
         self.batch_size = batch_size
         self.flush_interval = flush_interval
         
         self._stop_event = threading.Event()
         self._worker_thread: Optional[threading.Thread] = None
+        # Created on first send and reused, so batches share keep-alive connections
+        self._session = None
 
     def start(self):
         """
@@ -36,9 +40,12 @@ class Transport:
     def send(self, event: Dict[str, Any]):
         """
         Adds an event (Session or Span dict) to the queue.
-        Non-blocking.
+        Non-blocking: if the queue is full, the event is dropped and counted in `dropped`.
         """
-        self.queue.put(event)
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
 
     def stop(self):
         """
@@ -59,12 +66,13 @@ class Transport:
             # Collect a batch
             while len(batch) < self.batch_size:
                 # Check if time is up for this batch
-                if (time.time() - start_time) > self.flush_interval:
+                remaining = self.flush_interval - (time.time() - start_time)
+                if remaining <= 0:
                     break
                 
                 try:
-                    # Wait briefly for new items
-                    item = self.queue.get(timeout=0.5)
+                    # Wait briefly for new items (never past the end of the flush interval)
+                    item = self.queue.get(timeout=min(remaining, 0.5))
                     batch.append(item)
                 except queue.Empty:
                     # Queue is empty, continue checking time or stop event
@@ -79,6 +87,9 @@ class Transport:
         Internal method to send a batch of data via HTTP.
         """
         import requests
+
+        if self._session is None:
+            self._session = requests.Session()
         
         url = f"{self.config.api_url}/v1/telemetry" # API URL for the AgentBay backend, needs to be configured 
         headers = {
@@ -87,7 +98,7 @@ class Transport:
         }
         
         try:
-            response = requests.post(url, json=batch, headers=headers, timeout=10)
+            response = self._session.post(url, json=batch, headers=headers, timeout=10)
             # In a real SDK, we might log errors if response.status_code != 200
         except Exception as e:
             # In production, we would log this error or retry
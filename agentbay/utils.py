@@ -1 +1,55 @@
-# Handles all the utility functions for the AgentBay SDK
\ No newline at end of file
+import os
+import threading
+import weakref
+from typing import Any, Callable, Dict
+
+# Objects to reinitialize in forked children: object -> name of the method to call
+_fork_hooks: "weakref.WeakKeyDictionary[Any, str]" = weakref.WeakKeyDictionary()
+_fork_hooks_lock = threading.Lock()
+_fork_hook_registered = False
+
+def _run_fork_hooks():
+    for obj, name in list(_fork_hooks.items()):
+        getattr(obj, name)()
+
+def register_after_fork(method: Callable[[], None]):
+    """
+    Calls the bound `method` in forked children (gunicorn pre-fork, multiprocessing),
+    for as long as its object is alive: objects are held weakly, so a garbage-collected
+    processor or exporter simply drops out. A single `os.register_at_fork` hook serves all
+    objects, as hooks can't be unregistered.
+    """
+    global _fork_hook_registered
+    if not hasattr(os, "register_at_fork"):
+        return
+    with _fork_hooks_lock:
+        _fork_hooks[method.__self__] = method.__func__.__name__
+        if not _fork_hook_registered:
+            os.register_at_fork(after_in_child=_run_fork_hooks)
+            _fork_hook_registered = True
+
+def copy_span(span: Any, attributes: Dict[str, Any]) -> Any:
+    """
+    Returns a copy of a finished (read-only) span with `attributes` merged on top of its own.
+    Finished OTel spans are immutable, so processors and exporters that need to
+    add data after `span.end()` build a new `ReadableSpan` instead.
+    """
+    from opentelemetry.sdk.trace import ReadableSpan
+
+    merged = dict(span.attributes or {})
+    merged.update(attributes)
+
+    return ReadableSpan(
+        name=span.name,
+        context=span.context,
+        parent=span.parent,
+        resource=span.resource,
+        attributes=merged,
+        events=span.events,
+        links=span.links,
+        kind=span.kind,
+        status=span.status,
+        start_time=span.start_time,
+        end_time=span.end_time,
+        instrumentation_scope=span.instrumentation_scope,
+    )
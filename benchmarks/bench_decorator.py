@@ -0,0 +1,85 @@
+"""
+Per-call overhead of `@agentbay.trace` in each SDK state.
+
+- baseline:    the undecorated function
+- disabled:    `agentbay.init(enabled=False)` / AGENTBAY_DISABLED=1
+- no provider: decorated, but no tracer provider configured (agentbay.init() not called)
+- sampled out: provider configured, trace dropped by the head sampler (sample_rate=0)
+- recording:   span recorded and handed to a span processor (export itself not included)
+
+Each state is measured in a fresh interpreter: the global tracer provider can only be
+set once per process.
+
+    python benchmarks/bench_decorator.py [--calls 200000]
+"""
+import argparse
+import subprocess
+import sys
+import timeit
+
+from opentelemetry import trace as otel_trace
+from opentelemetry.sdk.trace import SpanProcessor, TracerProvider
+
+import agentbay
+from agentbay import runtime
+from agentbay.sampling import create_sampler
+
+STATES = ("baseline", "disabled", "no provider", "sampled out", "recording")
+
+class DiscardingProcessor(SpanProcessor):
+    def on_end(self, span):
+        pass
+
+def work(a, b):
+    return a + b
+
+traced_work = agentbay.trace(work)
+
+def per_call_ns(func, calls):
+    # Best of five, in nanoseconds per call
+    return min(timeit.repeat(lambda: func(1, 2), number=calls, repeat=5)) / calls * 1e9
+
+def measure(state, calls):
+    """
+    Sets up `state` in this process and returns the per-call time of the function in it.
+    """
+    if state == "baseline":
+        return per_call_ns(work, calls)
+    if state == "disabled":
+        runtime.set_enabled(False)
+        return per_call_ns(traced_work, calls)
+    if state == "no provider":
+        return per_call_ns(traced_work, calls)
+
+    if state == "sampled out":
+        provider = TracerProvider(sampler=create_sampler(0.0))
+    else:
+        provider = TracerProvider()
+        provider.add_span_processor(DiscardingProcessor())
+    otel_trace.set_tracer_provider(provider)
+    return per_call_ns(traced_work, calls // 10)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=200000)
+    parser.add_argument("--state", choices=STATES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.state:
+        print(measure(args.state, args.calls))
+        return
+
+    results = []
+    for state in STATES:
+        output = subprocess.run(
+            [sys.executable, __file__, "--state", state, "--calls", str(args.calls)],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        results.append((state, float(output)))
+
+    baseline = results[0][1]
+    for name, ns in results:
+        print(f"{name:<12} {ns:10.0f} ns/call   (+{ns - baseline:.0f} ns)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Export benchmark against a local stub OTLP/HTTP collector.
+
+Compares compression settings and a pooled keep-alive session against a fresh
+`requests.post` per batch (what the legacy transport did), using spans that carry
+LLM-sized prompt/response text.
+
+    python benchmarks/bench_export.py [--batches 50] [--batch-size 100]
+"""
+import argparse
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from opentelemetry.exporter.otlp.proto.common.trace_encoder import encode_spans
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+
+from agentbay.exporters import AgentBaySpanExporter
+from agentbay.exporters.otlp import resolve_compression
+
+PROMPT = (
+    "You are a financial analyst agent. Use the search tool to find the latest filings, "
+    "then summarize revenue, margins and guidance for the user. "
+) * 40
+RESPONSE = "Revenue grew 8% year over year, driven by services; gross margin was 46.2%. " * 30
+
+class StubCollector(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+def make_spans(count):
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    tracer = provider.get_tracer("bench")
+    for i in range(count):
+        with tracer.start_as_current_span("openai.chat.completions.create gpt-4o") as span:
+            span.set_attribute("llm.request.messages", PROMPT + str(i))
+            span.set_attribute("llm.response.content", RESPONSE + str(i))
+            span.set_attribute("llm.usage.total_tokens", 1500)
+    return exporter.get_finished_spans()
+
+def bench_fresh_post(endpoint, payload, batches):
+    start = time.perf_counter()
+    for _ in range(batches):
+        requests.post(endpoint, data=payload, headers={"Content-Type": "application/x-protobuf"}, timeout=10)
+    return time.perf_counter() - start, len(payload)
+
+def bench_exporter(endpoint, payload, batches, compression):
+    exporter = AgentBaySpanExporter(endpoint, compression=compression)
+    start = time.perf_counter()
+    for _ in range(batches):
+        exporter.export_serialized(payload)
+    elapsed = time.perf_counter() - start
+    stats = exporter.get_stats()
+    exporter.shutdown()
+    return elapsed, stats["bytes_sent"] // batches
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batches", type=int, default=50)
+    parser.add_argument("--batch-size", type=int, default=100)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubCollector)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    endpoint = f"http://127.0.0.1:{server.server_address[1]}/api/v1/traces"
+
+    payload = encode_spans(make_spans(args.batch_size)).SerializeToString()
+    print(f"{args.batches} batches x {args.batch_size} spans, {len(payload) / 1024:.0f} KiB per batch uncompressed\n")
+    print(f"{'mode':<28}{'ms/batch':>10}{'KiB sent/batch':>16}{'ratio':>8}")
+
+    rows = [("fresh requests.post, none",) + bench_fresh_post(endpoint, payload, args.batches)]
+    for compression in ("none", "gzip", "zstd"):
+        encoding, _ = resolve_compression(compression)
+        if encoding != compression:
+            print(f"(skipping {compression}: not installed)")
+            continue
+        rows.append((f"pooled session, {compression}",) + bench_exporter(endpoint, payload, args.batches, compression))
+
+    for name, elapsed, sent in rows:
+        print(f"{name:<28}{elapsed / args.batches * 1000:>10.2f}{sent / 1024:>16.1f}{len(payload) / sent:>8.1f}")
+
+    server.shutdown()
+
+if __name__ == "__main__":
+    main()
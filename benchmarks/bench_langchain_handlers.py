@@ -0,0 +1,61 @@
+"""
+Per-event overhead of the sync and async LangChain callback handlers in an async pipeline.
+
+LangChain dispatches a sync handler's callbacks for `ainvoke` / `astream` through
+`loop.run_in_executor` (with a copied context); an async handler is awaited inline on
+the event loop. This benchmark replays a streamed LLM run (start, N tokens, end)
+through both dispatch paths, so it runs without LangChain installed.
+
+    python benchmarks/bench_langchain_handlers.py [--runs 200] [--tokens 200]
+"""
+import argparse
+import asyncio
+import contextvars
+import functools
+import time
+from uuid import uuid4
+
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry import trace
+
+from agentbay.frameworks.langchain.callback import AgentBayCallbackHandler, AsyncAgentBayCallbackHandler
+
+async def dispatch_sync(loop, handler, event, *args, **kwargs):
+    # Mirrors langchain_core's handling of non-async handlers in async callback managers
+    ctx = contextvars.copy_context()
+    await loop.run_in_executor(None, functools.partial(ctx.run, getattr(handler, event), *args, **kwargs))
+
+async def dispatch_async(loop, handler, event, *args, **kwargs):
+    await getattr(handler, event)(*args, **kwargs)
+
+async def streamed_runs(dispatch, handler, runs, tokens):
+    loop = asyncio.get_running_loop()
+    start = time.perf_counter()
+    for _ in range(runs):
+        run_id = uuid4()
+        await dispatch(loop, handler, "on_llm_start", {}, ["prompt"], run_id=run_id)
+        for _ in range(tokens):
+            await dispatch(loop, handler, "on_llm_new_token", "tok", run_id=run_id)
+        await dispatch(loop, handler, "on_llm_end", "response", run_id=run_id)
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=200)
+    parser.add_argument("--tokens", type=int, default=200)
+    args = parser.parse_args()
+
+    # Spans are recorded but not exported, so only handler overhead is measured
+    trace.set_tracer_provider(TracerProvider())
+    events = args.runs * (args.tokens + 2)
+
+    sync_time = asyncio.run(streamed_runs(dispatch_sync, AgentBayCallbackHandler(), args.runs, args.tokens))
+    async_time = asyncio.run(streamed_runs(dispatch_async, AsyncAgentBayCallbackHandler(), args.runs, args.tokens))
+
+    print(f"{events} events per handler")
+    print(f"{'sync handler (executor)':<28} {sync_time * 1e6 / events:8.2f} us/event")
+    print(f"{'async handler (inline)':<28} {async_time * 1e6 / events:8.2f} us/event")
+    print(f"speedup: {sync_time / async_time:.1f}x")
+
+if __name__ == "__main__":
+    main()
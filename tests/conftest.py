@@ -0,0 +1,31 @@
+import sys
+
+import pytest
+from opentelemetry import trace
+from opentelemetry.util._once import Once
+
+def _reset_tracer_provider(provider):
+    """
+    Makes `provider` the global tracer provider again and lets the next
+    `trace.set_tracer_provider()` (e.g. from `agentbay.init()`) replace it.
+    """
+    trace._TRACER_PROVIDER = provider
+    trace._TRACER_PROVIDER_SET_ONCE = Once()
+    # Module-level proxy tracers of the integrations keep the first provider they saw
+    for name, module in list(sys.modules.items()):
+        tracer = getattr(module, "tracer", None) if name.startswith("agentbay.") else None
+        if isinstance(tracer, trace.ProxyTracer):
+            tracer._real_tracer = None
+
+@pytest.fixture(autouse=True)
+def tracer_provider():
+    """
+    OpenTelemetry only lets the global tracer provider be set once per process.
+    Each test may set its own (directly or through `agentbay.init()`), and gets the
+    provider its test class set up (or none) back afterwards, so tests don't depend
+    on the order they run in.
+    """
+    provider = trace._TRACER_PROVIDER
+    _reset_tracer_provider(provider)
+    yield
+    _reset_tracer_provider(provider)
@@ -1,11 +1,15 @@
+import asyncio
+import time
 import unittest
+from unittest.mock import patch
 from uuid import uuid4
 from opentelemetry import trace
 from opentelemetry.sdk.trace import TracerProvider
 from opentelemetry.sdk.trace.export import SimpleSpanProcessor
 from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
 
-from agentbay.frameworks.langchain.callback import AgentBayCallbackHandler
+from agentbay import runtime
+from agentbay.frameworks.langchain.callback import AgentBayCallbackHandler, AsyncAgentBayCallbackHandler
 
 class TestLangChainCallback(unittest.TestCase):
     
@@ -74,6 +78,130 @@ class TestLangChainCallback(unittest.TestCase):
         self.assertEqual(span.name, "MyChain")
         self.assertIn("test", span.attributes["langchain.inputs"])
 
+    def test_child_runs_are_linked_to_parent(self):
+        """Test that spans of nested runs share a trace and point at their parent run."""
+        chain_id, tool_id, retriever_id = uuid4(), uuid4(), uuid4()
+
+        self.handler.on_chain_start(serialized={"name": "Agent"}, inputs={"input": "q"}, run_id=chain_id)
+        self.handler.on_tool_start(
+            serialized={"name": "search"}, input_str="weather", run_id=tool_id, parent_run_id=chain_id
+        )
+        self.handler.on_tool_end(output="sunny", run_id=tool_id, parent_run_id=chain_id)
+        self.handler.on_retriever_start(
+            serialized={"name": "Docs"}, query="weather", run_id=retriever_id, parent_run_id=chain_id
+        )
+        self.handler.on_retriever_end(documents=["a", "b"], run_id=retriever_id, parent_run_id=chain_id)
+        self.handler.on_chain_end(outputs={"output": "sunny"}, run_id=chain_id)
+
+        spans = {span.name: span for span in self.exporter.get_finished_spans()}
+        self.assertEqual(set(spans), {"Agent", "langchain.tool.search", "Docs"})
+        root = spans["Agent"]
+        for child in (spans["langchain.tool.search"], spans["Docs"]):
+            self.assertEqual(child.context.trace_id, root.context.trace_id)
+            self.assertEqual(child.parent.span_id, root.context.span_id)
+        self.assertEqual(spans["Docs"].attributes["langchain.retriever.document_count"], 2)
+        self.assertIn("sunny", spans["langchain.tool.search"].attributes["langchain.outputs"])
+
+    def test_chat_model_streaming_metrics(self):
+        """Test that streamed tokens produce time-to-first-token and throughput attributes."""
+        run_id = uuid4()
+        self.handler.on_chat_model_start(
+            serialized={}, messages=[["hi"]], run_id=run_id, invocation_params={"model_name": "gpt-4o"}
+        )
+        for token in ("Hel", "lo", "!"):
+            self.handler.on_llm_new_token(token, run_id=run_id)
+        self.handler.on_llm_end(response="Hello!", run_id=run_id)
+
+        span = self.exporter.get_finished_spans()[0]
+        self.assertEqual(span.name, "langchain.chat_model")
+        self.assertEqual(span.attributes["llm.request.model"], "gpt-4o")
+        self.assertEqual(span.attributes["llm.response.chunk_count"], 3)
+        self.assertIn("llm.response.time_to_first_token_ms", span.attributes)
+
+    def test_tool_error(self):
+        """Test that a failing tool ends its span with an error status."""
+        run_id = uuid4()
+        self.handler.on_tool_start(serialized={"name": "calc"}, input_str="1/0", run_id=run_id)
+        self.handler.on_tool_error(ZeroDivisionError("division by zero"), run_id=run_id)
+
+        span = self.exporter.get_finished_spans()[0]
+        self.assertEqual(span.status.status_code, trace.StatusCode.ERROR)
+        self.assertEqual(len(self.handler.spans), 0)
+
+    def test_orphaned_runs_are_reaped(self):
+        """Test that a run without an end callback is ended with an error after the TTL."""
+        handler = AgentBayCallbackHandler(run_ttl_seconds=60)
+        handler.on_llm_start(serialized={}, prompts=["never ends"], run_id=uuid4())
+
+        with patch("agentbay.frameworks.langchain.registry.time.monotonic", return_value=1e12):
+            self.assertEqual(handler.spans.reap(), 1)
+
+        spans = self.exporter.get_finished_spans()
+        self.assertEqual(len(spans), 1)
+        self.assertEqual(spans[0].status.status_code, trace.StatusCode.ERROR)
+        self.assertEqual(handler.get_stats(), {"live_runs": 0, "reaped_runs": 1, "evicted_runs": 0})
+
+    def test_orphaned_runs_are_reaped_in_background(self):
+        """Test that expired runs are reaped without another run starting."""
+        with patch("agentbay.frameworks.langchain.registry.REAPER_INTERVAL", 0.01):
+            handler = AgentBayCallbackHandler(run_ttl_seconds=0.05)
+            handler.on_llm_start(serialized={}, prompts=["never ends"], run_id=uuid4())
+
+            deadline = time.monotonic() + 5
+            while handler.get_stats()["reaped_runs"] == 0 and time.monotonic() < deadline:
+                time.sleep(0.01)
+
+        self.assertEqual(handler.get_stats(), {"live_runs": 0, "reaped_runs": 1, "evicted_runs": 0})
+        self.assertEqual(self.exporter.get_finished_spans()[0].status.status_code, trace.StatusCode.ERROR)
+
+    def test_oldest_run_is_evicted(self):
+        """Test that the number of open runs is capped."""
+        handler = AgentBayCallbackHandler(max_runs=2)
+        run_ids = [uuid4() for _ in range(3)]
+        for run_id in run_ids:
+            handler.on_chain_start(serialized={"name": "Chain"}, inputs={}, run_id=run_id)
+
+        self.assertNotIn(run_ids[0], handler.spans)
+        self.assertEqual(len(handler.spans), 2)
+        self.assertEqual(handler.get_stats()["evicted_runs"], 1)
+        self.assertEqual(len(self.exporter.get_finished_spans()), 1)
+
+        # The remaining runs still end normally
+        handler.on_chain_end(outputs={}, run_id=run_ids[2])
+        self.assertEqual(handler.get_stats()["live_runs"], 1)
+
+    def test_disabled_starts_no_spans(self):
+        """Test that runs started while the SDK is disabled are not traced."""
+        runtime.set_enabled(False)
+        self.addCleanup(runtime.set_enabled, True)
+        chain_id, tool_id = uuid4(), uuid4()
+        self.handler.on_chain_start(serialized={"name": "Chain"}, inputs={}, run_id=chain_id)
+        self.handler.on_tool_start(serialized={"name": "calc"}, input_str="1+1", run_id=tool_id, parent_run_id=chain_id)
+        self.handler.on_tool_end(output="2", run_id=tool_id)
+        self.handler.on_chain_end(outputs={}, run_id=chain_id)
+
+        self.assertEqual(self.exporter.get_finished_spans(), ())
+        self.assertEqual(len(self.handler.spans), 0)
+
+    def test_async_handler(self):
+        """Test that the async handler records the same nested spans without an executor."""
+        handler = AsyncAgentBayCallbackHandler()
+        chain_id, llm_id = uuid4(), uuid4()
+
+        async def run():
+            await handler.on_chain_start(serialized={"name": "AsyncChain"}, inputs={"q": "hi"}, run_id=chain_id)
+            await handler.on_llm_start(serialized={}, prompts=["hi"], run_id=llm_id, parent_run_id=chain_id)
+            await handler.on_llm_new_token("hello", run_id=llm_id)
+            await handler.on_llm_end(response="hello", run_id=llm_id)
+            await handler.on_chain_end(outputs={"text": "hello"}, run_id=chain_id)
+
+        asyncio.run(run())
+
+        spans = {span.name: span for span in self.exporter.get_finished_spans()}
+        self.assertEqual(spans["langchain.llm"].parent.span_id, spans["AsyncChain"].context.span_id)
+        self.assertEqual(spans["langchain.llm"].attributes["llm.response.chunk_count"], 1)
+        self.assertEqual(handler.get_stats()["live_runs"], 0)
+
 if __name__ == "__main__":
     unittest.main()
 
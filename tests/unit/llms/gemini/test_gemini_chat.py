@@ -0,0 +1,191 @@
+import asyncio
+import gc
+import sys
+import types
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from opentelemetry import trace
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+# --- MOCK SETUP START ---
+# Simulates 'google.generativeai' being installed on the system
+
+try:
+    # Keep the real `google` namespace package (protobuf lives there)
+    import google as mock_google
+except ImportError:
+    mock_google = types.ModuleType("google")
+    sys.modules["google"] = mock_google
+mock_genai = types.ModuleType("google.generativeai")
+
+def make_response(text, completion_tokens=2):
+    usage = SimpleNamespace(prompt_token_count=3, candidates_token_count=completion_tokens, total_token_count=3 + completion_tokens)
+    return SimpleNamespace(text=text, candidates=[], usage_metadata=usage)
+
+class MockStreamResponse:
+    """Mimics GenerateContentResponse(stream=True): iterable, merges chunks as they arrive."""
+
+    def __init__(self, parts):
+        self.parts = parts
+        self.received = []
+
+    def __iter__(self):
+        for i, part in enumerate(self.parts):
+            self.received.append(part)
+            yield make_response(part, completion_tokens=i + 1)
+
+    @property
+    def text(self):
+        return "".join(self.received)
+
+    candidates = []
+
+class MockAsyncStreamResponse(MockStreamResponse):
+    async def __aiter__(self):
+        for chunk in MockStreamResponse.__iter__(self):
+            yield chunk
+
+class MockGenerativeModel:
+    model_name = "models/gemini-pro"
+
+    def generate_content(self, contents, stream=False, **kwargs):
+        return MockStreamResponse(["Hel", "lo"]) if stream else make_response("Hello")
+
+    async def generate_content_async(self, contents, stream=False, **kwargs):
+        return MockAsyncStreamResponse(["Hel", "lo"]) if stream else make_response("Hello")
+
+class MockChatSession:
+    def __init__(self, model):
+        self.model = model
+
+    def send_message(self, content, **kwargs):
+        # Like automatic function calling: several model calls in one turn
+        self.model.generate_content([content])
+        return self.model.generate_content([content], **kwargs)
+
+mock_genai.GenerativeModel = MockGenerativeModel
+mock_genai.ChatSession = MockChatSession
+mock_google.generativeai = mock_genai
+
+sys.modules["google.generativeai"] = mock_genai
+# --- MOCK SETUP END ---
+
+from agentbay.llms.gemini.chat import instrument_chat
+
+ORIGINALS = {
+    (MockGenerativeModel, "generate_content"): MockGenerativeModel.generate_content,
+    (MockGenerativeModel, "generate_content_async"): MockGenerativeModel.generate_content_async,
+    (MockChatSession, "send_message"): MockChatSession.send_message,
+}
+
+class TestGeminiChat(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.exporter = InMemorySpanExporter()
+        cls.provider = TracerProvider()
+        cls.provider.add_span_processor(SimpleSpanProcessor(cls.exporter))
+        trace._set_tracer_provider(cls.provider, log=False)
+
+    def setUp(self):
+        self.exporter.clear()
+        for (cls, name), original in ORIGINALS.items():
+            setattr(cls, name, original)
+        instrument_chat(mock_genai)
+
+    def test_generate_content(self):
+        """Test that a complete response is recorded on one span."""
+        MockGenerativeModel().generate_content("Hi")
+
+        spans = self.exporter.get_finished_spans()
+        self.assertEqual(len(spans), 1)
+        span = spans[0]
+        self.assertEqual(span.name, "gemini.chat.generate_content models/gemini-pro")
+        self.assertEqual(span.attributes["llm.response.content"], "Hello")
+        self.assertEqual(span.attributes["llm.usage.total_tokens"], 5)
+
+    def test_streaming(self):
+        """Test that a streamed response ends its span with content, usage and timing."""
+        response = MockGenerativeModel().generate_content("Hi", stream=True)
+        self.assertEqual(len(self.exporter.get_finished_spans()), 0)
+
+        chunks = [chunk.text for chunk in response]
+        self.assertEqual(chunks, ["Hel", "lo"])
+
+        span = self.exporter.get_finished_spans()[0]
+        self.assertTrue(span.attributes["llm.request.stream"])
+        self.assertEqual(span.attributes["llm.response.content"], "Hello")
+        self.assertEqual(span.attributes["llm.response.chunk_count"], 2)
+        self.assertEqual(span.attributes["llm.usage.completion_tokens"], 2)
+        self.assertIn("llm.response.time_to_first_token_ms", span.attributes)
+
+    def test_streaming_abandoned(self):
+        """Test that breaking out of a stream still ends the span."""
+        response = MockGenerativeModel().generate_content("Hi", stream=True)
+        iterator = iter(response)
+        next(iterator)
+        iterator.close()
+
+        span = self.exporter.get_finished_spans()[0]
+        self.assertEqual(span.attributes["llm.response.chunk_count"], 1)
+
+    def test_stream_dropped_unconsumed(self):
+        """Test that a stream that is never iterated ends its span once, as abandoned, when dropped."""
+        async def run():
+            await MockGenerativeModel().generate_content_async("Hi", stream=True)
+
+        with patch("agentbay.llms.gemini.chat.record_llm_call") as record_llm_call:
+            MockGenerativeModel().generate_content("Hi", stream=True)
+            asyncio.run(run())
+            gc.collect()
+
+        spans = self.exporter.get_finished_spans()
+        self.assertEqual(len(spans), 2)
+        for span in spans:
+            self.assertTrue(span.attributes["llm.response.abandoned"])
+            self.assertEqual(span.status.status_code, trace.StatusCode.ERROR)
+            self.assertNotIn("llm.response.content", span.attributes)
+        self.assertEqual(record_llm_call.call_count, 2)
+
+    def test_async_streaming(self):
+        """Test that generate_content_async is traced, including streaming."""
+        async def run():
+            await MockGenerativeModel().generate_content_async("Hi")
+            response = await MockGenerativeModel().generate_content_async("Hi", stream=True)
+            return [chunk.text async for chunk in response]
+
+        self.assertEqual(asyncio.run(run()), ["Hel", "lo"])
+
+        spans = self.exporter.get_finished_spans()
+        self.assertEqual(len(spans), 2)
+        self.assertEqual(spans[1].attributes["llm.response.content"], "Hello")
+        self.assertEqual(spans[1].attributes["llm.response.chunk_count"], 2)
+
+    def test_chat_turn_is_one_span(self):
+        """Test that a send_message turn is one span, even with several model calls."""
+        MockChatSession(MockGenerativeModel()).send_message("What's the weather?")
+
+        spans = self.exporter.get_finished_spans()
+        self.assertEqual(len(spans), 1)
+        self.assertEqual(spans[0].name, "gemini.chat.send_message models/gemini-pro")
+        self.assertIn("weather", spans[0].attributes["llm.request.messages"])
+
+    def test_error(self):
+        """Test that errors are recorded and re-raised."""
+        def failing(self, contents, **kwargs):
+            raise RuntimeError("quota exceeded")
+
+        MockGenerativeModel.generate_content = failing
+        instrument_chat(mock_genai)
+
+        with self.assertRaises(RuntimeError):
+            MockGenerativeModel().generate_content("Hi")
+        span = self.exporter.get_finished_spans()[0]
+        self.assertEqual(span.status.status_code, trace.StatusCode.ERROR)
+
+if __name__ == "__main__":
+    unittest.main()
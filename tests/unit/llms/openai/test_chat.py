@@ -1,10 +1,15 @@
+import asyncio
 import unittest
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 import sys
 import types
+from types import SimpleNamespace
 
 from opentelemetry import trace
+from opentelemetry.sdk.metrics import MeterProvider
+from opentelemetry.sdk.metrics.export import InMemoryMetricReader
 from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.sampling import ALWAYS_OFF
 from opentelemetry.sdk.trace.export import SimpleSpanProcessor
 from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
 
@@ -22,7 +27,12 @@ class MockCompletions:
     def create(self, *args, **kwargs):
         pass
 
+class MockAsyncCompletions:
+    async def create(self, *args, **kwargs):
+        pass
+
 mock_completions_module.Completions = MockCompletions
+mock_completions_module.AsyncCompletions = MockAsyncCompletions
 
 # 3. Connect them
 mock_openai.resources = mock_resources
@@ -36,7 +46,9 @@ sys.modules["openai.resources.chat"] = mock_chat
 sys.modules["openai.resources.chat.completions"] = mock_completions_module
 # --- MOCK SETUP END ---
 
-from agentbay.llms.openai import instrument
+from agentbay import metrics
+from agentbay.llms.openai import chat as openai_chat
+from agentbay.llms.openai import instrument, uninstrument
 from agentbay.llms.openai.chat import instrument_chat
 
 class TestOpenAIChat(unittest.TestCase):
@@ -55,6 +67,8 @@ class TestOpenAIChat(unittest.TestCase):
         self.mock_create = MagicMock()
         # Update the mock on the class method
         sys.modules["openai.resources.chat.completions"].Completions.create = self.mock_create
+        self.mock_async_create = AsyncMock()
+        sys.modules["openai.resources.chat.completions"].AsyncCompletions.create = self.mock_async_create
         
     def test_instrumentation_wraps_create(self):
         """Test that calling create() triggers our wrapper and OTel span."""
@@ -91,6 +105,210 @@ class TestOpenAIChat(unittest.TestCase):
         self.assertEqual(span.attributes["llm.request.model"], "gpt-4")
         self.assertEqual(span.attributes["llm.response.content"], "AI Response")
         self.assertEqual(span.attributes["llm.usage.total_tokens"], 15)
+        # gpt-4 list price: $30 / $60 per 1M prompt / completion tokens
+        self.assertAlmostEqual(span.attributes["llm.usage.cost_usd"], (10 * 30.0 + 5 * 60.0) / 1e6)
+
+    def test_instrument_twice_does_not_stack(self):
+        """Test that repeated instrumentation produces one span per call, and uninstrument restores create."""
+        instrument_chat(mock_openai)
+        instrument_chat(mock_openai)
+
+        self.mock_create.return_value = MagicMock(choices=[], usage=None)
+        completions_instance = sys.modules["openai.resources.chat.completions"].Completions()
+        completions_instance.create(model="gpt-4", messages=[])
+        self.assertEqual(len(self.exporter.get_finished_spans()), 1)
+
+        uninstrument()
+        self.assertIs(sys.modules["openai.resources.chat.completions"].Completions.create, self.mock_create)
+        completions_instance.create(model="gpt-4", messages=[])
+        self.assertEqual(len(self.exporter.get_finished_spans()), 1)
+
+    def _chunk(self, content=None, tool_calls=None, finish_reason=None, usage=None):
+        delta = SimpleNamespace(content=content, tool_calls=tool_calls)
+        choices = [SimpleNamespace(delta=delta, finish_reason=finish_reason)] if usage is None else []
+        return SimpleNamespace(choices=choices, usage=usage)
+
+    def test_streaming_records_content_and_timing(self):
+        """Test that a streamed response ends its span when the stream is exhausted."""
+        instrument_chat(mock_openai)
+
+        tool_call = lambda args, **kw: SimpleNamespace(
+            index=0, id=kw.get("id"), function=SimpleNamespace(name=kw.get("name"), arguments=args)
+        )
+        chunks = [
+            self._chunk(content="Hel"),
+            self._chunk(content="lo"),
+            self._chunk(tool_calls=[tool_call('{"q":', id="call_1", name="search")]),
+            self._chunk(tool_calls=[tool_call(' "x"}')], finish_reason="tool_calls"),
+            self._chunk(usage=SimpleNamespace(prompt_tokens=3, completion_tokens=4, total_tokens=7)),
+        ]
+        self.mock_create.return_value = iter(chunks)
+
+        completions_instance = sys.modules["openai.resources.chat.completions"].Completions()
+        stream = completions_instance.create(model="gpt-4", messages=[], stream=True)
+
+        # Nothing is recorded until the stream is consumed
+        self.assertEqual(len(self.exporter.get_finished_spans()), 0)
+
+        received = list(stream)
+        # Chunks are passed through untouched
+        self.assertEqual(received, chunks)
+
+        spans = self.exporter.get_finished_spans()
+        self.assertEqual(len(spans), 1)
+
+        attributes = spans[0].attributes
+        self.assertTrue(attributes["llm.request.stream"])
+        self.assertEqual(attributes["llm.response.content"], "Hello")
+        self.assertEqual(attributes["llm.response.finish_reason"], "tool_calls")
+        self.assertEqual(attributes["llm.response.tool_call_count"], 1)
+        self.assertIn('{\\"q\\": \\"x\\"}', attributes["llm.response.tool_calls"])
+        self.assertEqual(attributes["llm.usage.total_tokens"], 7)
+        self.assertEqual(attributes["llm.response.chunk_count"], 4)
+        self.assertIn("llm.response.time_to_first_token_ms", attributes)
+        self.assertIn("llm.response.inter_token_latency.p50_ms", attributes)
+
+    def test_streaming_closed_early(self):
+        """Test that closing a stream before the end still ends the span."""
+        instrument_chat(mock_openai)
+
+        underlying = MagicMock()
+        underlying.__iter__.return_value = iter([self._chunk(content="a"), self._chunk(content="b")])
+        self.mock_create.return_value = underlying
+
+        completions_instance = sys.modules["openai.resources.chat.completions"].Completions()
+        with completions_instance.create(model="gpt-4", messages=[], stream=True) as stream:
+            next(stream)
+
+        underlying.close.assert_called_once()
+        spans = self.exporter.get_finished_spans()
+        self.assertEqual(len(spans), 1)
+        self.assertEqual(spans[0].attributes["llm.response.content"], "a")
+
+    def test_streaming_abandoned(self):
+        """Test that a stream dropped mid-way (sync or async) ends its span with one tick per chunk."""
+        instrument_chat(mock_openai)
+        tool_call = SimpleNamespace(index=0, id="call_1", function=SimpleNamespace(name="f", arguments="{}"))
+        chunks = [self._chunk(content="a", tool_calls=[tool_call]), self._chunk(content="b"), self._chunk(content="c")]
+
+        self.mock_create.return_value = iter(chunks)
+        completions_instance = sys.modules["openai.resources.chat.completions"].Completions()
+        for _ in completions_instance.create(model="gpt-4", messages=[], stream=True):
+            break
+
+        async def chunk_iterator():
+            for chunk in chunks:
+                yield chunk
+
+        async def consume():
+            self.mock_async_create.return_value = chunk_iterator()
+            async_instance = sys.modules["openai.resources.chat.completions"].AsyncCompletions()
+            async for _ in await async_instance.create(model="gpt-4", messages=[], stream=True):
+                break
+
+        asyncio.run(consume())
+
+        spans = self.exporter.get_finished_spans()
+        self.assertEqual(len(spans), 2)
+        for span in spans:
+            self.assertEqual(span.attributes["llm.response.content"], "a")
+            self.assertEqual(span.attributes["llm.response.chunk_count"], 1)
+            self.assertIn("llm.response.time_to_first_token_ms", span.attributes)
+
+    def test_async_create(self):
+        """Test that AsyncCompletions.create is traced with the same attributes."""
+        instrument_chat(mock_openai)
+
+        mock_response = MagicMock()
+        mock_response.choices = [MagicMock(message=MagicMock(content="Async Response"))]
+        mock_response.usage.prompt_tokens = 1
+        mock_response.usage.completion_tokens = 2
+        mock_response.usage.total_tokens = 3
+        self.mock_async_create.return_value = mock_response
+
+        completions_instance = sys.modules["openai.resources.chat.completions"].AsyncCompletions()
+        response = asyncio.run(completions_instance.create(model="gpt-4o", messages=[]))
+        self.assertEqual(response, mock_response)
+
+        spans = self.exporter.get_finished_spans()
+        self.assertEqual(len(spans), 1)
+        self.assertEqual(spans[0].attributes["llm.request.model"], "gpt-4o")
+        self.assertEqual(spans[0].attributes["llm.response.content"], "Async Response")
+        self.assertEqual(spans[0].attributes["llm.usage.total_tokens"], 3)
+
+    def test_async_streaming(self):
+        """Test that an async stream ends its span when exhausted."""
+        instrument_chat(mock_openai)
+
+        async def chunks():
+            for content in ["a", "b", "c"]:
+                yield self._chunk(content=content)
+
+        self.mock_async_create.return_value = chunks()
+
+        async def consume():
+            completions_instance = sys.modules["openai.resources.chat.completions"].AsyncCompletions()
+            stream = await completions_instance.create(model="gpt-4o", messages=[], stream=True)
+            return [chunk async for chunk in stream]
+
+        self.assertEqual(len(asyncio.run(consume())), 3)
+
+        spans = self.exporter.get_finished_spans()
+        self.assertEqual(len(spans), 1)
+        self.assertEqual(spans[0].attributes["llm.response.content"], "abc")
+        self.assertEqual(spans[0].attributes["llm.response.chunk_count"], 3)
+
+    def test_async_create_error(self):
+        """Test that errors from the async call are recorded and re-raised."""
+        instrument_chat(mock_openai)
+        self.mock_async_create.side_effect = RuntimeError("rate limited")
+
+        completions_instance = sys.modules["openai.resources.chat.completions"].AsyncCompletions()
+        with self.assertRaises(RuntimeError):
+            asyncio.run(completions_instance.create(model="gpt-4o", messages=[]))
+
+        spans = self.exporter.get_finished_spans()
+        self.assertEqual(len(spans), 1)
+        self.assertEqual(spans[0].status.status_code, trace.StatusCode.ERROR)
+
+    def _collect_metrics(self, reader):
+        points = {}
+        for resource_metrics in reader.get_metrics_data().resource_metrics:
+            for scope_metrics in resource_metrics.scope_metrics:
+                for metric in scope_metrics.metrics:
+                    for point in metric.data.data_points:
+                        key = (metric.name, point.attributes.get("llm.token.type"))
+                        points[key] = getattr(point, "value", None) or getattr(point, "count", None)
+        return points
+
+    def test_metrics_recorded_when_sampled_out(self):
+        """Test that token and request metrics are recorded for calls whose span is not sampled."""
+        reader = InMemoryMetricReader()
+        metrics.configure(MeterProvider(metric_readers=[reader]))
+        self.addCleanup(metrics.configure, None)
+
+        unsampled = TracerProvider(sampler=ALWAYS_OFF).get_tracer("test")
+        instrument_chat(mock_openai)
+
+        chunks = [
+            self._chunk(content="a"),
+            self._chunk(usage=SimpleNamespace(prompt_tokens=3, completion_tokens=4, total_tokens=7)),
+        ]
+        self.mock_create.side_effect = [iter(chunks), RuntimeError("rate limited")]
+        completions_instance = sys.modules["openai.resources.chat.completions"].Completions()
+
+        with patch.object(openai_chat, "tracer", unsampled):
+            list(completions_instance.create(model="gpt-4", messages=[], stream=True))
+            with self.assertRaises(RuntimeError):
+                completions_instance.create(model="gpt-4", messages=[])
+
+        self.assertEqual(len(self.exporter.get_finished_spans()), 0)
+        points = self._collect_metrics(reader)
+        self.assertEqual(points[("llm.requests", None)], 2)
+        self.assertEqual(points[("llm.errors", None)], 1)
+        self.assertEqual(points[("llm.request.duration", None)], 2)
+        self.assertEqual(points[("llm.usage.tokens", "prompt")], 3)
+        self.assertEqual(points[("llm.usage.tokens", "completion")], 4)
 
 if __name__ == "__main__":
     unittest.main()
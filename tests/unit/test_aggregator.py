@@ -0,0 +1,70 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+from opentelemetry.proto.collector.trace.v1.trace_service_pb2 import ExportTraceServiceRequest
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor, SpanExportResult
+
+from agentbay.aggregator import SpanAggregator, UnixSocketSpanExporter, serve
+
+class TestAggregator(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.socket_path = os.path.join(self.tmpdir.name, "agg.sock")
+
+        self.payloads = []
+        self.uploaded = threading.Event()
+
+        def upload(payload):
+            self.payloads.append(payload)
+            self.uploaded.set()
+            return True
+
+        self.aggregator = SpanAggregator(self.socket_path, upload, flush_interval=0.05)
+        self.aggregator.start()
+        self.addCleanup(self.aggregator.stop)
+
+    def _tracer(self):
+        exporter = UnixSocketSpanExporter(self.socket_path)
+        self.addCleanup(exporter.shutdown)
+        provider = TracerProvider()
+        provider.add_span_processor(SimpleSpanProcessor(exporter))
+        return provider.get_tracer("test")
+
+    def test_frames_from_workers_are_merged(self):
+        """Test that frames from several exporters are uploaded as one OTLP request."""
+        self._tracer().start_span("worker-1").end()
+        self._tracer().start_span("worker-2").end()
+
+        self.assertTrue(self.uploaded.wait(2.0))
+        self.aggregator.stop()
+
+        names = []
+        for payload in self.payloads:
+            request = ExportTraceServiceRequest()
+            request.ParseFromString(payload)
+            for resource_spans in request.resource_spans:
+                for scope_spans in resource_spans.scope_spans:
+                    names.extend(span.name for span in scope_spans.spans)
+        self.assertEqual(sorted(names), ["worker-1", "worker-2"])
+        self.assertEqual(self.aggregator.received_frames, 2)
+        self.assertEqual(self.aggregator.uploaded_frames, 2)
+
+    def test_export_fails_without_aggregator(self):
+        """Test that a missing aggregator is reported as a failed export, not an exception."""
+        exporter = UnixSocketSpanExporter(os.path.join(self.tmpdir.name, "missing.sock"))
+        self.assertEqual(exporter.export_serialized(b""), SpanExportResult.FAILURE)
+
+    def test_serve_requires_api_key(self):
+        """Test that the aggregator refuses to start without a key, even with the socket variable set."""
+        environ = {"AGENTBAY_AGGREGATOR_SOCKET": self.socket_path, "AGENTBAY_API_KEY": ""}
+        with patch.dict(os.environ, environ):
+            with self.assertRaises(ValueError):
+                serve(os.path.join(self.tmpdir.name, "other.sock"))
+
+if __name__ == "__main__":
+    unittest.main()
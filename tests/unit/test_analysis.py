@@ -0,0 +1,110 @@
+import contextlib
+import io
+import shutil
+import tempfile
+import unittest
+
+from opentelemetry import trace
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+from agentbay import AgentBay, init
+from agentbay.analysis import TraceAnalysisProcessor, analyze
+from agentbay.cli import main
+from agentbay.exporters.file import FileSpanExporter, list_capture_files, read_spans
+
+MS = 1_000_000
+
+def _run_agent(tracer):
+    """
+    agent 0-100ms: an LLM call (0-40ms), then two tools side by side (40-90ms and 40-70ms).
+    """
+    base = 1_700_000_000_000 * MS
+    root = tracer.start_span("agent", start_time=base)
+    context = trace.set_span_in_context(root)
+    for name, start, end, attributes in (
+        ("llm", 0, 40, {"llm.system": "openai"}),
+        ("search", 40, 90, {"agentbay.kind": "tool"}),
+        ("lookup", 40, 70, {"langchain.tool.name": "lookup"}),
+    ):
+        span = tracer.start_span(name, context=context, start_time=base + start * MS, attributes=attributes)
+        span.end(end_time=base + end * MS)
+    root.end(end_time=base + 100 * MS)
+
+def _record(processor=None):
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(processor or SimpleSpanProcessor(exporter))
+    _run_agent(provider.get_tracer("test"))
+    return exporter
+
+class TestAnalysis(unittest.TestCase):
+
+    def test_breakdown_and_critical_path(self):
+        """Test self times per category, the parallelism factor and the critical path."""
+        result, = analyze(_record().get_finished_spans())
+
+        self.assertEqual(result.span_count, 4)
+        self.assertAlmostEqual(result.wall_ms, 100.0)
+        self.assertAlmostEqual(result.busy_ms, 130.0)
+        self.assertAlmostEqual(result.parallelism, 1.3)
+        self.assertEqual(result.self_ms, {"llm": 40.0, "tool": 80.0, "code": 10.0})
+        self.assertEqual([node.name for node in result.critical_path], ["agent", "llm", "search"])
+        self.assertEqual(result.critical_ms, {"llm": 40.0, "tool": 50.0, "code": 10.0})
+
+    def test_processor_annotates_root(self):
+        """Test that child spans pass through unchanged and the root carries the summary."""
+        exporter = InMemorySpanExporter()
+        processor = TraceAnalysisProcessor(SimpleSpanProcessor(exporter))
+        _record(processor)
+
+        spans = {span.name: span for span in exporter.get_finished_spans()}
+        self.assertEqual(len(spans), 4)
+        self.assertNotIn("agentbay.analysis.parallelism", spans["llm"].attributes)
+        attributes = spans["agent"].attributes
+        self.assertEqual(attributes["agentbay.analysis.parallelism"], 1.3)
+        self.assertEqual(attributes["agentbay.analysis.tool_ms"], 80.0)
+        self.assertEqual(attributes["agentbay.analysis.critical_path.llm_ms"], 40.0)
+        self.assertEqual(attributes["agentbay.analysis.critical_path"], ("agent", "llm", "search"))
+        self.assertEqual(processor.get_stats(), {
+            "analyzed": 1, "evicted": 0, "buffered_spans": 0, "buffered_traces": 0,
+        })
+
+    def test_init_option(self):
+        """Test that `init(trace_analysis=True)` puts the processor in front of the batch processor."""
+        AgentBay._instance = None
+        client = init(exporter="memory", metrics=False, trace_analysis=True, analysis_max_buffered_spans=500)
+        self.addCleanup(client.shutdown)
+        self.assertIs(client.trace_analyzer.downstream, client.processor)
+        self.assertEqual(client.trace_analyzer.max_buffered_spans, 500)
+
+        _run_agent(client.tracer_provider.get_tracer("test"))
+        root, = client.query().filter(name="agent")
+        self.assertEqual(root.attributes["agentbay.analysis.span_count"], 4)
+
+    def test_invalid_buffer_size(self):
+        AgentBay._instance = None
+        with self.assertRaises(ValueError):
+            init(exporter="memory", trace_analysis=True, analysis_max_buffered_spans=0)
+
+    def test_offline_capture_files(self):
+        """Test that spans read back from capture files give the same analysis."""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, True)
+        file_exporter = FileSpanExporter(directory)
+        file_exporter.export(_record().get_finished_spans())
+        file_exporter.shutdown()
+
+        path, = list_capture_files([directory])
+        result, = analyze(read_spans(path))
+        self.assertAlmostEqual(result.parallelism, 1.3)
+        self.assertEqual(result.self_ms, {"llm": 40.0, "tool": 80.0, "code": 10.0})
+
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            self.assertEqual(main(["analyze", directory]), 0)
+        self.assertIn("critical path: agent > llm > search", output.getvalue())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,186 @@
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import unittest
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SpanExporter, SpanExportResult
+
+from agentbay.processors import BoundedBatchSpanProcessor
+
+class RecordingExporter(SpanExporter):
+    """Collects exported span names. Can be paused or made to fail."""
+    def __init__(self, fail_times: int = 0):
+        self.names = []
+        self.fail_times = fail_times
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def export(self, spans):
+        self.gate.wait(5)
+        if self.fail_times:
+            self.fail_times -= 1
+            return SpanExportResult.FAILURE
+        self.names.extend(span.name for span in spans)
+        return SpanExportResult.SUCCESS
+
+class TestBoundedBatchSpanProcessor(unittest.TestCase):
+
+    def _setup(self, exporter, **kwargs):
+        processor = BoundedBatchSpanProcessor(exporter, schedule_delay_millis=10_000, **kwargs)
+        provider = TracerProvider()
+        provider.add_span_processor(processor)
+        self.addCleanup(provider.shutdown)
+        return processor, provider.get_tracer("test")
+
+    def _emit(self, tracer, *names):
+        for name in names:
+            tracer.start_span(name).end()
+
+    def test_flush_exports_everything(self):
+        """Test that force_flush drains the queue and updates counters."""
+        exporter = RecordingExporter()
+        processor, tracer = self._setup(exporter, max_queue_size=10, max_export_batch_size=4)
+
+        self._emit(tracer, *[f"s{i}" for i in range(6)])
+        self.assertTrue(processor.force_flush(2000))
+
+        self.assertEqual(exporter.names, [f"s{i}" for i in range(6)])
+        stats = processor.stats.snapshot()
+        self.assertEqual(stats["enqueued"], 6)
+        self.assertEqual(stats["exported"], 6)
+        self.assertEqual(stats["dropped"], 0)
+
+    def test_drop_newest(self):
+        """Test that the incoming span is dropped when the queue is full."""
+        exporter = RecordingExporter()
+        processor, tracer = self._setup(exporter, max_queue_size=2, max_export_batch_size=2)
+        exporter.gate.clear()
+
+        # The first full batch is taken by the (blocked) worker, the next two fill the queue
+        self._emit(tracer, "a", "b")
+        self._wait_until(lambda: not processor._queue)
+        self._emit(tracer, "c", "d", "e")
+
+        exporter.gate.set()
+        processor.force_flush(2000)
+
+        self.assertEqual(exporter.names, ["a", "b", "c", "d"])
+        self.assertEqual(processor.stats.snapshot()["dropped"], 1)
+
+    def test_drop_oldest(self):
+        """Test that the oldest queued span is evicted when the queue is full."""
+        exporter = RecordingExporter()
+        processor, tracer = self._setup(
+            exporter, max_queue_size=2, max_export_batch_size=2, overflow_policy="drop_oldest"
+        )
+        exporter.gate.clear()
+
+        self._emit(tracer, "a", "b")
+        self._wait_until(lambda: not processor._queue)
+        self._emit(tracer, "c", "d", "e")
+
+        exporter.gate.set()
+        processor.force_flush(2000)
+
+        self.assertEqual(exporter.names, ["a", "b", "d", "e"])
+        self.assertEqual(processor.stats.snapshot()["dropped"], 1)
+
+    def test_block_times_out(self):
+        """Test that "block" waits for room and then drops the incoming span."""
+        exporter = RecordingExporter()
+        processor, tracer = self._setup(
+            exporter, max_queue_size=1, max_export_batch_size=1,
+            overflow_policy="block", block_timeout_millis=20,
+        )
+        exporter.gate.clear()
+
+        self._emit(tracer, "a")
+        self._wait_until(lambda: not processor._queue)
+        self._emit(tracer, "b", "c")
+
+        exporter.gate.set()
+        processor.force_flush(2000)
+
+        self.assertEqual(exporter.names, ["a", "b"])
+        self.assertEqual(processor.stats.snapshot()["dropped"], 1)
+
+    def test_retries_failed_export(self):
+        """Test that failed batches are retried and counted."""
+        exporter = RecordingExporter(fail_times=1)
+        processor, tracer = self._setup(exporter, retry_backoff_millis=1)
+
+        self._emit(tracer, "a")
+        processor.force_flush(2000)
+
+        self.assertEqual(exporter.names, ["a"])
+        stats = processor.stats.snapshot()
+        self.assertEqual(stats["retried"], 1)
+        self.assertEqual(stats["exported"], 1)
+        self.assertEqual(stats["failed"], 0)
+
+    @unittest.skipUnless(hasattr(os, "fork"), "requires os.fork")
+    def test_child_process_exports_after_fork(self):
+        """Test that a forked child gets a working export thread of its own."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "exported.txt")
+
+            class FileExporter(SpanExporter):
+                def export(self, spans):
+                    with open(path, "a") as f:
+                        f.writelines(f"{os.getpid()} {span.name}\n" for span in spans)
+                    return SpanExportResult.SUCCESS
+
+            processor, tracer = self._setup(FileExporter())
+            # Queued in the parent: must not be exported a second time by the child
+            self._emit(tracer, "parent")
+
+            pid = os.fork()
+            if pid == 0:
+                try:
+                    self._emit(tracer, "child")
+                    os._exit(0 if processor.force_flush(2000) else 1)
+                except BaseException:
+                    os._exit(2)
+
+            _, status = os.waitpid(pid, 0)
+            self.assertEqual(os.waitstatus_to_exitcode(status), 0)
+            processor.force_flush(2000)
+
+            with open(path) as f:
+                lines = sorted(line.split() for line in f)
+            self.assertEqual(lines, sorted([[str(pid), "child"], [str(os.getpid()), "parent"]]))
+
+    @unittest.skipUnless(hasattr(os, "fork"), "requires os.fork")
+    def test_fork_after_processor_collected(self):
+        """Test that forking after a processor was garbage-collected runs no stale hook."""
+        result = subprocess.run([sys.executable, "-c", (
+            "import gc, os\n"
+            "from opentelemetry.sdk.trace.export import SpanExporter\n"
+            "from agentbay.processors import BoundedBatchSpanProcessor\n"
+            "processor = BoundedBatchSpanProcessor(SpanExporter())\n"
+            "processor.shutdown()\n"
+            "del processor\n"
+            "gc.collect()\n"
+            "pid = os.fork()\n"
+            "if pid == 0:\n"
+            "    os._exit(0)\n"
+            "os.waitpid(pid, 0)\n"
+        )], capture_output=True, text=True, check=True)
+        self.assertEqual(result.stderr, "")
+
+    def test_invalid_policy(self):
+        with self.assertRaises(ValueError):
+            BoundedBatchSpanProcessor(RecordingExporter(), overflow_policy="spill")
+
+    def _wait_until(self, condition, timeout=2.0):
+        event = threading.Event()
+        for _ in range(int(timeout / 0.005)):
+            if condition():
+                return
+            event.wait(0.005)
+        self.fail("condition not met in time")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,154 @@
+import asyncio
+import contextvars
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from opentelemetry import trace
+
+import agentbay
+from agentbay import AgentBay, init
+from agentbay import trace as agentbay_trace
+from agentbay.context import map_in_context
+from agentbay.context import submit
+
+class TestSession(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        AgentBay._instance = None
+        cls.client = init(exporter="memory", metrics=False)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.client.shutdown()
+
+    def setUp(self):
+        self.client.query()  # flush spans left over from the previous test
+        self.client.exporter.clear()
+
+    def test_spans_are_stamped(self):
+        """Test that nested spans get the session attributes, and spans outside the block don't."""
+        @agentbay_trace
+        def step():
+            with trace.get_tracer("test").start_as_current_span("llm"):
+                pass
+
+        with agentbay.session("s-1", user_id="u-1", attributes={"tenant": "acme"}) as session_id:
+            step()
+        step()
+
+        self.assertEqual(session_id, "s-1")
+        spans = self.client.query()
+        self.assertEqual(sorted(span.name for span in spans.session("s-1")), ["llm", "step"])
+        for span in spans.session("s-1"):
+            self.assertEqual(span.attributes["user.id"], "u-1")
+            self.assertEqual(span.attributes["tenant"], "acme")
+        self.assertEqual(len(spans.filter(predicate=lambda span: "session.id" not in span.attributes)), 2)
+
+    def test_nested_sessions(self):
+        """Test that an inner session overrides the outer one and keeps its other attributes."""
+        with agentbay.session("outer", user_id="u-1"):
+            with agentbay.session("inner") as inner:
+                agentbay_trace(lambda: None)()
+
+        span, = self.client.query()
+        self.assertEqual(inner, "inner")
+        self.assertEqual(span.attributes["session.id"], "inner")
+        self.assertEqual(span.attributes["user.id"], "u-1")
+
+    def test_threads_and_tasks(self):
+        """Test that asyncio tasks and threads started with a copied context inherit the session."""
+        @agentbay_trace
+        async def task():
+            await asyncio.sleep(0)
+
+        @agentbay_trace
+        def worker():
+            pass
+
+        async def main():
+            with agentbay.session() as session_id:
+                await asyncio.gather(task(), asyncio.create_task(task()))
+                thread = threading.Thread(target=contextvars.copy_context().run, args=(worker,))
+                thread.start()
+                thread.join()
+            return session_id
+
+        session_id = asyncio.run(main())
+        self.assertEqual(len(session_id), 36)
+        self.assertEqual(sorted(span.name for span in self.client.query().session(session_id)),
+                         ["task", "task", "worker"])
+
+class TestExecutorPropagation(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        AgentBay._instance = None
+        cls.client = init(exporter="memory", metrics=False)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.client.shutdown()
+
+    def setUp(self):
+        self.client.query()  # flush spans left over from the previous test
+        self.client.exporter.clear()
+        self.pool = ThreadPoolExecutor(4)
+        self.addCleanup(self.pool.shutdown)
+
+    def _assert_siblings(self, parent_name, child_name, count):
+        root, = self.client.query().tree()
+        self.assertEqual(root.name, parent_name)
+        self.assertEqual([child.name for child in root.children], [child_name] * count)
+
+    def test_wrap_executor(self):
+        """Test that work submitted to a wrapped pool runs under the submitting span and session."""
+        @agentbay_trace
+        def tool(i):
+            return i * 2
+
+        @agentbay_trace
+        def agent():
+            pool = agentbay.wrap_executor(self.pool)
+            futures = [pool.submit(tool, i) for i in range(2)]
+            return [future.result() for future in futures] + list(pool.map(tool, range(2)))
+
+        with agentbay.session("s-1"):
+            self.assertEqual(agent(), [0, 2, 0, 2])
+        self._assert_siblings("agent", "tool", 4)
+        self.assertEqual(len(self.client.query().session("s-1")), 5)
+
+    def test_submit_and_map_helpers(self):
+        """Test the helpers for pools that aren't wrapped, and that plain submits lose the parent."""
+        @agentbay_trace
+        def tool(i):
+            return i
+
+        @agentbay_trace
+        def agent():
+            submit(self.pool, tool, 0).result()
+            list(map_in_context(self.pool, tool, range(3)))
+            self.pool.submit(tool, 1).result()  # not propagated: starts its own trace
+
+        agent()
+        self.assertEqual(len(self.client.query().tree()), 2)
+        spans = self.client.query()
+        self.assertEqual(len(spans.filter(name="tool").filter(
+            predicate=lambda span: span.parent is not None)), 4)
+
+    def test_asyncio_to_thread(self):
+        """Test that asyncio.to_thread keeps the parent span without any wrapping."""
+        @agentbay_trace
+        def tool():
+            pass
+
+        @agentbay_trace
+        async def agent():
+            await asyncio.gather(asyncio.to_thread(tool), asyncio.to_thread(tool))
+
+        asyncio.run(agent())
+        self._assert_siblings("agent", "tool", 2)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,9 +1,11 @@
+import asyncio
 import unittest
 from opentelemetry import trace
 from opentelemetry.sdk.trace import TracerProvider
 from opentelemetry.sdk.trace.export import SimpleSpanProcessor
 from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
 
+from agentbay import runtime
 from agentbay import trace as agentbay_trace
 
 class TestDecorators(unittest.TestCase):
@@ -67,5 +69,206 @@ class TestDecorators(unittest.TestCase):
         exception_events = [e for e in span.events if e.name == "exception"]
         self.assertGreaterEqual(len(exception_events), 1)
 
+    def test_trace_coroutine(self):
+        """Test that an async function keeps its span open until it is awaited."""
+
+        @agentbay_trace
+        async def fetch(x):
+            await asyncio.sleep(0.01)
+            return x * 2
+
+        result = asyncio.run(fetch(21))
+        self.assertEqual(result, 42)
+
+        spans = self.exporter.get_finished_spans()
+        self.assertEqual(len(spans), 1)
+
+        span = spans[0]
+        self.assertEqual(span.name, "fetch")
+        self.assertEqual(span.attributes["output"], "42")
+        # The span must cover the sleep, not just the coroutine creation
+        self.assertGreaterEqual(span.end_time - span.start_time, 10_000_000)
+
+    def test_trace_coroutine_error(self):
+        """Test that an exception raised after an await is recorded."""
+
+        @agentbay_trace
+        async def broken():
+            await asyncio.sleep(0)
+            raise ValueError("boom")
+
+        with self.assertRaises(ValueError):
+            asyncio.run(broken())
+
+        spans = self.exporter.get_finished_spans()
+        self.assertEqual(len(spans), 1)
+        self.assertEqual(spans[0].status.status_code, trace.StatusCode.ERROR)
+
+    def test_trace_generator(self):
+        """Test that a generator span ends after the last item."""
+
+        @agentbay_trace
+        def numbers(n):
+            for i in range(n):
+                yield i
+
+        gen = numbers(3)
+        self.assertEqual(next(gen), 0)
+        # Span is still open while the generator is being consumed
+        self.assertEqual(len(self.exporter.get_finished_spans()), 0)
+
+        self.assertEqual(list(gen), [1, 2])
+
+        spans = self.exporter.get_finished_spans()
+        self.assertEqual(len(spans), 1)
+        self.assertEqual(spans[0].name, "numbers")
+        self.assertEqual(spans[0].attributes["output.count"], 3)
+        self.assertEqual(spans[0].status.status_code, trace.StatusCode.OK)
+
+    def test_trace_generator_closed_early(self):
+        """Test that breaking out of a generator still ends its span."""
+
+        @agentbay_trace
+        def numbers():
+            i = 0
+            while True:
+                yield i
+                i += 1
+
+        for i in numbers():
+            if i == 4:
+                break
+
+        spans = self.exporter.get_finished_spans()
+        self.assertEqual(len(spans), 1)
+        self.assertEqual(spans[0].attributes["output.count"], 5)
+
+    def test_trace_generator_children(self):
+        """Test that spans created inside the generator body are its children."""
+
+        @agentbay_trace
+        def child():
+            return "x"
+
+        @agentbay_trace
+        def parent():
+            yield child()
+
+        list(parent())
+
+        spans = {s.name: s for s in self.exporter.get_finished_spans()}
+        self.assertEqual(spans["child"].parent.span_id, spans["parent"].context.span_id)
+
+    def test_trace_async_generator(self):
+        """Test that an async generator span ends after the last item."""
+
+        @agentbay_trace
+        async def tokens():
+            for t in ["a", "b"]:
+                await asyncio.sleep(0)
+                yield t
+
+        async def consume():
+            return [t async for t in tokens()]
+
+        self.assertEqual(asyncio.run(consume()), ["a", "b"])
+
+        spans = self.exporter.get_finished_spans()
+        self.assertEqual(len(spans), 1)
+        self.assertEqual(spans[0].name, "tokens")
+        self.assertEqual(spans[0].attributes["output.count"], 2)
+
+    def test_trace_options(self):
+        """Test custom span names, static attributes, redaction and argument serializers."""
+
+        @agentbay_trace(name="login", attributes={"team": "auth"}, redact=["password"],
+                        arg_serializer=lambda value: value.upper() if isinstance(value, str) else value)
+        def check(user, password, retries=1):
+            return True
+
+        check("ada", "hunter2", retries=3)
+        check("bob", password="secret")
+
+        first, second = self.exporter.get_finished_spans()
+        self.assertEqual(first.name, "login")
+        self.assertEqual(first.attributes["team"], "auth")
+        self.assertEqual(first.attributes["code.function"], "check")
+        self.assertEqual(first.attributes["input.args"], "('ADA', '[REDACTED]')")
+        self.assertEqual(first.attributes["input.kwargs"], "{'retries': 3}")
+        self.assertEqual(second.attributes["input.kwargs"], "{'password': '[REDACTED]'}")
+        self.assertNotIn("secret", second.attributes["input.args"])
+
+    def test_trace_capture_disabled_skips_work(self):
+        """Test that disabled captures never stringify (or serialize) the values."""
+
+        class Expensive:
+            def __repr__(self):
+                raise AssertionError("must not be stringified")
+
+            __str__ = __repr__
+
+        def serializer(value):
+            raise AssertionError("must not be called")
+
+        @agentbay_trace(capture_args=False, capture_result=False, arg_serializer=serializer)
+        def process(data):
+            return Expensive()
+
+        @agentbay_trace(capture_args=False, capture_result=False)
+        def chunks(data):
+            yield 1
+            return Expensive()
+
+        process(Expensive())
+        self.assertEqual(list(chunks(Expensive())), [1])
+
+        process_span, chunks_span = self.exporter.get_finished_spans()
+        self.assertNotIn("input.args", process_span.attributes)
+        self.assertNotIn("output", process_span.attributes)
+        self.assertEqual(chunks_span.attributes["output.count"], 1)
+        self.assertNotIn("output", chunks_span.attributes)
+
+    def test_disabled_runs_untraced(self):
+        """Test that a disabled SDK calls functions, generators and async generators without spans."""
+        runtime.set_enabled(False)
+        self.addCleanup(runtime.set_enabled, True)
+
+        @agentbay_trace
+        def add(a, b):
+            return a + b
+
+        @agentbay_trace
+        def echo():
+            received = yield "ready"
+            yield received
+            return "done"
+
+        @agentbay_trace
+        async def tokens():
+            sent = yield "a"
+            yield sent
+
+        self.assertEqual(add(1, 2), 3)
+
+        gen = echo()
+        self.assertEqual(next(gen), "ready")
+        self.assertEqual(gen.send("ping"), "ping")
+        with self.assertRaises(StopIteration) as stop:
+            next(gen)
+        self.assertEqual(stop.exception.value, "done")
+
+        async def consume():
+            agen = tokens()
+            first = await agen.__anext__()
+            return [first, await agen.asend("b")]
+
+        self.assertEqual(asyncio.run(consume()), ["a", "b"])
+        self.assertEqual(len(self.exporter.get_finished_spans()), 0)
+
+        # Switched back on, the same decorated function is traced again
+        runtime.set_enabled(True)
+        add(1, 2)
+        self.assertEqual(len(self.exporter.get_finished_spans()), 1)
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,148 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from opentelemetry.proto.collector.trace.v1.trace_service_pb2 import ExportTraceServiceRequest
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor, SpanExportResult
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+from agentbay import AgentBay, init
+from agentbay.cli import main, replay
+from agentbay.exporters.file import FileSpanExporter, list_capture_files, read_records
+
+def _make_spans(count):
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    tracer = provider.get_tracer("test")
+    for i in range(count):
+        with tracer.start_as_current_span(f"span-{i}"):
+            pass
+    return exporter.get_finished_spans()
+
+def _span_names(payload):
+    request = ExportTraceServiceRequest()
+    request.ParseFromString(payload)
+    return [
+        span.name
+        for resource_spans in request.resource_spans
+        for scope_spans in resource_spans.scope_spans
+        for span in scope_spans.spans
+    ]
+
+class TestFileSpanExporter(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, True)
+
+    def test_protobuf_records_and_rotation(self):
+        """Test that batches round-trip as delimited protobuf and files rotate at the size cap."""
+        # Each batch is a few hundred bytes: the second one fills the first file
+        exporter = FileSpanExporter(self.directory, max_file_bytes=600)
+        spans = _make_spans(6)
+        for i in range(0, 6, 2):
+            self.assertEqual(exporter.export(spans[i:i + 2]), SpanExportResult.SUCCESS)
+
+        # The open file is only visible as .part until shutdown
+        self.assertTrue(any(name.endswith(".part") for name in os.listdir(self.directory)))
+        exporter.shutdown()
+        self.assertFalse(any(name.endswith(".part") for name in os.listdir(self.directory)))
+
+        files = list_capture_files([self.directory])
+        self.assertGreater(len(files), 1)
+        names = [name for path in files for record in read_records(path) for name in _span_names(record)]
+        self.assertEqual(names, [f"span-{i}" for i in range(6)])
+        self.assertEqual(exporter.get_stats()["file_batches"], 3)
+        self.assertEqual(exporter.get_stats()["files_written"], len(files))
+
+    def test_json_lines_use_hex_ids(self):
+        """Test that the JSON format writes OTLP/JSON lines that read back to the same request."""
+        exporter = FileSpanExporter(self.directory, format="json")
+        spans = _make_spans(1)
+        exporter.export(spans)
+        exporter.shutdown()
+
+        path, = list_capture_files([self.directory])
+        with open(path, encoding="utf-8") as f:
+            line = json.loads(f.readline())
+        span = line["resourceSpans"][0]["scopeSpans"][0]["spans"][0]
+        self.assertEqual(span["traceId"], format(spans[0].context.trace_id, "032x"))
+        self.assertEqual(span["spanId"], format(spans[0].context.span_id, "016x"))
+
+        record, = read_records(path)
+        self.assertEqual(_span_names(record), ["span-0"])
+
+    def test_truncated_record_is_skipped(self):
+        """Test that a record cut short by a crash ends the file without failing."""
+        exporter = FileSpanExporter(self.directory)
+        exporter.export(_make_spans(1))
+        exporter.export(_make_spans(1))
+        exporter.shutdown()
+
+        path, = list_capture_files([self.directory])
+        with open(path, "rb+") as f:
+            f.truncate(os.path.getsize(path) - 5)
+        self.assertEqual(len(list(read_records(path))), 1)
+
+    def test_init_file_exporter_needs_no_api_key(self):
+        """Test that `init(exporter="file")` works without an API key."""
+        AgentBay._instance = None
+        client = init(exporter="file", file_directory=self.directory, metrics=False)
+        self.assertIsInstance(client.exporter, FileSpanExporter)
+        client.shutdown()
+
+        with self.assertRaises(ValueError):
+            init(exporter="file")
+
+class TestReplay(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, True)
+        exporter = FileSpanExporter(self.directory, max_file_bytes=200)
+        spans = _make_spans(6)
+        for i in range(6):
+            exporter.export(spans[i:i + 1])
+        exporter.shutdown()
+
+    def test_replay_batches_records(self):
+        """Test that records are joined into batches that decode as one merged request."""
+        uploads = []
+        stats = replay([self.directory], lambda payload: uploads.append(payload) or True,
+                       batch_bytes=1024 * 1024, delete=True)
+
+        self.assertEqual(stats["records"], 6)
+        self.assertEqual(stats["failed"], 0)
+        self.assertEqual(len(uploads), stats["files"])
+        names = [name for payload in uploads for name in _span_names(payload)]
+        self.assertEqual(names, [f"span-{i}" for i in range(6)])
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_replay_stops_on_failure(self):
+        """Test that a failed upload keeps the remaining files and reports the failure."""
+        stats = replay([self.directory], lambda payload: False, retries=1, backoff=0, delete=True)
+        self.assertEqual(stats["failed"], 1)
+        self.assertEqual(stats["files"], 0)
+        self.assertEqual(len(list_capture_files([self.directory])), len(os.listdir(self.directory)))
+        self.assertGreater(len(os.listdir(self.directory)), 0)
+
+    def test_cli_requires_api_key(self):
+        """Test that the replay command refuses to run without an API key."""
+        environ = dict(os.environ)
+        os.environ.pop("AGENTBAY_API_KEY", None)
+        self.addCleanup(os.environ.update, environ)
+        with self.assertRaises(ValueError):
+            main(["replay", self.directory])
+
+        # Workers sending to an aggregator need no key, but replay uploads directly
+        with patch.dict(os.environ, {"AGENTBAY_AGGREGATOR_SOCKET": "/tmp/agentbay.sock"}):
+            with self.assertRaises(ValueError):
+                main(["replay", self.directory])
+
+if __name__ == "__main__":
+    unittest.main()
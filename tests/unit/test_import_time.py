@@ -0,0 +1,53 @@
+import os
+import subprocess
+import sys
+import unittest
+
+# Cumulative `import agentbay` time allowed, in milliseconds (the OpenTelemetry SDK alone takes ~60ms)
+IMPORT_BUDGET_MS = float(os.environ.get("AGENTBAY_IMPORT_BUDGET_MS", 50))
+
+# Imported by `agentbay.init()` and the integrations, never by `import agentbay`
+HEAVY_MODULES = ("opentelemetry", "requests", "google.protobuf")
+
+def run_python(*args):
+    return subprocess.run([sys.executable, *args], capture_output=True, text=True, check=True)
+
+class TestImportTime(unittest.TestCase):
+
+    def test_no_heavy_imports(self):
+        """Test that importing the package and its integrations doesn't import OTel or HTTP libraries."""
+        result = run_python("-c", (
+            "import sys, agentbay\n"
+            "from agentbay.llms import openai, gemini\n"
+            "from agentbay.frameworks import langchain\n"
+            "@agentbay.trace\n"
+            "def decorated(): pass\n"
+            f"print([m for m in sys.modules if m.startswith({HEAVY_MODULES!r})])"
+        ))
+        self.assertEqual(result.stdout.strip(), "[]")
+
+    def test_import_time_budget(self):
+        """Test that `import agentbay` stays within the import time budget (python -X importtime)."""
+        # Best of three, to keep a busy machine from failing the test
+        timings = []
+        for _ in range(3):
+            result = run_python("-X", "importtime", "-c", "import agentbay")
+            for line in result.stderr.splitlines():
+                _, _, cumulative, name = (part.strip() for part in line.replace(":", "|", 1).split("|"))
+                if name == "agentbay":
+                    timings.append(int(cumulative) / 1000.0)
+
+        self.assertEqual(len(timings), 3)
+        self.assertLess(min(timings), IMPORT_BUDGET_MS)
+
+    def test_lazy_attributes(self):
+        """Test that lazily imported names still resolve."""
+        import agentbay
+        from agentbay.client import AgentBay
+
+        self.assertIs(agentbay.AgentBay, AgentBay)
+        with self.assertRaises(AttributeError):
+            agentbay.does_not_exist
+
+if __name__ == '__main__':
+    unittest.main()
@@ -13,7 +13,8 @@ class TestAgentBayInit(unittest.TestCase):
 
     def test_init_with_api_key(self):
         """Test that init works with an explicit API key."""
-        client = init(api_key="test-key-123")
+        client = init(api_key="test-key-123", metrics=False)
+        self.addCleanup(client.shutdown)
         self.assertIsNotNone(client)
         self.assertEqual(client.config.api_key, "test-key-123")
         
@@ -24,7 +25,8 @@ class TestAgentBayInit(unittest.TestCase):
 
     def test_singleton_pattern(self):
         """Test that init returns the same instance if called twice."""
-        client1 = init(api_key="key-1")
+        client1 = init(api_key="key-1", metrics=False)
+        self.addCleanup(client1.shutdown)
         # Second init call with different key should actually return the SAME instance
         # (depending on how strict we want the singleton to be. 
         #  Currently, our logic replaces it if we call init again, 
@@ -34,6 +36,82 @@ class TestAgentBayInit(unittest.TestCase):
         client2 = AgentBay.get_instance()
         self.assertIs(client1, client2)
 
+    def test_export_pipeline_options(self):
+        """Test that export tuning options reach the processor and stats are exposed."""
+        client = init(
+            api_key="key", metrics=False, max_queue_size=100, max_export_batch_size=10, overflow_policy="drop_oldest",
+        )
+        self.addCleanup(client.shutdown)
+
+        self.assertEqual(client.processor.max_queue_size, 100)
+        self.assertEqual(client.processor.max_export_batch_size, 10)
+        self.assertEqual(client.processor.overflow_policy, "drop_oldest")
+        self.assertLessEqual(
+            {"enqueued", "exported", "dropped", "retried", "failed", "bytes_uncompressed", "bytes_sent"},
+            set(client.get_export_stats()),
+        )
+
+    def test_disabled_needs_no_api_key(self):
+        """Test that a disabled SDK initializes without a key and sets nothing up."""
+        from agentbay import runtime
+        self.addCleanup(runtime.set_enabled, True)
+
+        client = init(enabled=False)
+        self.assertFalse(runtime.state.enabled)
+        self.assertIsNone(client.tracer_provider)
+        self.assertEqual(client.get_export_stats(), {})
+        client.shutdown()
+
+    def test_disabled_by_environment(self):
+        """Test that AGENTBAY_DISABLED turns the SDK off."""
+        from unittest.mock import patch
+        from agentbay.config import Config
+
+        with patch.dict(os.environ, {"AGENTBAY_DISABLED": "1"}):
+            self.assertFalse(Config().enabled)
+        self.assertTrue(Config(api_key="key").enabled)
+
+    def test_service_identity_on_resource(self):
+        """Test that service identity and extra attributes go on the resource, merged with the OTel env vars."""
+        from unittest.mock import patch
+
+        env = {"OTEL_RESOURCE_ATTRIBUTES": "team=search,service.name=from-env", "OTEL_SERVICE_NAME": ""}
+        with patch.dict(os.environ, env):
+            client = init(
+                api_key="key", metrics=False, service_name="checkout", service_version="1.4.2",
+                environment="staging", resource_attributes={"region": "eu-west-1"},
+            )
+        self.addCleanup(client.shutdown)
+
+        attributes = client.tracer_provider.resource.attributes
+        self.assertEqual(attributes["service.name"], "checkout")
+        self.assertEqual(attributes["service.version"], "1.4.2")
+        self.assertEqual(attributes["deployment.environment.name"], "staging")
+        self.assertEqual(attributes["region"], "eu-west-1")
+        self.assertEqual(attributes["team"], "search")
+
+    def test_service_name_defaults(self):
+        """Test that OTEL_SERVICE_NAME is used when set, and the SDK default otherwise."""
+        from unittest.mock import patch
+
+        with patch.dict(os.environ, {"OTEL_SERVICE_NAME": "billing"}):
+            client = init(api_key="key", metrics=False)
+        self.assertEqual(client.tracer_provider.resource.attributes["service.name"], "billing")
+        client.shutdown()
+
+        with patch.dict(os.environ, {"OTEL_SERVICE_NAME": "", "OTEL_RESOURCE_ATTRIBUTES": ""}):
+            client = init(api_key="key", metrics=False)
+        self.assertEqual(client.tracer_provider.resource.attributes["service.name"], "agentbay-python-sdk")
+        client.shutdown()
+
+        with self.assertRaises(ValueError):
+            init(api_key="key", resource_attributes={"owner": {"team": "x"}})
+
+    def test_invalid_overflow_policy_raises_error(self):
+        """Test that an unknown overflow policy is rejected."""
+        with self.assertRaises(ValueError):
+            init(api_key="key", overflow_policy="spill")
+
 if __name__ == "__main__":
     unittest.main()
 
@@ -0,0 +1,96 @@
+import functools
+import unittest
+
+from agentbay import instrumentation
+
+class Client:
+    def call(self):
+        return "original"
+
+class TestInstrumentation(unittest.TestCase):
+
+    def setUp(self):
+        self.original = Client.call
+        self.addCleanup(setattr, Client, "call", self.original)
+        self.addCleanup(instrumentation.uninstrument, "test")
+        self.wrapped_calls = 0
+
+    def _make_wrapper(self, original):
+        def wrapper(client):
+            if not instrumentation.is_inert(wrapper):
+                self.wrapped_calls += 1
+            return original(client)
+        return wrapper
+
+    def test_wrap_is_idempotent(self):
+        """Test that wrapping an already wrapped method is a no-op."""
+        self.assertTrue(instrumentation.wrap_method("test", Client, "call", self._make_wrapper))
+        self.assertFalse(instrumentation.wrap_method("test", Client, "call", self._make_wrapper))
+
+        self.assertEqual(Client().call(), "original")
+        self.assertEqual(self.wrapped_calls, 1)
+        self.assertTrue(instrumentation.is_instrumented("test"))
+
+    def test_uninstrument_restores_original(self):
+        """Test that uninstrument puts the original back and runs cleanups."""
+        cleaned = []
+        instrumentation.wrap_method("test", Client, "call", self._make_wrapper)
+        instrumentation.on_uninstrument("test", lambda: cleaned.append(True))
+
+        instrumentation.uninstrument("test")
+
+        self.assertIs(Client.call, self.original)
+        self.assertEqual(cleaned, [True])
+        self.assertFalse(instrumentation.is_instrumented("test"))
+
+        # Instrumenting again after uninstrument works
+        self.assertTrue(instrumentation.wrap_method("test", Client, "call", self._make_wrapper))
+
+    def test_foreign_patch_is_kept(self):
+        """Test that a patch applied on top of ours is not removed by uninstrument."""
+        instrumentation.wrap_method("test", Client, "call", self._make_wrapper)
+        foreign = lambda client: "foreign"
+        Client.call = foreign
+
+        with self.assertLogs("agentbay.instrumentation", level="WARNING"):
+            instrumentation.uninstrument("test")
+        self.assertIs(Client.call, foreign)
+
+    def test_patched_over_wrapper_is_inert(self):
+        """Test that uninstrument turns off a wrapper still called through a foreign patch."""
+        instrumentation.wrap_method("test", Client, "call", self._make_wrapper)
+        ours = Client.call
+        Client.call = lambda client: ours(client)
+
+        with self.assertLogs("agentbay.instrumentation", level="WARNING"):
+            instrumentation.uninstrument("test")
+        self.assertEqual(Client().call(), "original")
+        self.assertEqual(self.wrapped_calls, 0)
+
+        # Instrumenting again traces each call once
+        self.assertTrue(instrumentation.wrap_method("test", Client, "call", self._make_wrapper))
+        Client().call()
+        self.assertEqual(self.wrapped_calls, 1)
+
+    def test_patched_over_wrapper_is_turned_back_on(self):
+        """Test that instrumenting again reuses a wrapper found beneath a foreign patch."""
+        instrumentation.wrap_method("test", Client, "call", self._make_wrapper)
+        foreign = functools.wraps(Client.call)(lambda client: foreign.__wrapped__(client))
+        Client.call = foreign
+
+        with self.assertLogs("agentbay.instrumentation", level="WARNING"):
+            instrumentation.uninstrument("test")
+        self.assertFalse(instrumentation.is_instrumented("test"))
+
+        self.assertTrue(instrumentation.wrap_method("test", Client, "call", self._make_wrapper))
+        self.assertIs(Client.call, foreign)
+        self.assertTrue(instrumentation.is_instrumented("test"))
+        Client().call()
+        self.assertEqual(self.wrapped_calls, 1)
+
+    def test_unknown_integration(self):
+        with self.assertRaises(ValueError):
+            instrumentation.instrument("cohere")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import unittest
+from unittest.mock import MagicMock, patch
+from uuid import uuid4
+
+from opentelemetry.sdk.metrics import MeterProvider
+from opentelemetry.sdk.metrics.export import InMemoryMetricReader
+
+from agentbay import AgentBay, init, metrics
+from agentbay.frameworks.langchain.registry import RunRegistry, get_run_stats
+
+def _points(reader, name):
+    """
+    Returns {frozenset(attributes): value or count} for one metric.
+    """
+    points = {}
+    data = reader.get_metrics_data()
+    for resource_metrics in data.resource_metrics if data else ():
+        for scope_metrics in resource_metrics.scope_metrics:
+            for metric in scope_metrics.metrics:
+                if metric.name != name:
+                    continue
+                for point in metric.data.data_points:
+                    value = point.count if hasattr(point, "count") else point.value
+                    points[frozenset(point.attributes.items())] = value
+    return points
+
+class TestLLMMetrics(unittest.TestCase):
+
+    def setUp(self):
+        self.reader = InMemoryMetricReader()
+        metrics.configure(MeterProvider(metric_readers=[self.reader]))
+        self.addCleanup(metrics.configure, None)
+
+    def test_aggregates_by_model_and_token_type(self):
+        """Test that calls are summed per system, model and token type."""
+        metrics.record_llm_call("openai", "gpt-4o", 0.5, prompt_tokens=10, completion_tokens=5, cost=0.01)
+        metrics.record_llm_call("openai", "gpt-4o", 1.5, prompt_tokens=20, completion_tokens=7, cost=0.02)
+        metrics.record_llm_call("gemini", None, 0.1, error=TimeoutError())
+
+        gpt = {("llm.system", "openai"), ("llm.request.model", "gpt-4o")}
+        gemini = {("llm.system", "gemini"), ("llm.request.model", "unknown")}
+
+        self.assertEqual(_points(self.reader, "llm.requests"), {frozenset(gpt): 2, frozenset(gemini): 1})
+        self.assertEqual(
+            _points(self.reader, "llm.usage.tokens"),
+            {frozenset(gpt | {("llm.token.type", "prompt")}): 30,
+             frozenset(gpt | {("llm.token.type", "completion")}): 12},
+        )
+        self.assertAlmostEqual(_points(self.reader, "llm.usage.cost")[frozenset(gpt)], 0.03)
+        self.assertEqual(_points(self.reader, "llm.request.duration")[frozenset(gpt)], 2)
+        self.assertEqual(
+            _points(self.reader, "llm.errors"),
+            {frozenset(gemini | {("error.type", "TimeoutError")}): 1},
+        )
+
+    def test_unconfigured_is_noop(self):
+        """Test that recording before `init()` (or after shutdown) does nothing."""
+        metrics.configure(None)
+        metrics.record_llm_call("openai", "gpt-4o", 0.5, prompt_tokens=10)
+        self.assertEqual(_points(self.reader, "llm.requests"), {})
+
+    def test_langchain_run_gauges(self):
+        """Test that the open, reaped and evicted runs of the LangChain handlers are reported."""
+        registry = RunRegistry(max_runs=2)
+        # Handlers of other tests may still be alive: compare with the totals without this one
+        before = get_run_stats()
+        for _ in range(3):
+            registry.add(uuid4(), MagicMock())
+
+        for name, stat, added in (("live", "live_runs", 2), ("evicted", "evicted_runs", 1), ("reaped", "reaped_runs", 0)):
+            self.assertEqual(_points(self.reader, f"langchain.runs.{name}"), {frozenset(): before[stat] + added})
+
+class TestMetricsInit(unittest.TestCase):
+
+    def setUp(self):
+        AgentBay._instance = None
+
+    def test_init_sets_up_metrics(self):
+        """Test that `init()` records LLM calls on its meter provider and shutdown turns recording off."""
+        reader = InMemoryMetricReader()
+        with patch.object(AgentBay, "_create_meter_provider", return_value=MeterProvider(metric_readers=[reader])):
+            client = init(api_key="key", metrics_export_interval_millis=1000)
+        self.assertIsNotNone(client.meter_provider)
+        metrics.record_llm_call("openai", "gpt-4o", 0.5, prompt_tokens=10)
+        self.assertEqual(sum(_points(reader, "llm.requests").values()), 1)
+
+        client.shutdown()
+        self.assertIsNone(metrics._metrics)
+
+    def test_metrics_can_be_turned_off(self):
+        """Test that `metrics=False` sets up no meter provider."""
+        client = init(api_key="key", metrics=False)
+        self.addCleanup(client.shutdown)
+        self.assertIsNone(client.meter_provider)
+
+    def test_only_sent_with_http_exporter(self):
+        """Test that the memory and file exporters set up no meter provider."""
+        client = init(api_key="key", exporter="memory")
+        self.addCleanup(client.shutdown)
+        self.assertIsNone(client.meter_provider)
+        self.assertIsNone(metrics._metrics)
+
+    def test_invalid_interval(self):
+        with self.assertRaises(ValueError):
+            init(api_key="key", metrics_export_interval_millis=0)
+
+if __name__ == "__main__":
+    unittest.main()
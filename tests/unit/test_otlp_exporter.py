@@ -0,0 +1,101 @@
+import gzip
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from opentelemetry.proto.collector.trace.v1.trace_service_pb2 import ExportTraceServiceRequest
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor, SpanExportResult
+
+from agentbay.exporters import AgentBaySpanExporter
+
+class StubCollector(BaseHTTPRequestHandler):
+    """Accepts OTLP posts and remembers (client port, headers, body)."""
+    protocol_version = "HTTP/1.1"
+    requests = []
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        self.requests.append((self.client_address[1], dict(self.headers), body))
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+class TestAgentBaySpanExporter(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), StubCollector)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.endpoint = f"http://127.0.0.1:{cls.server.server_address[1]}/api/v1/traces"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        StubCollector.requests.clear()
+
+    def _export_spans(self, exporter, count):
+        provider = TracerProvider()
+        provider.add_span_processor(SimpleSpanProcessor(exporter))
+        tracer = provider.get_tracer("test")
+        for i in range(count):
+            with tracer.start_as_current_span(f"llm-{i}") as span:
+                span.set_attribute("llm.request.messages", "You are a helpful assistant. " * 200)
+
+    def test_gzip_export(self):
+        """Test that bodies are gzip-compressed and decode to the exported spans."""
+        exporter = AgentBaySpanExporter(self.endpoint, headers={"Authorization": "Bearer k"}, compression="gzip")
+        self.addCleanup(exporter.shutdown)
+
+        self._export_spans(exporter, 1)
+
+        _, headers, body = StubCollector.requests[0]
+        self.assertEqual(headers["Content-Encoding"], "gzip")
+        self.assertEqual(headers["Authorization"], "Bearer k")
+
+        request = ExportTraceServiceRequest()
+        request.ParseFromString(gzip.decompress(body))
+        self.assertEqual(request.resource_spans[0].scope_spans[0].spans[0].name, "llm-0")
+
+        stats = exporter.get_stats()
+        self.assertEqual(stats["requests"], 1)
+        self.assertLess(stats["bytes_sent"] * 5, stats["bytes_uncompressed"])
+
+    def test_no_compression(self):
+        exporter = AgentBaySpanExporter(self.endpoint, compression="none")
+        self.addCleanup(exporter.shutdown)
+
+        self._export_spans(exporter, 1)
+
+        _, headers, _ = StubCollector.requests[0]
+        self.assertNotIn("Content-Encoding", headers)
+        stats = exporter.get_stats()
+        self.assertEqual(stats["bytes_sent"], stats["bytes_uncompressed"])
+
+    def test_connection_is_reused(self):
+        """Test that consecutive exports share one keep-alive connection."""
+        exporter = AgentBaySpanExporter(self.endpoint)
+        self.addCleanup(exporter.shutdown)
+
+        self._export_spans(exporter, 3)
+
+        ports = {port for port, _, _ in StubCollector.requests}
+        self.assertEqual(len(StubCollector.requests), 3)
+        self.assertEqual(len(ports), 1)
+
+    def test_unreachable_backend(self):
+        """Test that connection errors are reported as a failed export."""
+        exporter = AgentBaySpanExporter("http://127.0.0.1:1/api/v1/traces", timeout=1)
+        self.addCleanup(exporter.shutdown)
+
+        self.assertEqual(exporter.export_serialized(b""), SpanExportResult.FAILURE)
+        self.assertEqual(exporter.get_stats()["failed_requests"], 1)
+
+if __name__ == "__main__":
+    unittest.main()
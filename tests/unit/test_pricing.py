@@ -0,0 +1,64 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from agentbay import pricing
+from agentbay.pricing import DEFAULT_PRICES, ModelPrice, PricingTable
+
+class TestPricingTable(unittest.TestCase):
+
+    def setUp(self):
+        self.table = PricingTable(DEFAULT_PRICES)
+
+    def test_versioned_names_resolve_to_base_model(self):
+        """Test that dated, versioned and prefixed names use the base model's price."""
+        self.assertEqual(self.table.lookup("gpt-4o-2024-08-06"), DEFAULT_PRICES["gpt-4o"])
+        self.assertEqual(self.table.lookup("gpt-4o-mini-2024-07-18"), DEFAULT_PRICES["gpt-4o-mini"])
+        self.assertEqual(self.table.lookup("gpt-4-0613"), DEFAULT_PRICES["gpt-4"])
+        self.assertEqual(self.table.lookup("models/gemini-1.5-pro-002"), DEFAULT_PRICES["gemini-1.5-pro"])
+        self.assertEqual(self.table.lookup("ft:gpt-4o-mini:acme::abc123"), DEFAULT_PRICES["gpt-4o-mini"])
+        self.assertEqual(self.table.lookup("GPT-4o"), DEFAULT_PRICES["gpt-4o"])
+        self.assertIsNone(self.table.lookup("my-local-llama"))
+        self.assertIsNone(self.table.lookup(None))
+
+    def test_priced_variants_are_not_matched_to_base_model(self):
+        """Test that only date and version suffixes are stripped, not variant names."""
+        for model in ("o1-pro", "gpt-4o-realtime-preview", "gpt-4o-audio-preview-2024-12-17",
+                      "gemini-2.5-flash-lite", "gpt-4-0125-preview"):
+            self.assertIsNone(self.table.lookup(model), model)
+        self.assertEqual(self.table.lookup("o1-2024-12-17"), DEFAULT_PRICES["o1"])
+        self.assertEqual(self.table.lookup("gemini-2.0-flash-lite-001"), DEFAULT_PRICES["gemini-2.0-flash-lite"])
+
+    def test_cost(self):
+        """Test that cost uses the prompt and completion prices per 1M tokens."""
+        self.assertAlmostEqual(self.table.cost("gpt-4o", 1000, 500), (1000 * 2.5 + 500 * 10.0) / 1e6)
+        self.assertAlmostEqual(self.table.cost("gpt-4o", 1000, None), 1000 * 2.5 / 1e6)
+        self.assertIsNone(self.table.cost("gpt-4o", None, None))
+        self.assertIsNone(self.table.cost("unknown-model", 10, 10))
+
+    def test_update_overrides_memoized_lookups(self):
+        """Test that new prices apply to names that were already resolved."""
+        self.assertEqual(self.table.lookup("gpt-4o-2024-08-06"), DEFAULT_PRICES["gpt-4o"])
+        self.table.update({"gpt-4o-2024-08-06": {"prompt": 1.0, "completion": 2.0}})
+        self.assertEqual(self.table.lookup("gpt-4o-2024-08-06"), ModelPrice(1.0, 2.0))
+        self.assertEqual(self.table.lookup("gpt-4o"), DEFAULT_PRICES["gpt-4o"])
+
+        with self.assertRaises(ValueError):
+            self.table.update({"bad": {"prompt": 1.0}})
+
+    def test_load_file(self):
+        """Test that a JSON pricing file overrides the default table."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "prices.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"gpt-4o": {"prompt": 1.0, "completion": 4.0}, "acme-7b": [0.1, 0.2]}, f)
+
+            with patch.object(pricing, "table", PricingTable(DEFAULT_PRICES)):
+                pricing.load(path)
+                self.assertEqual(pricing.table.lookup("gpt-4o"), ModelPrice(1.0, 4.0))
+                self.assertAlmostEqual(pricing.cost("acme-7b-0125", 1_000_000, 0), 0.1)
+
+if __name__ == "__main__":
+    unittest.main()
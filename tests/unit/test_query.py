@@ -0,0 +1,98 @@
+import time
+import unittest
+
+from opentelemetry import trace
+
+from agentbay import AgentBay, init
+from agentbay import trace as agentbay_trace
+from agentbay.exporters import MemorySpanExporter
+
+class TestMemoryExporterQueries(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        AgentBay._instance = None
+        cls.client = init(exporter="memory", metrics=False)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.client.shutdown()
+
+    def setUp(self):
+        self.client.query()  # flush spans left over from the previous test
+        self.client.exporter.clear()
+
+    def _run_agent(self):
+        tracer = trace.get_tracer("test")
+
+        @agentbay_trace
+        def retrieve(query):
+            time.sleep(0.01)
+            return ["doc"]
+
+        @agentbay_trace
+        def call_llm(prompt):
+            with tracer.start_as_current_span("llm") as span:
+                span.set_attribute("llm.request.model", "gpt-4o")
+                span.set_attribute("llm.usage.prompt_tokens", 10)
+                span.set_attribute("llm.usage.completion_tokens", 5)
+            return "answer"
+
+        @agentbay_trace
+        def fail():
+            raise ValueError("boom")
+
+        @agentbay_trace
+        def agent(question):
+            retrieve(question)
+            call_llm(question)
+            call_llm(question)
+            try:
+                fail()
+            except ValueError:
+                pass
+
+        agent("why?")
+
+    def test_filter_tree_and_aggregate(self):
+        """Test filtering, the parent/child tree and per-name statistics."""
+        self._run_agent()
+        spans = self.client.query()
+
+        self.assertEqual(len(spans.filter(name="call_llm")), 2)
+        self.assertEqual(len(spans.filter(attributes={"llm.request.model": "gpt-4o"})), 2)
+        self.assertEqual([span.name for span in spans.errors()], ["fail"])
+        self.assertEqual(spans.slowest(1)[0].name, "agent")
+
+        root, = spans.tree()
+        self.assertEqual(root.name, "agent")
+        self.assertEqual([child.name for child in root.children], ["retrieve", "call_llm", "call_llm", "fail"])
+        self.assertEqual(len(list(root.walk())), 7)
+
+        stats = spans.aggregate()
+        self.assertEqual(stats["call_llm"]["count"], 2)
+        self.assertEqual(stats["llm"]["prompt_tokens"], 20)
+        self.assertEqual(stats["llm"]["completion_tokens"], 10)
+        self.assertEqual(stats["fail"]["errors"], 1)
+        self.assertGreaterEqual(stats["retrieve"]["p95_ms"], 10.0)
+        self.assertLessEqual(stats["retrieve"]["max_ms"], stats["agent"]["total_ms"])
+
+    def test_ring_buffer_drops_oldest(self):
+        """Test that the buffer keeps only the newest spans."""
+        exporter = MemorySpanExporter(max_spans=3)
+        self._run_agent()
+        spans = self.client.query().spans
+        exporter.export(spans)
+
+        self.assertEqual(exporter.get_finished_spans(), spans[-3:])
+        self.assertEqual(exporter.get_stats(), {"memory_spans": 3, "memory_spans_dropped": len(spans) - 3})
+
+    def test_query_needs_memory_exporter(self):
+        """Test that querying a client that exports elsewhere is an error."""
+        client = AgentBay.__new__(AgentBay)
+        client.exporter = None
+        with self.assertRaises(RuntimeError):
+            client.query()
+
+if __name__ == "__main__":
+    unittest.main()
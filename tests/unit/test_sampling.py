@@ -0,0 +1,108 @@
+import time
+import unittest
+from opentelemetry import trace
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from opentelemetry.trace import Status, StatusCode
+
+from agentbay.sampling import TailSamplingProcessor, create_sampler
+
+class TestHeadSampling(unittest.TestCase):
+
+    def test_children_follow_root_decision(self):
+        """Test that sampled-out roots produce no recording children."""
+        exporter = InMemorySpanExporter()
+        provider = TracerProvider(sampler=create_sampler(0.0))
+        provider.add_span_processor(SimpleSpanProcessor(exporter))
+        tracer = provider.get_tracer("test")
+
+        with tracer.start_as_current_span("root") as root:
+            with tracer.start_as_current_span("child") as child:
+                self.assertFalse(root.is_recording())
+                self.assertFalse(child.is_recording())
+
+        self.assertEqual(len(exporter.get_finished_spans()), 0)
+
+class TestTailSampling(unittest.TestCase):
+
+    def setUp(self):
+        self.exporter = InMemorySpanExporter()
+
+    def _tracer(self, **kwargs):
+        self.processor = TailSamplingProcessor(SimpleSpanProcessor(self.exporter), **kwargs)
+        provider = TracerProvider()
+        provider.add_span_processor(self.processor)
+        return provider.get_tracer("test")
+
+    def test_drops_uninteresting_trace(self):
+        tracer = self._tracer(latency_threshold_millis=1000)
+
+        with tracer.start_as_current_span("root"):
+            with tracer.start_as_current_span("child"):
+                pass
+
+        self.assertEqual(len(self.exporter.get_finished_spans()), 0)
+        self.assertEqual(self.processor.get_stats()["dropped"], 1)
+        self.assertEqual(self.processor.get_stats()["buffered_spans"], 0)
+
+    def test_keeps_trace_with_error(self):
+        tracer = self._tracer()
+
+        with tracer.start_as_current_span("root"):
+            with tracer.start_as_current_span("child") as child:
+                child.set_status(Status(StatusCode.ERROR, "boom"))
+
+        names = sorted(span.name for span in self.exporter.get_finished_spans())
+        self.assertEqual(names, ["child", "root"])
+
+    def test_keeps_slow_trace(self):
+        tracer = self._tracer(latency_threshold_millis=5)
+
+        with tracer.start_as_current_span("root"):
+            time.sleep(0.01)
+
+        self.assertEqual(len(self.exporter.get_finished_spans()), 1)
+
+    def test_keeps_expensive_trace(self):
+        tracer = self._tracer(token_threshold=100)
+
+        with tracer.start_as_current_span("root"):
+            for _ in range(2):
+                with tracer.start_as_current_span("llm") as span:
+                    span.set_attribute("llm.usage.total_tokens", 60)
+
+        self.assertEqual(len(self.exporter.get_finished_spans()), 3)
+
+    def test_buffer_is_bounded(self):
+        tracer = self._tracer(max_buffered_spans=3)
+
+        # Roots that never end leave their children buffered
+        roots = [tracer.start_span(f"root{i}") for i in range(5)]
+        for root in roots:
+            tracer.start_span("child", context=trace.set_span_in_context(root)).end()
+
+        stats = self.processor.get_stats()
+        self.assertLessEqual(stats["buffered_spans"], 3)
+        self.assertEqual(stats["evicted"], 2)
+
+    def test_late_spans_follow_early_decision(self):
+        """Test that spans of an evicted trace get its decision instead of a second, independent one."""
+        tracer = self._tracer(max_buffered_spans=1)
+
+        error_root = tracer.start_span("error_root")
+        child = tracer.start_span("child", context=trace.set_span_in_context(error_root))
+        child.set_status(Status(StatusCode.ERROR))
+        child.end()
+        quiet_root = tracer.start_span("quiet_root")
+        tracer.start_span("child", context=trace.set_span_in_context(quiet_root)).end()
+        # The error trace was evicted (and kept) before its root ended
+        self.assertEqual(self.processor.get_stats()["evicted"], 1)
+
+        error_root.end()
+        quiet_root.end()
+        self.assertEqual(sorted(span.name for span in self.exporter.get_finished_spans()), ["child", "error_root"])
+        self.assertEqual(self.processor.get_stats()["buffered_spans"], 0)
+
+if __name__ == "__main__":
+    unittest.main()
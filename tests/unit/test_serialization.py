@@ -0,0 +1,127 @@
+import unittest
+from unittest.mock import MagicMock
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+from agentbay import serialization
+from agentbay.exporters import DeferredAttributeExporter
+from agentbay.processors import BoundedBatchSpanProcessor
+from agentbay.sampling import TailSamplingProcessor
+from agentbay.serialization import TRUNCATION_MARKER, serialize, set_attribute
+
+class TestSerialization(unittest.TestCase):
+
+    def tearDown(self):
+        serialization.configure(max_attribute_bytes=serialization.DEFAULT_MAX_ATTRIBUTE_BYTES, defer=False)
+
+    def test_matches_str_under_cap(self):
+        """Test that small values serialize exactly like str()."""
+        values = [
+            "hello",
+            42,
+            None,
+            (2, 3),
+            (1,),
+            [],
+            {"role": "user", "content": "Hi 'there'"},
+            [{"a": [1, 2.5, True]}, ("x",)],
+            {1, 2},
+            set(),
+        ]
+        for value in values:
+            self.assertEqual(serialize(value), str(value))
+
+    def test_truncates_to_byte_cap(self):
+        """Test that long values are cut to the byte cap with a marker."""
+        result = serialize("é" * 1000, max_bytes=100)
+        self.assertLessEqual(len(result.encode("utf-8")), 100)
+        self.assertTrue(result.endswith(TRUNCATION_MARKER))
+
+    def test_stops_walking_at_cap(self):
+        """Test that items past the cap are never stringified."""
+        calls = []
+
+        class Item:
+            def __repr__(self):
+                calls.append(1)
+                return "item"
+
+        result = serialize([Item() for _ in range(10_000)], max_bytes=64)
+
+        self.assertTrue(result.endswith(TRUNCATION_MARKER))
+        self.assertLess(len(calls), 20)
+
+    def test_self_reference(self):
+        """Test that recursive containers do not recurse forever."""
+        value = [1]
+        value.append(value)
+        self.assertEqual(serialize(value), str(value))
+
+    def test_skips_non_recording_span(self):
+        """Test that nothing is serialized for sampled-out spans."""
+        span = MagicMock()
+        span.is_recording.return_value = False
+        value = MagicMock()
+
+        set_attribute(span, "input.args", value)
+
+        span.set_attribute.assert_not_called()
+        value.__str__.assert_not_called()
+
+    def test_deferred_serialization(self):
+        """Test that deferred values are serialized by the exporter wrapper."""
+        exporter = InMemorySpanExporter()
+        provider = TracerProvider()
+        provider.add_span_processor(SimpleSpanProcessor(DeferredAttributeExporter(exporter)))
+        tracer = provider.get_tracer("test")
+
+        serialization.configure(defer=True)
+        with tracer.start_as_current_span("op") as span:
+            set_attribute(span, "input.args", ("a", 1))
+            # Not stringified on the caller's thread
+            self.assertNotIn("input.args", span.attributes)
+
+        spans = exporter.get_finished_spans()
+        self.assertEqual(len(spans), 1)
+        self.assertEqual(spans[0].attributes["input.args"], "('a', 1)")
+        self.assertEqual(len(serialization.pending), 0)
+
+    def test_dropped_spans_release_deferred_values(self):
+        """Test that spans dropped by tail sampling or a full queue don't keep their raw values."""
+        exporter = InMemorySpanExporter()
+        batch = BoundedBatchSpanProcessor(DeferredAttributeExporter(exporter), max_queue_size=1,
+                                          max_export_batch_size=1, schedule_delay_millis=60000)
+        self.addCleanup(batch.shutdown)
+        sampled = TailSamplingProcessor(SimpleSpanProcessor(DeferredAttributeExporter(exporter)),
+                                        latency_threshold_millis=60000)
+        serialization.configure(defer=True)
+        self.addCleanup(serialization.configure, defer=False)
+
+        for processor, count in ((sampled, 3), (batch, 50)):
+            provider = TracerProvider()
+            provider.add_span_processor(processor)
+            tracer = provider.get_tracer("test")
+            for _ in range(count):
+                with tracer.start_as_current_span("op") as span:
+                    set_attribute(span, "input.args", "x" * 100_000)
+
+        batch.force_flush()
+        self.assertGreater(batch.stats.snapshot()["dropped"], 0)
+        self.assertEqual(sampled.get_stats()["dropped"], 3)
+        self.assertEqual(len(serialization.pending), 0)
+        self.assertEqual(serialization.pending.size, 0)
+
+    def test_pending_values_bounded_by_bytes(self):
+        """Test that the oldest spans lose their deferred values past the byte cap."""
+        store = serialization._PendingAttributes(max_bytes=250_000)
+        for span_id in range(5):
+            store.add((1, span_id), "input.args", "x" * 100_000, None)
+
+        self.assertEqual(len(store), 2)
+        self.assertEqual(store.size, 200_000)
+        self.assertIsNone(store.pop((1, 0)))
+        self.assertEqual(len(store.pop((1, 4))), 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,155 @@
+import os
+import tempfile
+import threading
+import unittest
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor, SpanExportResult
+
+from agentbay.spill import SpillDirectoryLocked, SpillingExporter, SpillQueue
+
+class FlakyExporter:
+    """Stands in for AgentBaySpanExporter: fails while `down` is set."""
+
+    def __init__(self):
+        self.down = True
+        self.received = []
+        self.delivered = threading.Event()
+
+    def export_serialized(self, payload):
+        if self.down:
+            return SpanExportResult.FAILURE
+        self.received.append(payload)
+        self.delivered.set()
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self):
+        pass
+
+    def force_flush(self, timeout_millis=30000):
+        return True
+
+class TestSpillQueue(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.directory = self.tmpdir.name
+
+    def _drain(self, queue):
+        payloads = []
+        while True:
+            record = queue.next_record()
+            if record is None:
+                return payloads
+            position, payload = record
+            payloads.append(payload)
+            queue.commit(position)
+
+    def test_records_are_read_in_order(self):
+        """Test that records come back oldest-first across segments and segments are deleted."""
+        queue = SpillQueue(self.directory, segment_bytes=64)
+        for i in range(10):
+            queue.append(b"batch-%d" % i + b"x" * 20)
+
+        self.assertGreater(len(queue), 1)
+        self.assertEqual(self._drain(queue), [b"batch-%d" % i + b"x" * 20 for i in range(10)])
+        self.assertEqual(os.listdir(self.directory), [".lock"])
+        self.assertEqual(queue.get_stats()["replayed"], 10)
+
+    def test_uncommitted_record_is_returned_again(self):
+        """Test that a record is only consumed once it is committed."""
+        queue = SpillQueue(self.directory)
+        queue.append(b"a")
+        queue.append(b"b")
+
+        _, first = queue.next_record()
+        position, again = queue.next_record()
+        self.assertEqual(first, again)
+        queue.commit(position)
+        self.assertEqual(queue.next_record()[1], b"b")
+
+    def test_oldest_segments_are_evicted(self):
+        """Test that the queue stays under max_bytes by dropping the oldest segments."""
+        queue = SpillQueue(self.directory, max_bytes=500, segment_bytes=100)
+        for i in range(50):
+            queue.append(b"%02d" % i + b"x" * 40)
+
+        self.assertLessEqual(queue.size_bytes, 500)
+        self.assertGreater(queue.get_stats()["evicted_bytes"], 0)
+        payloads = self._drain(queue)
+        self.assertEqual(payloads[-1][:2], b"49")
+        self.assertNotEqual(payloads[0][:2], b"00")
+
+    def test_survives_restart(self):
+        """Test that segments written by a previous process are replayed."""
+        queue = SpillQueue(self.directory, fsync="always")
+        queue.append(b"before-restart")
+        queue.close()
+
+        reopened = SpillQueue(self.directory)
+        reopened.append(b"after-restart")
+        self.assertEqual(self._drain(reopened), [b"before-restart", b"after-restart"])
+
+    def test_torn_record_is_skipped(self):
+        """Test that a partially written record does not break replay."""
+        queue = SpillQueue(self.directory)
+        queue.append(b"complete")
+        queue.close()
+        segment, = [name for name in os.listdir(self.directory) if name.endswith(".seg")]
+        with open(os.path.join(self.directory, segment), "ab") as f:
+            f.write(b"\x00\x00\x10\x00torn")
+
+        reopened = SpillQueue(self.directory)
+        self.assertEqual(self._drain(reopened), [b"complete"])
+        self.assertEqual(reopened.get_stats()["corrupt_segments"], 1)
+
+    def test_single_owner(self):
+        """Test that a second queue can't open a directory until the owner closes it."""
+        queue = SpillQueue(self.directory)
+        with self.assertRaises(SpillDirectoryLocked):
+            SpillQueue(self.directory)
+        queue.close()
+        SpillQueue(self.directory).close()
+
+    def test_invalid_fsync_policy(self):
+        with self.assertRaises(ValueError):
+            SpillQueue(self.directory, fsync="sometimes")
+
+class TestSpillingExporter(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.upstream = FlakyExporter()
+        self.exporter = SpillingExporter(
+            self.upstream, SpillQueue(self.tmpdir.name), replay_interval=0.0, min_backoff=0.05, max_backoff=0.1
+        )
+        self.addCleanup(self.exporter.shutdown)
+
+        provider = TracerProvider()
+        provider.add_span_processor(SimpleSpanProcessor(self.exporter))
+        self.tracer = provider.get_tracer("test")
+
+    def test_failed_batches_are_spilled_and_replayed(self):
+        """Test that spans exported during an outage reach the backend once it recovers."""
+        self.tracer.start_span("during-outage").end()
+        self.assertEqual(self.exporter.get_stats()["spilled"], 1)
+        self.assertEqual(self.upstream.received, [])
+
+        self.upstream.down = False
+        self.assertTrue(self.upstream.delivered.wait(2.0))
+        self.assertIn(b"during-outage", self.upstream.received[0])
+
+    def test_spilled_batch_reports_success(self):
+        """Test that a spilled batch is not retried in memory by the processor."""
+        from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+        spans = InMemorySpanExporter()
+        provider = TracerProvider()
+        provider.add_span_processor(SimpleSpanProcessor(spans))
+        provider.get_tracer("test").start_span("span").end()
+
+        self.assertEqual(self.exporter.export(spans.get_finished_spans()), SpanExportResult.SUCCESS)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -20,7 +20,7 @@ class TestTransport(unittest.TestCase):
     def tearDown(self):
         self.transport.stop()
 
-    @patch("requests.post")
+    @patch("requests.Session.post")
     def test_send_batch(self, mock_post):
         """Test that items are batched and sent."""
         # Configure the mock to return a fake 200 OK response
@@ -45,7 +45,7 @@ class TestTransport(unittest.TestCase):
         self.assertEqual(kwargs["json"][0], {"event": 1})
         self.assertEqual(kwargs["json"][1], {"event": 2})
         
-    @patch("requests.post")
+    @patch("requests.Session.post")
     def test_flush_on_interval(self, mock_post):
         """Test that items are sent even if batch isn't full, after time limit."""
         mock_response = MagicMock()